@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# Signal Sciences Python API Client, asyncio variant
+# Science all the Signals, concurrently!
+#
+# Requires Python 3.6+ and aiohttp.
+
+import sys
+import json
+import time
+import asyncio
+import aiohttp
+
+try:
+    from .SigSci import SigSciAPI
+except ImportError:
+    from SigSci import SigSciAPI
+
+sys.dont_write_bytecode = True
+
+class AsyncSigSciAPI(SigSciAPI):
+    """
+    AsyncSigSciAPI(concurrency=<int>)
+    Coroutine version of SigSciAPI. Endpoint methods return parsed data
+    instead of printing it, and at most `concurrency` requests are in
+    flight at once. build_query() and build_feed_query() are inherited
+    unchanged since they do no I/O.
+
+    Methods (coroutines):
+        authenticate()
+        query_api()
+        get_feed_requests()
+        iter_feed_pages()     (async generator)
+        iter_feed_requests()  (async generator)
+        get_agent_metrics()
+        get_configuration(EP), post_configuration(EP), delete_configuration(EP)
+        get/post/delete_whitelist_parameters(), _whitelist_paths(),
+        _whitelist(), _blacklist(), _redactions()
+        close()
+
+    Example:
+        async with AsyncSigSciAPI(concurrency=16) as sigsci:
+            sigsci.email = 'foo@bar.com'
+            sigsci.pword = 'c0mpl3x'
+            sigsci.corp  = 'foo_bar'
+            sigsci.site  = 'www.bar.com'
+
+            if await sigsci.authenticate():
+                async for record in sigsci.iter_feed_requests():
+                    print(record['remoteIP'])
+    """
+    concurrency = 8
+    semaphore   = None
+
+    def __init__(self, concurrency=None, **kwargs):
+        SigSciAPI.__init__(self, **kwargs)
+
+        if None != concurrency:
+            self.concurrency = concurrency
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def get_session(self):
+        """
+        AsyncSigSciAPI.get_session()
+
+        Returns the aiohttp.ClientSession shared by every API call, creating
+        it on first use. Must be called from a running event loop.
+        """
+
+        if None == self.session:
+            # unsafe allows cookies from ip address hosts, e.g. a local stub server.
+            self.session   = aiohttp.ClientSession(
+                connector  = aiohttp.TCPConnector(limit=int(self.pool_size)),
+                timeout    = aiohttp.ClientTimeout(sock_connect=float(self.connect_timeout), sock_read=float(self.read_timeout)),
+                cookie_jar = aiohttp.CookieJar(unsafe=True),
+                headers    = { 'User-Agent': self.ua })
+            self.semaphore = asyncio.Semaphore(int(self.concurrency))
+
+        return self.session
+
+    async def close(self):
+        """
+        AsyncSigSciAPI.close()
+
+        Closes the shared session and its connections.
+        """
+
+        if None != self.session:
+            await self.session.close()
+            self.session = None
+
+    def unsent(self, e):
+        # the connection could not be opened or timed out (ConnectionTimeoutError is aiohttp 3.10+), so nothing reached the server.
+        return isinstance(e, (aiohttp.ClientConnectorError, getattr(aiohttp, 'ConnectionTimeoutError', aiohttp.ClientConnectorError)))
+
+    async def send(self, method, url, **kwargs):
+        """
+        AsyncSigSciAPI.send(method=<string>, url=<string>)
+
+        Sends a request through the shared session, waiting for
+        SigSciAPI.rate and a free concurrency slot. Throttled, unavailable
+        and connection errors are retried with the backoff of
+        SigSciAPI.get_scheduler(), see RequestScheduler. Returns the last
+        response and its body.
+        """
+
+        session    = self.get_session()
+        scheduler  = self.get_scheduler()
+        idempotent = method.upper() in scheduler.IDEMPOTENT
+
+        for attempt in range(scheduler.retries + 1):
+            wait = scheduler.resume - time.time()
+
+            if 0 < wait:
+                await asyncio.sleep(wait)
+
+            if None != scheduler.limiter:
+                wait = scheduler.limiter.take()
+
+                while 0 < wait:
+                    await asyncio.sleep(wait)
+                    wait = scheduler.limiter.take()
+
+            scheduler.count('requests')
+
+            try:
+                async with self.semaphore:
+                    async with session.request(method, url, **kwargs) as r:
+                        body = await r.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                scheduler.count('errors')
+
+                # a request that reached the server (e.g. a read timeout or a dropped connection) may have been applied.
+                if attempt >= scheduler.retries or (not idempotent and not self.unsent(e)):
+                    scheduler.count('failed')
+                    raise
+
+                wait = scheduler.delay(attempt)
+            else:
+                throttled = 429 == r.status
+                retry     = r.status in scheduler.RETRY_STATUS or (idempotent and r.status in scheduler.IDEMPOTENT_STATUS)
+                wait      = scheduler.wait_time(r)
+
+                if 0 < wait:
+                    scheduler.pause(wait)
+
+                if retry:
+                    scheduler.count('throttled' if throttled else 'errors')
+
+                if not retry or attempt >= scheduler.retries:
+                    if retry:
+                        scheduler.count('failed')
+
+                    break
+
+                wait = max(wait, scheduler.delay(attempt))
+
+            scheduler.count('retried')
+            await asyncio.sleep(wait)
+
+        return r, body
+
+    async def request(self, method, url, **kwargs):
+        """
+        AsyncSigSciAPI.request(method=<string>, url=<string>)
+
+        Sends a request (see send()) and returns the parsed json body, or
+        None when a successful response has no body. Error responses
+        without a json body (e.g. a proxy's 502 page) raise ValueError
+        naming the status.
+        """
+
+        r, body = await self.send(method, url, **kwargs)
+
+        if 400 > r.status and not body.strip():
+            return None
+
+        try:
+            return self.get_codec().loads(body)
+        except ValueError:
+            raise ValueError('HTTP %d %s' % (r.status, r.reason))
+
+    async def fetch_json(self, method, url, **kwargs):
+        j = await self.request(method, url, **kwargs)
+
+        if isinstance(j, dict) and 'message' in j:
+            raise ValueError(j['message'])
+
+        return j
+
+    async def authenticate(self):
+        """
+        AsyncSigSciAPI.authenticate()
+
+        Before calling, set:
+            AsyncSigSciAPI.email
+            AsyncSigSciAPI.pword
+
+        Stores session cookie in:
+            AsyncSigSciAPI.session.cookie_jar
+        """
+
+        r, body  = await self.send('POST', self.base_url + self.LOGIN_EP, data = { 'email': self.email, 'password': self.pword }, allow_redirects = False)
+        location = r.headers.get('Location')
+
+        if location == '/':
+            return True
+        elif location == '/login?p=invalid':
+            print('Login failed!')
+            return False
+        else:
+            print('Unexpected error %s' % location)
+            return False
+
+    def site_url(self, EP):
+        return self.base_url + self.CORPS_EP + self.corp + self.SITES_EP + self.site + EP
+
+    async def fetch_query(self, query):
+        """
+        AsyncSigSciAPI.fetch_query(query=<string>)
+
+        Runs a single /requests search and returns the parsed response.
+        """
+
+        return await self.fetch_json('GET', self.site_url(self.REQEUSTS_EP), params = { 'q': str(query).strip(), 'limit': str(self.limit) })
+
+    async def fetch_slice(self, query):
+        """
+        AsyncSigSciAPI.fetch_slice(query=<string>)
+
+        Runs a /requests search like fetch_query(), following next.uri
+        while the search has fewer than AsyncSigSciAPI.limit records, see
+        SigSciAPI.fetch_slice().
+        """
+
+        j = await self.fetch_query(query)
+
+        while len(j['data']) < int(self.limit) and '' != ((j.get('next') or {}).get('uri') or '').strip():
+            page      = await self.fetch_json('GET', self.base + j['next']['uri'])
+            j['data'] = j['data'] + page['data']
+            j['next'] = page.get('next')
+
+        return j
+
+    async def query_api(self):
+        """
+        AsyncSigSciAPI.query_api()
+
+        Returns the parsed /requests response for AsyncSigSciAPI.query. When
+        AsyncSigSciAPI.parallel is above 1 the window is split into
+        AsyncSigSciAPI.slice long searches that run concurrently and are
+        merged in sort order, see SigSciAPI.merge_slices().
+        """
+
+        if 1 >= int(self.parallel):
+            return await self.fetch_query(self.query)
+
+        pages = await asyncio.gather(*[self.fetch_slice(query) for query in self.slice_queries()])
+
+        return self.merge_slices(pages)
+
+    async def iter_feed_pages(self):
+        """
+        AsyncSigSciAPI.iter_feed_pages()
+
+        Async generator yielding each feed page as a list of request
+        records, following next.uri until the window is exhausted.
+        """
+
+        self.build_feed_query()
+        self.feed_next = self.site_url(self.FEED_EP) + '?' + str(self.query).strip()
+
+        while None != self.feed_next:
+            self.feed_url  = self.feed_next
+            j              = await self.fetch_json('GET', self.feed_url)
+            next           = j.get('next') or {}
+            self.feed_next = self.base + next['uri'] if '' != next.get('uri', '').strip() else None
+
+            yield j['data']
+
+    async def iter_feed_requests(self):
+        """
+        AsyncSigSciAPI.iter_feed_requests()
+
+        Async generator yielding one feed request record at a time.
+        """
+
+        async for page in self.iter_feed_pages():
+            for record in page:
+                yield record
+
+    async def get_feed_requests(self):
+        """
+        AsyncSigSciAPI.get_feed_requests()
+
+        Returns every feed request record in the window as a list.
+        """
+
+        return [record async for record in self.iter_feed_requests()]
+
+    async def get_agent_metrics(self):
+        # /corps/{corpName}/sites/{siteName}/agents
+        return await self.fetch_json('GET', self.site_url(self.AGENTS_EP))
+
+    async def get_configuration(self, EP):
+        return await self.fetch_json('GET', self.site_url(EP))
+
+    def read_configuration(self):
+        with open(self.file) as data_file:
+            return json.load(data_file)
+
+    async def load_configuration(self, data):
+        # the file is read on a worker thread, not in the event loop.
+        if None == data:
+            data = await asyncio.get_event_loop().run_in_executor(None, self.read_configuration)
+
+        return data['data'] if isinstance(data, dict) else data
+
+    async def post_configuration(self, EP, data=None):
+        """
+        AsyncSigSciAPI.post_configuration(EP=<string>, data=<dict>)
+
+        Creates every item of data['data'] (default: read from
+        AsyncSigSciAPI.file) concurrently. Returns the created items.
+        """
+
+        items = []
+
+        for config in await self.load_configuration(data):
+            items.append(dict((k, v) for k, v in config.items() if k not in ('created', 'createdBy', 'id')))
+
+        return await asyncio.gather(*[self.fetch_json('POST', self.site_url(EP), json=config) for config in items])
+
+    async def delete_configuration(self, EP, data=None):
+        """
+        AsyncSigSciAPI.delete_configuration(EP=<string>, data=<dict>)
+
+        Deletes every item id of data['data'] (default: read from
+        AsyncSigSciAPI.file) concurrently. Returns the deleted ids.
+        """
+
+        ids = [config['id'] for config in await self.load_configuration(data)]
+
+        await asyncio.gather(*[self.fetch_json('DELETE', self.site_url(EP) + '/' + id) for id in ids])
+
+        return ids
+
+    async def get_whitelist_parameters(self):
+        return await self.get_configuration(self.WLPARAMS_EP)
+
+    async def post_whitelist_parameters(self, data=None):
+        return await self.post_configuration(self.WLPARAMS_EP, data)
+
+    async def delete_whitelist_parameters(self, data=None):
+        return await self.delete_configuration(self.WLPARAMS_EP, data)
+
+    async def get_whitelist_paths(self):
+        return await self.get_configuration(self.WLPATHS_EP)
+
+    async def post_whitelist_paths(self, data=None):
+        return await self.post_configuration(self.WLPATHS_EP, data)
+
+    async def delete_whitelist_paths(self, data=None):
+        return await self.delete_configuration(self.WLPATHS_EP, data)
+
+    async def get_whitelist(self):
+        return await self.get_configuration(self.WHITELIST_EP)
+
+    async def post_whitelist(self, data=None):
+        return await self.post_configuration(self.WHITELIST_EP, data)
+
+    async def delete_whitelist(self, data=None):
+        return await self.delete_configuration(self.WHITELIST_EP, data)
+
+    async def get_blacklist(self):
+        return await self.get_configuration(self.BLACKLIST_EP)
+
+    async def post_blacklist(self, data=None):
+        return await self.post_configuration(self.BLACKLIST_EP, data)
+
+    async def delete_blacklist(self, data=None):
+        return await self.delete_configuration(self.BLACKLIST_EP, data)
+
+    async def get_redactions(self):
+        return await self.get_configuration(self.REDACTIONS_EP)
+
+    async def post_redactions(self, data=None):
+        return await self.post_configuration(self.REDACTIONS_EP, data)
+
+    async def delete_redactions(self, data=None):
+        return await self.delete_configuration(self.REDACTIONS_EP, data)
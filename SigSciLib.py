@@ -0,0 +1,5313 @@
+# Signal Sciences Python API Client, module and command line
+# Science all the Signals!
+#
+# SigSci.py holds the configuration section and runs main() from this
+# module, which Python compiles once and caches, instead of on every run.
+
+import sys
+import os
+import argparse
+import atexit
+import importlib
+import io
+import json
+import codecs
+import threading
+import time
+import heapq
+import random
+import math
+import numbers
+import copy
+import itertools
+import zlib
+import signal
+from array import array
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+try:
+    from urlparse import urlsplit, parse_qsl
+except ImportError:
+    from urllib.parse import urlsplit, parse_qsl
+
+
+class LazyModule(object):
+    """
+    LazyModule(name=<string>)
+    
+    Stands in for a module that is imported on first attribute access,
+    so commands that never touch it, e.g. --list or --help, do not pay
+    for importing it. requests alone takes about a tenth of a second.
+    
+    Example:
+        requests = LazyModule('requests')
+        r        = requests.get(url) # imported here
+    """
+    
+    def __init__(self, name):
+        self.lazy_name   = name
+        self.lazy_module = None
+    
+    def __getattr__(self, attr):
+        # only called for attributes __init__ did not set.
+        if None == self.lazy_module:
+            self.lazy_module = importlib.import_module(self.lazy_name)
+        
+        return getattr(self.lazy_module, attr)
+
+def importable(module):
+    """
+    importable(module=<LazyModule>)
+    
+    Imports module if it was not yet, returns False when it is not
+    installed, e.g. the optional pyarrow.
+    """
+    
+    try:
+        module.__name__
+    except ImportError:
+        return False
+    
+    return True
+
+# imported by the commands that use them, see LazyModule.
+requests      = LazyModule('requests')
+http_adapters = LazyModule('requests.adapters')
+http_retry    = LazyModule('requests.packages.urllib3.util.retry')
+http_errors   = LazyModule('requests.packages.urllib3.exceptions')
+csv           = LazyModule('csv')
+sqlite3       = LazyModule('sqlite3')
+datetime      = LazyModule('datetime')
+calendar      = LazyModule('calendar')
+mp_pool       = LazyModule('multiprocessing.pool')
+socket        = LazyModule('socket')
+hashlib       = LazyModule('hashlib')
+orjson        = LazyModule('orjson')
+ujson         = LazyModule('ujson')
+pa            = LazyModule('pyarrow')
+pq            = LazyModule('pyarrow.parquet')
+
+class JSONCodec:
+    """
+    JSONCodec(name=<string>)
+    
+    Parses and serializes json with orjson or ujson when installed, and
+    the json module otherwise. name is auto (the fastest available),
+    orjson, ujson or json. loads() takes bytes, e.g. a response body,
+    so the body is never decoded to a string first; dumps() returns a
+    string. orjson and ujson output has no spaces between items.
+    
+    Example:
+        codec = JSONCodec()
+        j     = codec.loads(r.content)
+        print(codec.name, codec.dumps(j['data']))
+    """
+    
+    NAMES = ('orjson', 'ujson', 'json')
+    
+    def __init__(self, name='auto'):
+        self.requested = name
+        
+        # auto picks the library on first use, so the shared codecs do not import orjson at startup.
+        if 'auto' != name:
+            self.load()
+    
+    def __getattr__(self, attr):
+        # only called before load() set the attribute.
+        if attr not in ('name', 'loads', 'dumps'):
+            raise AttributeError(attr)
+        
+        self.load()
+        return getattr(self, attr)
+    
+    def load(self):
+        available = { 'orjson': orjson, 'ujson': ujson, 'json': json }
+        name      = self.requested
+        
+        if 'auto' == name:
+            name = [codec for codec in self.NAMES if importable(available[codec])][0]
+        
+        if name not in available:
+            raise ValueError('Invalid json codec: %s' % name)
+        
+        if not importable(available[name]):
+            raise ValueError('The %s codec requires the %s package.' % (name, name))
+        
+        if 'orjson' == name:
+            self.loads = orjson.loads
+            self.dumps = lambda value: orjson.dumps(value).decode('utf8')
+        elif 'ujson' == name:
+            self.loads = ujson.loads
+            self.dumps = lambda value: ujson.dumps(value, escape_forward_slashes=False)
+        else:
+            self.loads = json.loads
+            self.dumps = json.dumps
+        
+        self.name = name
+
+CODECS = {}
+
+def json_codec(name='auto'):
+    """
+    json_codec(name=<string>)
+    
+    Returns the shared JSONCodec for name, see JSONCodec.
+    """
+    
+    if name not in CODECS:
+        CODECS[name] = JSONCodec(name)
+    
+    return CODECS[name]
+
+class JSONStreamReader:
+    """
+    JSONStreamReader(fp=<file object>, chunk_size=<int>)
+    
+    Incrementally parses a json object from a file like object (e.g. a
+    streamed response's raw body) without reading it into one string.
+    
+    Example:
+        r = requests.get(url, stream=True)
+        for key, value in JSONStreamReader(r.raw).iter_object('data'):
+            print(key, value)
+    """
+    
+    WHITESPACE = ' \t\n\r'
+    
+    def __init__(self, fp, chunk_size=65536):
+        self.fp         = fp
+        self.chunk_size = chunk_size
+        self.decoder    = json.JSONDecoder()
+        self.utf8       = codecs.getincrementaldecoder('utf-8')()
+        self.buf        = u''
+        self.pos        = 0
+        self.eof        = False
+    
+    def fill(self):
+        if self.eof:
+            return False
+        
+        try:
+            chunk = self.fp.read(self.chunk_size, decode_content=True)
+        except TypeError:
+            chunk = self.fp.read(self.chunk_size)
+        
+        if not chunk:
+            self.eof = True
+        
+        # drop what has already been consumed so the buffer stays small.
+        self.buf = self.buf[self.pos:] + self.utf8.decode(chunk or b'', final=self.eof)
+        self.pos = 0
+        return True
+    
+    def at_end(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in self.WHITESPACE:
+                self.pos += 1
+            
+            if self.pos < len(self.buf):
+                return False
+            
+            if not self.fill():
+                return True
+    
+    def peek(self):
+        if self.at_end():
+            raise ValueError('Unexpected end of json data')
+        
+        return self.buf[self.pos]
+    
+    def expect(self, chars):
+        c = self.peek()
+        
+        if c not in chars:
+            raise ValueError('Expected %s at position %d, found %s' % (' or '.join(chars), self.pos, c))
+        
+        self.pos += 1
+        return c
+    
+    def value(self):
+        self.peek()
+        
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                
+                # a number at the end of the buffer may continue in the next chunk.
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            
+            self.fill()
+    
+    def iter_object(self, stream_key=None):
+        """
+        JSONStreamReader.iter_object(stream_key=<string>)
+        
+        Yields (key, value) for each member of the top level object. When
+        the value of stream_key is an array, (stream_key, item) is yielded
+        for every item instead of the whole array.
+        """
+        
+        self.expect('{')
+        
+        if '}' == self.peek():
+            self.pos += 1
+            return
+        
+        while True:
+            key = self.value()
+            self.expect(':')
+            
+            if stream_key == key and '[' == self.peek():
+                self.pos += 1
+                
+                if ']' == self.peek():
+                    self.pos += 1
+                else:
+                    while True:
+                        yield key, self.value()
+                        
+                        if ']' == self.expect(',]'):
+                            break
+            else:
+                yield key, self.value()
+            
+            if '}' == self.expect(',}'):
+                break
+        
+        # read to the end so a pooled connection is released for reuse.
+        while self.fill():
+            pass
+    
+    def iter_records(self):
+        """
+        JSONStreamReader.iter_records()
+        
+        Yields the records of one or more concatenated json documents, e.g.
+        a file that json, ndjson or query output was appended to. Arrays
+        and the data member of response objects are expanded to their items.
+        """
+        
+        while not self.at_end():
+            if '[' == self.peek():
+                self.pos += 1
+                
+                if ']' == self.peek():
+                    self.pos += 1
+                    continue
+                
+                while True:
+                    yield self.value()
+                    
+                    if ']' == self.expect(',]'):
+                        break
+            else:
+                value = self.value()
+                
+                if isinstance(value, dict) and isinstance(value.get('data'), list):
+                    for record in value['data']:
+                        yield record
+                else:
+                    yield value
+
+TIME_UNITS = { 's': 1, 'm': 60, 'h': 3600, 'd': 86400 }
+
+def parse_duration(value):
+    """
+    parse_duration(value=<string>)
+    
+    Returns the number of seconds in a duration such as 30s, 10m, 6h or 1d.
+    A plain number is taken as seconds.
+    """
+    
+    value = str(value).strip()
+    
+    if value[-1:] in TIME_UNITS:
+        return int(value[:-1]) * TIME_UNITS[value[-1]]
+    
+    return int(value)
+
+def parse_time(value, now):
+    """
+    parse_time(value=<string>, now=<int>)
+    
+    Returns a unix timestamp for a relative time (e.g. -6h) or a unix
+    timestamp. A leading = is ignored, as in --from =-6h.
+    """
+    
+    value = str(value).strip().lstrip('=')
+    
+    if value.startswith('-'):
+        return now - parse_duration(value[1:])
+    
+    return int(value)
+
+def epoch_time(value):
+    """
+    epoch_time(value=<object>)
+    
+    Returns a unix timestamp for a record timestamp, either a number or
+    an RFC 3339 string such as 2017-07-25T21:18:49Z.
+    """
+    
+    if None == value:
+        return None
+    
+    try:
+        return int(value)
+    except ValueError:
+        return calendar.timegm(datetime.datetime.strptime(str(value)[:19], '%Y-%m-%dT%H:%M:%S').timetuple())
+
+def iso_time(value):
+    """
+    iso_time(value=<int>)
+    
+    Returns a unix timestamp as an RFC 3339 string such as
+    2017-07-25T21:18:49Z.
+    """
+    
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(value))
+
+def parse_search(query):
+    """
+    parse_search(query=<string>)
+    
+    Returns the terms of a search query, e.g. as built by
+    SigSciAPI.make_query(), as a list of (field, value, negated) tuples.
+    """
+    
+    terms = []
+    
+    for term in str(query).split():
+        if ':' not in term:
+            raise ValueError('Invalid search term: %s' % term)
+        
+        field, value = term.split(':', 1)
+        negated      = field.startswith('-')
+        terms.append((field.lstrip('-'), value, negated))
+    
+    return terms
+
+class SortKey:
+    """
+    SortKey(value=<object>, reverse=<bool>)
+    
+    Wraps a sort key so heapq orders it descending when reverse is True.
+    """
+    
+    def __init__(self, value, reverse=False):
+        self.value   = value
+        self.reverse = reverse
+    
+    def __lt__(self, other):
+        return other.value < self.value if self.reverse else self.value < other.value
+    
+    def __eq__(self, other):
+        return self.value == other.value
+
+def merge_sorted(iterables, key, reverse=False):
+    """
+    merge_sorted(iterables=<list>, key=<function>, reverse=<bool>)
+    
+    k-way heap merge of already sorted iterables, yielding items in key
+    order (descending when reverse is True).
+    """
+    
+    heap = []
+    
+    for index, iterable in enumerate(iterables):
+        iterable = iter(iterable)
+        for item in iterable:
+            heap.append((SortKey(key(item), reverse), index, item, iterable))
+            break
+    
+    heapq.heapify(heap)
+    
+    while heap:
+        k, index, item, iterable = heap[0]
+        yield item
+        
+        for item in iterable:
+            heapq.heapreplace(heap, (SortKey(key(item), reverse), index, item, iterable))
+            break
+        else:
+            heapq.heappop(heap)
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+try:
+    intern = sys.intern
+except AttributeError:
+    pass
+
+def joined(value):
+    """
+    joined(value=<object>)
+    
+    Returns a list of plain values joined with '|' like the tags column of
+    REQUEST_COLUMNS, e.g. SQLI|XSS for tags.type. Other values are
+    returned as they are.
+    """
+    
+    if isinstance(value, list) and not [item for item in value if isinstance(item, (dict, list))]:
+        return '|'.join(csv_value(item) for item in value)
+    
+    return value
+
+def csv_value(value):
+    """
+    csv_value(value=<object>)
+    
+    Returns value as a csv cell, nested values as json and text utf8
+    encoded where the csv module needs bytes.
+    """
+    
+    if None == value:
+        return ''
+    
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    
+    if isinstance(value, text_type) and str is bytes:
+        return value.encode('utf8')
+    
+    return value if isinstance(value, str) else str(value)
+
+# csv/tsv columns of /requests and /feed/requests records
+REQUEST_COLUMNS = [
+    ('timestamp',         lambda row: row.get('timestamp')),
+    ('id',                lambda row: row.get('id')),
+    ('remoteIP',          lambda row: row.get('remoteIP')),
+    ('remoteCountryCode', lambda row: row.get('remoteCountryCode')),
+    ('path',              lambda row: row.get('path')),
+    ('tags',              lambda row: '|'.join(tag['type'] for tag in row.get('tags') or [])),
+    ('responseCode',      lambda row: row.get('responseCode')),
+    ('agentResponseCode', lambda row: row.get('agentResponseCode')),
+]
+
+# csv/tsv columns added to records pulled by SigSciFanout
+SITE_COLUMNS = [
+    ('corp',              lambda row: row.get('corp')),
+    ('site',              lambda row: row.get('site')),
+]
+
+# parquet columns of /requests and /feed/requests records, (name, type, function)
+REQUEST_FIELDS = [
+    ('timestamp',         'timestamp', lambda row: epoch_time(row.get('timestamp'))),
+    ('id',                'string',    lambda row: row.get('id')),
+    ('serverHostname',    'string',    lambda row: row.get('serverHostname')),
+    ('remoteIP',          'string',    lambda row: row.get('remoteIP')),
+    ('remoteCountryCode', 'string',    lambda row: row.get('remoteCountryCode')),
+    ('userAgent',         'string',    lambda row: row.get('userAgent')),
+    ('method',            'string',    lambda row: row.get('method')),
+    ('path',              'string',    lambda row: row.get('path')),
+    ('uri',               'string',    lambda row: row.get('uri')),
+    ('tags',              'tags',      lambda row: [tag['type'] for tag in row.get('tags') or []]),
+    ('responseCode',      'int32',     lambda row: row.get('responseCode')),
+    ('responseSize',      'int64',     lambda row: row.get('responseSize')),
+    ('responseMillis',    'int64',     lambda row: row.get('responseMillis')),
+    ('agentResponseCode', 'int32',     lambda row: row.get('agentResponseCode')),
+    ('headersIn',         'headers',   lambda row: [{ 'name': h[0], 'value': h[1] } for h in row.get('headersIn') or []]),
+    ('headersOut',        'headers',   lambda row: [{ 'name': h[0], 'value': h[1] } for h in row.get('headersOut') or []]),
+]
+
+# parquet columns added to records pulled by SigSciFanout
+SITE_FIELDS = [
+    ('corp',              'string',    lambda row: row.get('corp')),
+    ('site',              'string',    lambda row: row.get('site')),
+]
+
+# py2 json strings are unicode, which intern() does not take
+STRINGS = {}
+
+def share(value):
+    # one copy of each repeated string (country codes, tag types, server names, ...)
+    if isinstance(value, str):
+        return intern(value)
+    
+    return STRINGS.setdefault(value, value) if isinstance(value, text_type) else value
+
+def pack_ip(value):
+    """
+    pack_ip(value=<string>)
+    
+    Returns an IPv4 or IPv6 address as (integer, is IPv6), or (None, None)
+    when value is not an address.
+    """
+    
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            return int(codecs.encode(socket.inet_pton(family, str(value)), 'hex'), 16), socket.AF_INET6 == family
+        except (socket.error, ValueError, UnicodeError):
+            pass
+    
+    return None, None
+
+def unpack_ip(value, ipv6):
+    family, width = (socket.AF_INET6, 32) if ipv6 else (socket.AF_INET, 8)
+    return socket.inet_ntop(family, codecs.decode('%0*x' % (width, value), 'hex'))
+
+# zlib preset dictionary of the json common to request records, see CompactRequest.
+COMPACT_DICTIONARY = (
+    b'"headersOut":[["Content-Type","text/html; charset=utf-8"],["Content-Length","],["Cache-Control","no-cache"],'
+    b'["Set-Cookie","],["Server","nginx"],["Date","],["Location","],["Vary","Accept-Encoding"]],"headersIn":[["Host","],'
+    b'["User-Agent","Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/"],'
+    b'["Accept","text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"],["Accept-Encoding","gzip, deflate, br"],'
+    b'["Accept-Language","en-US,en;q=0.9"],["Cookie","],["Referer","https://],["X-Forwarded-For","],["Connection","keep-alive"],'
+    b'["Content-Type","application/x-www-form-urlencoded"],["Upgrade-Insecure-Requests","1"]],'
+    b'"tags":[{"type":"","location":"QUERYSTRING","value":"","detector":""}],"remoteHostname":"","scheme":"https","protocol":"HTTP/1.1"')
+
+def compress_compact(data):
+    # raw deflate with the preset dictionary, None where zlib has no preset dictionaries (py2)
+    try:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, COMPACT_DICTIONARY)
+    except TypeError:
+        return None
+    
+    return compressor.compress(data) + compressor.flush()
+
+def decompress_compact(data):
+    decompressor = zlib.decompressobj(-15, COMPACT_DICTIONARY)
+    return decompressor.decompress(data) + decompressor.flush()
+
+class CompactRequest(object):
+    """
+    CompactRequest(record=<dict>, codec=<JSONCodec>)
+    
+    Read only request record taking a fraction of the memory of the
+    parsed dict, for holding large result sets in process (see
+    SigSciAPI.compact). Slots replace the dict, repeated strings such as
+    country codes, server names and tag types are shared, the remote IP,
+    id and timestamp are packed into integers, and the rarely used
+    members (headers, tag details, anything unknown) are kept as one
+    json encoded bytes value, deflated against COMPACT_DICTIONARY, that
+    is decoded when they are read. So are null members, and members
+    whose packed form would not give back the same value, e.g. a
+    timestamp with fractions of a second or an upper case IPv6 address,
+    so to_dict() returns exactly what the API returned.
+    
+    Reads like the record dict: record['remoteIP'], record.get('tags'),
+    'headersIn' in record, keys(), items() and to_dict(). The packed
+    members are also attributes, e.g. record.timestamp (int) and
+    record.tag_types. Members may be added, e.g. corp and site by
+    SigSciFanout.
+    
+    Example:
+        sigsci.compact = True
+        records        = list(sigsci.iter_feed_requests())
+        print(sum(1 for record in records if 'SQLI' in record.tag_types))
+    """
+    
+    __slots__ = ('id', 'timestamp', 'ip', 'flags', 'country', 'server_hostname', 'server_name', 'user_agent', 'method',
+                 'path', 'uri', 'response_code', 'response_size', 'response_millis', 'agent_response_code', 'tag_types', 'rest', 'more')
+    
+    # record member, slot and whether its strings are shared
+    MEMBERS = [
+        ('remoteCountryCode', 'country',             True),
+        ('serverHostname',    'server_hostname',     True),
+        ('serverName',        'server_name',         True),
+        ('userAgent',         'user_agent',          True),
+        ('method',            'method',              True),
+        ('path',              'path',                True),
+        ('uri',               'uri',                 False),
+        ('responseCode',      'response_code',       False),
+        ('responseSize',      'response_size',       False),
+        ('responseMillis',    'response_millis',     False),
+        ('agentResponseCode', 'agent_response_code', False),
+    ]
+    SLOTS  = dict((name, slot) for name, slot, shared in MEMBERS)
+    PACKED = ['id', 'timestamp', 'remoteIP'] + [name for name, slot, shared in MEMBERS]
+    
+    # flags
+    HEX_ID    = 1 # id was 24 hex digits
+    TEXT_ID   = 2 # id kept as is
+    ISO_TIME  = 4 # timestamp was an RFC 3339 string
+    TEXT_IP   = 8 # remoteIP kept as is
+    IPV6      = 16
+    DEFLATED  = 32 # rest is compressed
+    TEXT_TIME = 64 # timestamp kept as is in rest
+    NULLS     = 128 # rest holds null packed members
+    
+    codec = json_codec()
+    
+    def __init__(self, record, codec=None):
+        record = dict(record)
+        flags  = 0
+        
+        # null members stay in rest, so they are not lost.
+        if [name for name in self.PACKED if name in record and None == record[name]]:
+            flags |= self.NULLS
+        
+        for name, slot, shared in self.MEMBERS:
+            value = record.pop(name) if None != record.get(name) else None
+            setattr(self, slot, share(value) if shared else value)
+        
+        id = record.pop('id') if None != record.get('id') else None
+        
+        if isinstance(id, (str, text_type)) and 24 == len(id) and id == id.lower():
+            try:
+                id     = int(id, 16)
+                flags |= self.HEX_ID
+            except ValueError:
+                flags |= self.TEXT_ID
+        else:
+            flags |= self.TEXT_ID
+        
+        timestamp = record.get('timestamp')
+        
+        if isinstance(timestamp, numbers.Integral) and not isinstance(timestamp, bool):
+            del record['timestamp']
+        elif None != timestamp and iso_time(epoch_time(timestamp)) == timestamp:
+            del record['timestamp']
+            flags |= self.ISO_TIME
+        elif None != timestamp:
+            flags |= self.TEXT_TIME
+        
+        ip, ipv6 = pack_ip(record.get('remoteIP')) if record.get('remoteIP') else (None, None)
+        
+        # inet_pton only accepts the one spelling of an IPv4 address, IPv6 has many.
+        if None != ip and (not ipv6 or unpack_ip(ip, ipv6) == record['remoteIP']):
+            del record['remoteIP']
+            flags |= self.IPV6 if ipv6 else 0
+        else:
+            ip     = record.pop('remoteIP') if None != record.get('remoteIP') else None
+            flags |= self.TEXT_IP
+        
+        rest = (codec or self.codec).dumps(record).encode('utf8') if record else None
+        
+        if None != rest:
+            deflated = compress_compact(rest)
+            
+            if None != deflated and len(deflated) < len(rest):
+                rest   = deflated
+                flags |= self.DEFLATED
+        
+        self.id        = id
+        self.timestamp = epoch_time(timestamp)
+        self.ip        = ip
+        self.flags     = flags
+        self.tag_types = tuple(share(tag.get('type')) for tag in record.get('tags') or [] if isinstance(tag, dict))
+        self.rest      = rest
+        self.more      = None
+    
+    def __getitem__(self, key):
+        value = self.get(key, KeyError)
+        
+        if KeyError is value:
+            raise KeyError(key)
+        
+        return value
+    
+    def __setitem__(self, key, value):
+        if None == self.more:
+            self.more = {}
+        
+        self.more[key] = value
+    
+    def __contains__(self, key):
+        return KeyError is not self.get(key, KeyError)
+    
+    def __repr__(self):
+        return 'CompactRequest(%r)' % self.to_dict()
+    
+    def packed(self, key):
+        # packed members as they were in the record, KeyError when absent
+        if 'id' == key:
+            return '%024x' % self.id if self.flags & self.HEX_ID else self.id
+        
+        elif 'timestamp' == key:
+            if self.flags & self.TEXT_TIME:
+                return self.extra()['timestamp']
+            
+            if None != self.timestamp and self.flags & self.ISO_TIME:
+                return iso_time(self.timestamp)
+            
+            return self.timestamp
+        
+        elif 'remoteIP' == key:
+            return self.ip if self.flags & self.TEXT_IP else unpack_ip(self.ip, self.flags & self.IPV6)
+        
+        return getattr(self, self.SLOTS[key])
+    
+    def get(self, key, default=None):
+        if None != self.more and key in self.more:
+            return self.more[key]
+        
+        if key in self.SLOTS or key in self.PACKED:
+            value = self.packed(key)
+            
+            if None != value or not self.flags & self.NULLS:
+                return default if None == value else value
+        
+        return self.extra().get(key, default)
+    
+    def extra(self):
+        """
+        CompactRequest.extra()
+        
+        Returns the rarely used members (e.g. headersIn, tags) decoded.
+        """
+        
+        if None == self.rest:
+            return {}
+        
+        return self.codec.loads(decompress_compact(self.rest) if self.flags & self.DEFLATED else self.rest)
+    
+    def keys(self):
+        return list(self.to_dict().keys())
+    
+    def items(self):
+        return list(self.to_dict().items())
+    
+    def to_dict(self):
+        """
+        CompactRequest.to_dict()
+        
+        Returns the record as the API returned it, plus any added members.
+        """
+        
+        record = {}
+        
+        for name in self.PACKED:
+            value = self.packed(name)
+            
+            if None != value:
+                record[name] = value
+        
+        record.update(self.extra())
+        record.update(self.more or {})
+        
+        return record
+
+def plain_record(record):
+    # the dict of a CompactRequest, for json encoding
+    return record.to_dict() if isinstance(record, CompactRequest) else record
+
+def field_getter(path):
+    """
+    field_getter(path=<string>)
+    
+    Returns a function reading a dotted path, e.g. tags.type, from a
+    record. Lists along the path are mapped, so tags.type is the list of
+    tag types, and a name selects the values of [name, value] pairs, so
+    headersIn.Host is the list of Host headers. Missing members are None.
+    """
+    
+    key, _, rest = path.partition('.')
+    
+    if not rest:
+        return lambda row: row.get(key) if isinstance(row, (dict, CompactRequest)) else None
+    
+    get  = field_getter(rest)
+    name = rest.partition('.')[0].lower()
+    
+    def member(value):
+        if isinstance(value, list):
+            # [name, value] pairs, e.g. headersIn
+            if value and isinstance(value[0], list):
+                return [pair[1] for pair in value if name == str(pair[0]).lower()]
+            
+            return [get(item) for item in value]
+        
+        return get(value)
+    
+    return lambda row: member(row.get(key)) if isinstance(row, (dict, CompactRequest)) else None
+
+def parse_fields(value):
+    """
+    parse_fields(value=<string>)
+    
+    Returns the (name, function) columns of a projection such as
+    'timestamp,remoteIP,tags.type' (or a list of paths), see
+    field_getter(). None when value is empty.
+    """
+    
+    if not value:
+        return None
+    
+    paths = value.split(',') if isinstance(value, (str, text_type)) else value
+    
+    return [(path.strip(), field_getter(path.strip())) for path in paths if path.strip()]
+
+def project(record, projection):
+    # a record trimmed to the (name, function) columns of parse_fields()
+    return dict((name, get(record)) for name, get in projection)
+
+class RowBuffer:
+    """
+    RowBuffer()
+    
+    File like target for csv.writer that collects the text of each row.
+    """
+    
+    def __init__(self):
+        self.parts = []
+    
+    def write(self, text):
+        self.parts.append(text)
+    
+    def take(self):
+        text, self.parts = ''.join(self.parts), []
+        return text
+
+class RecordWriter:
+    """
+    RecordWriter(fp=<file object>, columns=<list>, flush_size=<int>)
+    
+    Base of the streaming output writers. Records are formatted one at a
+    time into a buffer that is written to fp whenever it holds flush_size
+    characters, so memory use does not depend on the number of records.
+    
+    With projection set (see parse_fields()) each record is trimmed to
+    those fields before it is formatted.
+    
+    Example:
+        writer = NDJSONWriter(open('/tmp/feed.json', 'a'))
+        writer.write_all(sigsci.iter_feed_requests())
+        writer.close()
+    """
+    
+    metrics    = None
+    codec      = json_codec()
+    projection = None
+    
+    def __init__(self, fp, columns=None, flush_size=65536):
+        self.fp         = fp
+        self.columns    = columns
+        self.flush_size = flush_size
+        self.buffer     = []
+        self.buffered   = 0
+        self.count      = 0
+        self.busy       = 0.0
+        self.begin()
+    
+    def begin(self):
+        pass
+    
+    def end(self):
+        pass
+    
+    def format(self, record):
+        raise NotImplementedError
+    
+    def emit(self, text):
+        self.buffer.append(text)
+        self.buffered += len(text)
+        
+        if self.buffered >= self.flush_size:
+            self.flush()
+    
+    def flush(self):
+        if self.buffer:
+            self.fp.write(''.join(self.buffer))
+            self.fp.flush()
+            self.buffer   = []
+            self.buffered = 0
+    
+    def write(self, record):
+        if None != self.projection:
+            record = project(record, self.projection)
+        
+        if None == self.metrics:
+            self.emit(self.format(record))
+        else:
+            # only time spent writing, records may be parsed from a stream as they are read.
+            start = time.time()
+            self.emit(self.format(record))
+            self.busy += time.time() - start
+        
+        self.count += 1
+    
+    def report(self, start):
+        if None != self.metrics:
+            self.metrics.observe('output', 'write', self.busy + time.time() - start)
+            self.metrics.count('records', self.count)
+    
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+    
+    def close(self):
+        """
+        RecordWriter.close()
+        
+        Writes any trailer, flushes the buffer and closes fp unless it is
+        stdout.
+        """
+        
+        start = time.time()
+        self.end()
+        self.flush()
+        
+        if self.fp not in (sys.stdout, getattr(sys.stdout, 'buffer', None)):
+            self.fp.close()
+        
+        self.report(start)
+
+class JSONArrayWriter(RecordWriter):
+    """
+    JSONArrayWriter(fp=<file object>, columns=<list>, flush_size=<int>)
+    
+    Writes records as a single json array.
+    """
+    
+    def begin(self):
+        self.emit('[')
+    
+    def end(self):
+        self.emit(']\n')
+    
+    def format(self, record):
+        return ('%s' if 0 == self.count else ', %s') % self.codec.dumps(plain_record(record))
+
+class NDJSONWriter(RecordWriter):
+    """
+    NDJSONWriter(fp=<file object>, columns=<list>, flush_size=<int>)
+    
+    Writes one json record per line.
+    """
+    
+    def format(self, record):
+        return self.codec.dumps(plain_record(record)) + '\n'
+
+class CSVWriter(RecordWriter):
+    """
+    CSVWriter(fp=<file object>, columns=<list>, flush_size=<int>)
+    
+    Writes records as csv rows. columns is a list of (name, function)
+    pairs, e.g. REQUEST_COLUMNS. Without columns the keys of the first
+    record are used, and a header row is written, as it is with header
+    set, e.g. for columns chosen with --fields.
+    """
+    
+    delimiter = ','
+    header    = False
+    
+    def begin(self):
+        self.row = RowBuffer()
+        self.csv = csv.writer(self.row, delimiter=self.delimiter)
+    
+    def format(self, record):
+        if None == self.columns:
+            self.columns = [(key, lambda row, key=key: row.get(key)) for key in sorted(record)]
+            self.header  = True
+        
+        if self.header:
+            self.csv.writerow([csv_value(name) for name, value in self.columns])
+            self.header = False
+        
+        self.csv.writerow([csv_value(value(record)) for name, value in self.columns])
+        
+        return self.row.take()
+
+class TSVWriter(CSVWriter):
+    """
+    TSVWriter(fp=<file object>, columns=<list>, flush_size=<int>)
+    
+    Writes records as tab separated rows, see CSVWriter.
+    """
+    
+    delimiter = '\t'
+
+class RawPageWriter(RecordWriter):
+    """
+    RawPageWriter(fp=<binary file object>)
+    
+    Writes each feed page as received, one json response per line, so the
+    records are never parsed or serialized. Pages are the bodies returned
+    by SigSciAPI.fetch_feed_page(), and count counts pages.
+    """
+    
+    def write(self, page):
+        start = time.time()
+        self.fp.write(page.strip() + b'\n')
+        self.fp.flush()
+        self.busy  += time.time() - start
+        self.count += 1
+    
+    def report(self, start):
+        if None != self.metrics:
+            self.metrics.observe('output', 'write', self.busy + time.time() - start)
+
+def arrow_type(name):
+    """
+    arrow_type(name=<string>)
+    
+    Returns the pyarrow type of a REQUEST_FIELDS type name, None lets
+    pyarrow infer the type.
+    """
+    
+    if None == name:
+        return None
+    
+    return {
+        'string':    pa.string(),
+        'int32':     pa.int32(),
+        'int64':     pa.int64(),
+        'timestamp': pa.timestamp('s', tz='UTC'),
+        'tags':      pa.list_(pa.string()),
+        'headers':   pa.list_(pa.struct([('name', pa.string()), ('value', pa.string())])),
+    }[name]
+
+class ParquetWriter(RecordWriter):
+    """
+    ParquetWriter(fp=<file object>, columns=<list>, flush_size=<int>, compression=<string>)
+    
+    Writes records to a parquet file as typed columns, one row group
+    every flush_size records. columns is a list of (name, type, function)
+    fields, e.g. REQUEST_FIELDS. Without columns the keys of the first
+    record are used and pyarrow infers the types. Requires pyarrow.
+    
+    Example:
+        writer = ParquetWriter(open('/tmp/feed.parquet', 'wb'), REQUEST_FIELDS)
+        writer.write_all(sigsci.iter_feed_requests())
+        writer.close()
+    """
+    
+    compression = 'snappy'
+    
+    def __init__(self, fp, columns=None, flush_size=65536, compression=None):
+        if not importable(pa):
+            raise ValueError('Parquet output requires pyarrow (pip install pyarrow).')
+        
+        if None != compression:
+            self.compression = compression
+        
+        self.parquet = None
+        self.schema  = None
+        RecordWriter.__init__(self, fp, columns, flush_size)
+    
+    def format(self, record):
+        if None == self.columns:
+            self.columns = [(key, None, lambda row, key=key: row.get(key)) for key in sorted(record)]
+        
+        return [value(record) for name, type, value in self.columns]
+    
+    def emit(self, row):
+        self.buffer.append(row)
+        self.buffered += 1
+        
+        if self.buffered >= self.flush_size:
+            self.flush()
+    
+    def end(self):
+        # typed columns give a readable file even without records.
+        if None == self.parquet and self.columns and None not in [type for name, type, value in self.columns]:
+            self.write_group([])
+    
+    def flush(self):
+        if self.buffer:
+            self.write_group(self.buffer)
+            self.buffer   = []
+            self.buffered = 0
+    
+    def write_group(self, rows):
+        names  = [name for name, type, value in self.columns]
+        
+        if None == self.parquet:
+            types = [arrow_type(type) for name, type, value in self.columns]
+        else:
+            types = [field.type for field in self.schema]
+        
+        arrays = [pa.array([row[i] for row in rows], type=types[i]) for i in range(len(names))]
+        table  = pa.Table.from_arrays(arrays, names=names)
+        
+        if None == self.parquet:
+            self.schema  = table.schema
+            self.parquet = pq.ParquetWriter(self.fp, self.schema, compression=self.compression)
+        
+        self.parquet.write_table(table)
+    
+    def close(self):
+        """
+        ParquetWriter.close()
+        
+        Writes the remaining rows and the parquet footer, then closes fp.
+        """
+        
+        start = time.time()
+        self.flush()
+        self.end()
+        
+        if None != self.parquet:
+            self.parquet.close()
+        
+        self.fp.close()
+        self.report(start)
+
+WRITERS = { 'json': JSONArrayWriter, 'ndjson': NDJSONWriter, 'csv': CSVWriter, 'tsv': TSVWriter }
+
+MASK64 = (1 << 64) - 1
+
+def hash64(value):
+    """
+    hash64(value=<object>)
+    
+    Returns a well mixed 64 bit hash of a hashable value (hash() with the
+    splitmix64 finalizer, since ints hash to themselves). Stable within a
+    process only.
+    """
+    
+    h = hash(value) & MASK64
+    h = (h ^ (h >> 30)) * 0xbf58476d1ce4e5b9 & MASK64
+    h = (h ^ (h >> 27)) * 0x94d049bb133111eb & MASK64
+    return h ^ (h >> 31)
+
+class CountMinSketch:
+    """
+    CountMinSketch(width=<int>, depth=<int>)
+    
+    Approximate counts of any number of keys in depth rows of width
+    counters. An estimate is never below the true count and above it by
+    at most e/width of the total with probability 1 - e^-depth. Keys are
+    given as hash64() values.
+    """
+    
+    def __init__(self, width=16384, depth=4):
+        self.width = width
+        self.rows  = [array('L', [0]) * width for i in range(depth)]
+    
+    def add(self, h, amount=1):
+        # double hashing, row i uses both halves of the 64 bit hash
+        low, high = h & 0xffffffff, (h >> 32) | 1
+        
+        for i, row in enumerate(self.rows):
+            row[(low + i * high) % self.width] += amount
+    
+    def estimate(self, h):
+        low, high = h & 0xffffffff, (h >> 32) | 1
+        return min(row[(low + i * high) % self.width] for i, row in enumerate(self.rows))
+
+class SpaceSaving:
+    """
+    SpaceSaving(capacity=<int>)
+    
+    Heavy hitters of a stream in at most capacity counters. Counts are
+    exact until more than capacity distinct keys are seen; after that the
+    least counted key is replaced and its count, the most the new key can
+    be over counted by, is kept as the new key's error. Every key seen
+    more than total/capacity times is kept.
+    """
+    
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self.counts   = {}
+        self.heap     = []
+        self.serial   = 0
+    
+    def push(self, count, key):
+        # the serial orders equal counts, keys of different types do not compare
+        self.serial += 1
+        heapq.heappush(self.heap, (count, self.serial, key))
+    
+    def add(self, key, amount=1):
+        entry = self.counts.get(key)
+        
+        if None != entry:
+            entry[0] += amount
+            return
+        
+        if len(self.counts) < self.capacity:
+            self.counts[key] = [amount, 0]
+            self.push(amount, key)
+            return
+        
+        # heap counts lag behind the increments, refresh them until the least one is current.
+        while True:
+            count, serial, least = heapq.heappop(self.heap)
+            
+            if count == self.counts[least][0]:
+                break
+            
+            self.push(self.counts[least][0], least)
+        
+        del self.counts[least]
+        self.counts[key] = [count + amount, count]
+        self.push(count + amount, key)
+    
+    def top(self, n):
+        """
+        SpaceSaving.top(n=<int>)
+        
+        Returns the n most counted keys as (key, count, error), count
+        descending.
+        """
+        
+        return [(key, count, error) for key, (count, error) in heapq.nlargest(n, self.counts.items(), key=lambda item: item[1][0])]
+
+class HyperLogLog:
+    """
+    HyperLogLog(precision=<int>)
+    
+    Distinct count estimate in 2^precision one byte registers, about
+    1.04/sqrt(2^precision) relative error (0.8% at the default 14, in
+    16KB). Keys are given as hash64() values.
+    """
+    
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+    
+    def add(self, h):
+        bits  = 64 - self.precision
+        index = h >> bits
+        rank  = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def estimate(self):
+        m        = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -rank for rank in self.registers)
+        zeros    = self.registers.count(b'\x00')
+        
+        # linear counting is more accurate for small counts
+        if estimate <= 2.5 * m and zeros:
+            return int(round(m * math.log(float(m) / zeros)))
+        
+        return int(round(estimate))
+
+class Aggregate:
+    """
+    Aggregate(spec=<string>, capacity=<int>)
+    
+    Group by count of a record stream in fixed memory. spec is one or more
+    comma separated dotted paths (see field_getter()), e.g. remoteIP,
+    tags.type or path,tags.type. List members count once per item, so a
+    record with two tags counts for both; records without the member
+    count under None.
+    
+    The top keys are kept in a SpaceSaving of capacity counters, with a
+    CountMinSketch tightening the counts of keys that replaced others, and
+    a HyperLogLog estimates the number of distinct keys.
+    
+    Example:
+        aggregate = Aggregate('tags.type')
+        for record in sigsci.iter_feed_requests():
+            aggregate.add(record)
+        print(aggregate.top(10), aggregate.distinct.estimate())
+    """
+    
+    def __init__(self, spec, capacity=10000):
+        self.spec     = spec
+        self.getters  = [field_getter(path.strip()) for path in spec.split(',') if path.strip()]
+        self.counts   = SpaceSaving(capacity)
+        self.sketch   = CountMinSketch()
+        self.distinct = HyperLogLog()
+    
+    def keys(self, record):
+        if 1 == len(self.getters):
+            value = self.getters[0](record)
+            return [self.key(item) for item in value] if isinstance(value, list) else [self.key(value)]
+        
+        keys = [()]
+        
+        for get in self.getters:
+            value  = get(record)
+            values = value if isinstance(value, list) else [value]
+            
+            keys   = [key + (self.key(item),) for key in keys for item in values]
+        
+        return keys
+    
+    def key(self, value):
+        # nested values, e.g. the tags member, count by their json
+        return json.dumps(value, sort_keys=True) if isinstance(value, (dict, list)) else value
+    
+    def add(self, record):
+        for key in self.keys(record):
+            h = hash64(key)
+            self.counts.add(key)
+            self.sketch.add(h)
+            self.distinct.add(h)
+    
+    def top(self, n):
+        """
+        Aggregate.top(n=<int>)
+        
+        Returns the n most counted keys as (key, count, error). error is
+        how much count may be over the true count, 0 when it is exact.
+        """
+        
+        rows = []
+        
+        for key, count, error in self.counts.top(n):
+            estimate = min(count, self.sketch.estimate(hash64(key)))
+            rows.append((list(key) if isinstance(key, tuple) else key, estimate, estimate - (count - error)))
+        
+        return rows
+
+class SlidingWindowCounter:
+    """
+    SlidingWindowCounter(window=<int>, buckets=<int>)
+    
+    Counts per key over the last window seconds of event time, in buckets
+    of window/buckets seconds. Whole buckets leave the window as newer
+    events arrive, so a count may include up to one bucket more than the
+    window. Memory holds only the keys counted within the window.
+    
+    Example:
+        counter = SlidingWindowCounter(600)
+        if counter.add(('10.0.0.1', 'SQLI'), record_time) >= 10:
+            print('over threshold')
+    """
+    
+    def __init__(self, window, buckets=10):
+        self.width   = max(1, int(window) // buckets)
+        self.buckets = buckets
+        self.slots   = {}
+        self.totals  = {}
+        self.newest  = None
+    
+    def advance(self, bucket):
+        self.newest = bucket
+        
+        for old in [old for old in self.slots if old <= bucket - self.buckets]:
+            for key, count in self.slots.pop(old).items():
+                left = self.totals[key] - count
+                
+                if left:
+                    self.totals[key] = left
+                else:
+                    del self.totals[key]
+    
+    def add(self, key, timestamp, amount=1):
+        """
+        SlidingWindowCounter.add(key=<hashable>, timestamp=<int>, amount=<int>)
+        
+        Counts key at timestamp and returns its count within the window,
+        0 for events older than the window.
+        """
+        
+        bucket = int(timestamp) // self.width
+        
+        if None == self.newest or bucket > self.newest:
+            self.advance(bucket)
+        elif bucket <= self.newest - self.buckets:
+            return 0
+        
+        counts = self.slots.get(bucket)
+        
+        if None == counts:
+            counts = self.slots[bucket] = {}
+        
+        counts[key] = counts.get(key, 0) + amount
+        total       = self.totals[key] = self.totals.get(key, 0) + amount
+        
+        return total
+    
+    def count(self, key):
+        return self.totals.get(key, 0)
+
+class BlacklistCandidateWriter(RecordWriter):
+    """
+    BlacklistCandidateWriter(path=<string>, thresholds=<dict>, window=<string>, expires=<string>, listed=<callable>)
+    
+    Reads feed records instead of writing them, counting the tags in
+    thresholds per remote IP in a SlidingWindowCounter over window (e.g.
+    10m) of request time. An IP becomes a candidate once any tag reaches
+    its threshold within the window, and stays one.
+    
+    The candidates are written as a blacklist payload, the same format as
+    --blacklist output, ready for --blacklist-add or --blacklist-sync:
+        { 'data': [{ 'source', 'note', 'expires' }] }
+    leaving out the sources listed() returns (e.g. the current
+    blacklist). path (replaced atomically) is rewritten on every flush()
+    that follows new candidates, and stdout is written on close.
+    
+    Example:
+        writer = BlacklistCandidateWriter('/tmp/candidates.json', { 'SQLI': 10 }, '10m', '24h')
+        writer.write_all(sigsci.iter_feed_requests())
+        writer.close()
+    """
+    
+    def __init__(self, path, thresholds, window='10m', expires='24h', listed=None):
+        self.path       = path
+        self.thresholds = thresholds
+        self.window     = window
+        self.expires    = expires
+        self.listed     = listed
+        self.counter    = SlidingWindowCounter(parse_duration(window))
+        self.tags       = set(thresholds)
+        self.candidates = OrderedDict()
+        self.changed    = True
+        RecordWriter.__init__(self, None)
+    
+    def write(self, record):
+        start     = time.time()
+        ip        = record.get('remoteIP')
+        timestamp = epoch_time(record.get('timestamp'))
+        
+        # each tag counts once per request
+        for tag in self.tags.intersection(tag.get('type') for tag in record.get('tags') or []):
+            hits = self.counter.add((ip, tag), start if None == timestamp else timestamp)
+            
+            if hits >= self.thresholds[tag]:
+                candidate = self.candidates.setdefault(ip, {})
+                
+                if hits > candidate.get(tag, 0):
+                    candidate[tag] = hits
+                    self.changed   = True
+        
+        self.busy  += time.time() - start
+        self.count += 1
+    
+    def payload(self):
+        """
+        BlacklistCandidateWriter.payload()
+        
+        Returns the blacklist payload of the candidates so far.
+        """
+        
+        listed  = self.listed() if None != self.listed else set()
+        expires = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() + parse_duration(self.expires))) if self.expires else ''
+        data    = []
+        
+        for ip, hits in self.candidates.items():
+            if ip not in listed:
+                note = ' '.join('%s=%d' % (tag, hits[tag]) for tag in sorted(hits))
+                data.append({ 'source': ip, 'note': 'Blacklist candidate: %s in %s' % (note, self.window), 'expires': expires })
+        
+        return { 'data': data }
+    
+    def flush(self):
+        if None == self.path or not self.changed:
+            return
+        
+        tmp = '%s.%d.tmp' % (self.path, os.getpid())
+        
+        with open(tmp, 'w') as outfile:
+            outfile.write(json.dumps(self.payload(), indent=4, sort_keys=True) + '\n')
+        
+        os.rename(tmp, self.path)
+        self.changed = False
+    
+    def close(self):
+        start = time.time()
+        
+        if None == self.path:
+            print(json.dumps(self.payload(), indent=4, sort_keys=True))
+        else:
+            self.changed = True
+            self.flush()
+        
+        self.report(start)
+
+# csv/tsv columns of AggregateWriter rows
+AGGREGATE_COLUMNS = [(name, lambda row, name=name: row.get(name)) for name in ('group', 'rank', 'key', 'count', 'error', 'distinct')]
+
+class AggregateWriter(RecordWriter):
+    """
+    AggregateWriter(fp=<file object>, specs=<list>, top=<int>, capacity=<int>, format=<string>, flush_size=<int>)
+    
+    Counts records into one Aggregate per spec instead of writing them,
+    and a HyperLogLog of remote IPs. Records are only read as they
+    stream by, so memory does not grow with their number. On close the
+    top rows of every aggregate are written to fp: for json one document
+        { 'records', 'distinctIPs', 'aggregates': [{ 'group', 'distinct', 'top': [{ 'key', 'count', 'error' }] }] }
+    and otherwise one row per key (see AGGREGATE_COLUMNS).
+    
+    Example:
+        writer = AggregateWriter(sys.stdout, ['remoteIP', 'tags.type'], 10)
+        writer.write_all(sigsci.iter_feed_requests())
+        writer.close()
+    """
+    
+    def __init__(self, fp, specs, top=20, capacity=10000, format='json', flush_size=65536):
+        self.aggregates = [Aggregate(spec, capacity) for spec in specs]
+        self.ips        = HyperLogLog()
+        self.top        = top
+        self.output     = format
+        RecordWriter.__init__(self, fp, AGGREGATE_COLUMNS, flush_size)
+    
+    def write(self, record):
+        start = time.time()
+        
+        for aggregate in self.aggregates:
+            aggregate.add(record)
+        
+        ip = record.get('remoteIP')
+        
+        if None != ip:
+            self.ips.add(hash64(ip))
+        
+        self.busy  += time.time() - start
+        self.count += 1
+    
+    def results(self):
+        """
+        AggregateWriter.results()
+        
+        Returns the json document of the counts so far.
+        """
+        
+        aggregates = []
+        
+        for aggregate in self.aggregates:
+            top = [{ 'key': key, 'count': count, 'error': error } for key, count, error in aggregate.top(self.top)]
+            aggregates.append({ 'group': aggregate.spec, 'distinct': aggregate.distinct.estimate(), 'top': top })
+        
+        return { 'records': self.count, 'distinctIPs': self.ips.estimate(), 'aggregates': aggregates }
+    
+    def end(self):
+        results = self.results()
+        
+        if 'json' == self.output:
+            self.emit(self.codec.dumps(results) + '\n')
+            return
+        
+        rows = WRITERS[self.output](None, self.columns)
+        
+        for aggregate in results['aggregates']:
+            for rank, row in enumerate(aggregate['top']):
+                self.emit(rows.format(OrderedDict([('group', aggregate['group']), ('rank', rank + 1), ('key', row['key']), ('count', row['count']),
+                                                   ('error', row['error']), ('distinct', aggregate['distinct'])])))
+
+class FeedPipeline:
+    """
+    FeedPipeline(sigsci=<SigSciAPI>, prefetch=<int>)
+    
+    Overlaps feed page fetching with output writing. A fetch thread follows
+    next.uri and queues up to `prefetch` pages ahead, blocking when the
+    queue is full, while a writer thread drains the queue into a sink.
+    The first error in either thread stops both and is raised from run().
+    
+    Example:
+        pipeline = FeedPipeline(sigsci, prefetch=4)
+        pipeline.run(lambda records: outfile.write(json.dumps(records)))
+        print(pipeline.stats)
+    """
+    
+    DONE   = object()
+    url    = None
+    commit = None
+    
+    def __init__(self, sigsci, prefetch=4):
+        self.sigsci   = sigsci
+        self.prefetch = prefetch
+        self.queue    = queue.Queue(maxsize=prefetch)
+        self.stop     = threading.Event()
+        self.errors   = []
+        self.stats    = { 'pages': 0, 'records': 0, 'max_queue_depth': 0, 'avg_queue_depth': 0.0,
+                          'fetch_wait': 0.0, 'write_wait': 0.0 }
+    
+    def put(self, item):
+        start = time.time()
+        
+        # block while the writer is behind, unless the pipeline is stopping.
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        
+        self.stats['fetch_wait'] += time.time() - start
+    
+    def fetch(self):
+        try:
+            for page in self.sigsci.iter_feed_pages(self.url):
+                # a page dropped on shutdown has not been committed, it is fetched again on resume.
+                if self.stop.is_set() or self.sigsci.stopped():
+                    return
+                
+                self.put((page, self.sigsci.feed_next))
+                depth = self.queue.qsize()
+                self.stats['pages']          += 1
+                self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], depth)
+                self.stats['avg_queue_depth'] += (depth - self.stats['avg_queue_depth']) / self.stats['pages']
+        
+        except Exception as e:
+            self.errors.append(e)
+            self.stop.set()
+        
+        finally:
+            self.put(self.DONE)
+    
+    def write(self, sink):
+        try:
+            while True:
+                start = time.time()
+                
+                try:
+                    page = self.queue.get(timeout=0.1)
+                except queue.Empty:
+                    if self.stop.is_set():
+                        return
+                    continue
+                finally:
+                    self.stats['write_wait'] += time.time() - start
+                
+                if page is self.DONE:
+                    return
+                
+                page, next = page
+                sink(page)
+                
+                # unparsed pages are bytes, see SigSciAPI.raw_pages.
+                if not self.sigsci.raw_pages:
+                    self.stats['records'] += len(page)
+                
+                if None != self.commit:
+                    self.commit(next)
+        
+        except Exception as e:
+            self.errors.append(e)
+            self.stop.set()
+    
+    def run(self, sink, url=None, commit=None):
+        """
+        FeedPipeline.run(sink=<callable>, url=<string>, commit=<callable>)
+        
+        Fetches every feed page, from url when given, and calls sink(records)
+        for each one, in order. After a page is written commit(next_url) is
+        called when given. Returns FeedPipeline.stats.
+        """
+        
+        self.url    = url
+        self.commit = commit
+        
+        threads = [threading.Thread(target=self.fetch), threading.Thread(target=self.write, args=(sink,))]
+        
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.1)
+        except BaseException:
+            self.stop.set()
+            raise
+        
+        self.sigsci.feed_stats = self.stats
+        
+        if self.errors:
+            raise self.errors[0]
+        
+        return self.stats
+
+class RateLimiter:
+    """
+    RateLimiter(rate=<float>, burst=<int>)
+    
+    Thread safe token bucket allowing `rate` acquisitions per second with
+    bursts of up to `burst`.
+    """
+    
+    def __init__(self, rate, burst=1):
+        self.rate   = rate
+        self.burst  = burst
+        self.tokens = float(burst)
+        self.last   = time.time()
+        self.lock   = threading.Lock()
+    
+    def take(self):
+        # takes a token and returns 0, or returns the seconds until one is available.
+        with self.lock:
+            now         = time.time()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last   = now
+            
+            if 1 <= self.tokens:
+                self.tokens -= 1
+                return 0
+            
+            return (1 - self.tokens) / self.rate
+    
+    def acquire(self):
+        wait = self.take()
+        
+        while 0 < wait:
+            time.sleep(wait)
+            wait = self.take()
+
+def response_json(r, codec=None):
+    """
+    response_json(r=<requests.Response>, codec=<JSONCodec>)
+    
+    Returns the json body of r parsed from its bytes by codec (default:
+    the fastest available). Error responses without a json body (e.g. a
+    proxy's 502 page) raise ValueError naming the status.
+    """
+    
+    try:
+        return (codec or json_codec()).loads(r.content)
+    except ValueError:
+        raise ValueError('HTTP %d %s' % (r.status_code, r.reason))
+
+class RequestScheduler:
+    """
+    RequestScheduler(rate=<float>, concurrency=<int>, retries=<int>, backoff=<float>)
+    
+    Sends every API request of a SigSciAPI, and its site clients:
+    
+        - at most `rate` requests per second (token bucket, 0 for no limit)
+        - at most `concurrency` requests at once. The limit is halved when
+          the API throttles or a connection fails or times out, and grows
+          back by one per round of successful requests (AIMD).
+        - throttled (429), unavailable (502, 503, 504) and connection
+          errors are retried up to `retries` times after exponential
+          backoff with jitter. Retry-After and an exhausted
+          X-RateLimit-Remaining pause every request until the given time,
+          a malformed one falls back to the backoff. 500, read timeouts and dropped connections are only retried for
+          GET and DELETE since the request may have been applied. Other
+          methods are retried only when no connection could be opened.
+    
+    Counters are kept in stats, the current limit in concurrency.
+    """
+    
+    RETRY_STATUS      = (429, 502, 503, 504)
+    IDEMPOTENT        = ('GET', 'HEAD', 'DELETE')
+    IDEMPOTENT_STATUS = (500,)
+    max_backoff       = 60
+    
+    def __init__(self, rate=0, concurrency=10, retries=3, backoff=0.5):
+        self.limiter         = RateLimiter(rate) if 0 < rate else None
+        self.max_concurrency = concurrency
+        self.concurrency     = float(concurrency)
+        self.active          = 0
+        self.retries         = retries
+        self.backoff         = backoff
+        self.resume          = 0.0
+        self.decreased       = 0.0
+        self.cond            = threading.Condition()
+        self.stats           = { 'requests': 0, 'throttled': 0, 'errors': 0, 'retried': 0, 'failed': 0 }
+    
+    def count(self, stat):
+        with self.cond:
+            self.stats[stat] += 1
+    
+    def acquire(self):
+        with self.cond:
+            while self.active >= int(self.concurrency):
+                self.cond.wait()
+            
+            self.active += 1
+            self.stats['requests'] += 1
+        
+        wait = self.resume - time.time()
+        
+        if 0 < wait:
+            time.sleep(wait)
+        
+        if None != self.limiter:
+            self.limiter.acquire()
+    
+    def release(self, congested=False):
+        # congested: the request was throttled, or its connection failed or timed out.
+        with self.cond:
+            self.active -= 1
+            now          = time.time()
+            
+            # halve at most once per backoff period, so one burst of 429s counts once.
+            if congested and now - self.decreased > self.backoff:
+                self.concurrency = max(1.0, self.concurrency / 2)
+                self.decreased   = now
+            elif not congested:
+                self.concurrency = min(float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency)
+            
+            self.cond.notify_all()
+    
+    def reserve(self, concurrency):
+        # callers running more threads than the pool raise the ceiling to match.
+        with self.cond:
+            if concurrency > self.max_concurrency:
+                self.concurrency    += concurrency - self.max_concurrency
+                self.max_concurrency = concurrency
+    
+    def pause(self, seconds):
+        with self.cond:
+            self.resume = max(self.resume, time.time() + seconds)
+    
+    def wait_time(self, r):
+        """
+        RequestScheduler.wait_time(r=<requests.Response>)
+        
+        Returns the seconds the server asked to wait, from Retry-After or
+        an exhausted X-RateLimit-Remaining with X-RateLimit-Reset (a unix
+        time or seconds), or 0. A header that can not be parsed counts as
+        0, so the request is retried after the usual backoff.
+        """
+        
+        retry_after = r.headers.get('Retry-After')
+        
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+            
+            # an http date
+            try:
+                moment = datetime.datetime.strptime(retry_after[5:25], '%d %b %Y %H:%M:%S')
+            except ValueError:
+                return 0.0
+            
+            return max(0.0, calendar.timegm(moment.timetuple()) - time.time())
+        
+        if '0' == r.headers.get('X-RateLimit-Remaining') and r.headers.get('X-RateLimit-Reset'):
+            try:
+                reset = float(r.headers['X-RateLimit-Reset'])
+            except ValueError:
+                return 0.0
+            
+            return max(0.0, reset - time.time() if 1e9 < reset else reset)
+        
+        return 0.0
+    
+    def delay(self, attempt):
+        # full jitter, spreading retries of concurrent requests apart
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+    
+    def unsent(self, e):
+        """
+        RequestScheduler.unsent(e=<requests.exceptions.RequestException>)
+        
+        Returns True when e was raised before the request was sent: the
+        connection timed out or could not be opened.
+        """
+        
+        if isinstance(e, requests.exceptions.ConnectTimeout):
+            return True
+        
+        # connection failures arrive as a ConnectionError wrapping urllib3's MaxRetryError.
+        reason = getattr(e.args[0], 'reason', None) if e.args else None
+        
+        return isinstance(e, requests.exceptions.ConnectionError) and isinstance(reason, (http_errors.NewConnectionError, http_errors.ConnectTimeoutError))
+
+    def send(self, method, send, retries=None):
+        """
+        RequestScheduler.send(method=<string>, send=<callable>, retries=<int>)
+        
+        Calls send() to send a request and returns its response, retrying
+        as described above. The last response (or error) is returned (or
+        raised) once retries run out.
+        """
+        
+        retries    = self.retries if None == retries else retries
+        idempotent = method.upper() in self.IDEMPOTENT
+        
+        for attempt in range(retries + 1):
+            self.acquire()
+            
+            try:
+                r = send()
+            except requests.exceptions.RequestException as e:
+                self.release(isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)))
+                self.count('errors')
+                
+                # a request that reached the server (e.g. a read timeout or a dropped connection) may have been applied.
+                sent = not self.unsent(e)
+                
+                if attempt >= retries or not isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)) or (sent and not idempotent):
+                    self.count('failed')
+                    raise
+                
+                wait = self.delay(attempt)
+            else:
+                throttled = 429 == r.status_code
+                retry     = r.status_code in self.RETRY_STATUS or (idempotent and r.status_code in self.IDEMPOTENT_STATUS)
+                wait      = self.wait_time(r)
+                self.release(throttled)
+                
+                if 0 < wait:
+                    self.pause(wait)
+                
+                if not retry:
+                    return r
+                
+                self.count('throttled' if throttled else 'errors')
+                
+                if attempt >= retries:
+                    self.count('failed')
+                    return r
+                
+                r.close()
+                wait = max(wait, self.delay(attempt))
+            
+            self.count('retried')
+            time.sleep(wait)
+
+def endpoint_name(url):
+    """
+    endpoint_name(url=<string>)
+    
+    Returns the API end point of url without the corp, site or item id,
+    e.g. feed/requests, agents, blacklist or auth/login.
+    """
+    
+    parts = [part for part in urlsplit(url).path.split('/') if part][2:]
+    
+    # corps/<corp>/sites/<site>/<end point>[/<id>]
+    if 4 < len(parts) and 'sites' == parts[2]:
+        return '/'.join(parts[4:6]) if 'feed' == parts[4] else parts[4]
+    
+    if parts[:1] == ['corps']:
+        return 'sites' if 3 == len(parts) else 'corps'
+    
+    return '/'.join(parts)
+
+class Metrics:
+    """
+    Metrics()
+    
+    Thread safe run instrumentation. Time spent per end point and phase
+    is recorded with observe(), totals such as bytes, pages and records
+    with count(). Every observation is also passed to each callable in
+    hooks as hook(kind, name, value), kind being 'timing' (seconds) or
+    'count', e.g. a StatsDHook.
+    
+    Phases:
+        queue     waiting for the rate limit, a concurrency slot or retries
+        wait      request sent until response headers, including any new
+                  connection's DNS lookup, connect and TLS handshake
+        download  reading the response body
+        stream    reading and parsing a streamed feed page
+        parse     json parsing
+        write     formatting and writing output (end point 'output')
+    """
+    
+    def __init__(self):
+        self.start   = time.time()
+        self.lock    = threading.Lock()
+        self.timings = {}
+        self.counts  = { 'requests': 0, 'bytes': 0, 'pages': 0, 'records': 0 }
+        self.hooks   = []
+    
+    def observe(self, endpoint, phase, seconds):
+        with self.lock:
+            timing          = self.timings.setdefault(endpoint, {}).setdefault(phase, { 'count': 0, 'total': 0.0, 'max': 0.0 })
+            timing['count'] += 1
+            timing['total'] += seconds
+            timing['max']    = max(timing['max'], seconds)
+        
+        for hook in self.hooks:
+            hook('timing', '%s.%s' % (endpoint, phase), seconds)
+    
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+        
+        for hook in self.hooks:
+            hook('count', name, amount)
+    
+    def summary(self, extra=None):
+        """
+        Metrics.summary(extra=<dict>)
+        
+        Returns the run totals, records per second and per end point
+        timings as a json serializable dict, with extra merged in.
+        """
+        
+        with self.lock:
+            wall    = time.time() - self.start
+            summary = dict(self.counts)
+            summary.update({ 'wall': wall, 'records_per_sec': self.counts['records'] / wall if wall else 0.0, 'endpoints': {} })
+            
+            for endpoint, phases in self.timings.items():
+                summary['endpoints'][endpoint] = dict((phase, dict(timing, mean=timing['total'] / timing['count'])) for phase, timing in phases.items())
+        
+        summary.update(extra or {})
+        return summary
+    
+    def report(self, summary):
+        """
+        Metrics.report(summary=<dict>)
+        
+        Returns summary as a human readable table.
+        """
+        
+        lines = ['wall %.3fs, %d requests, %d bytes, %d pages, %d records (%.0f records/sec)' % (
+            summary['wall'], summary['requests'], summary['bytes'], summary['pages'], summary['records'], summary['records_per_sec'])]
+        lines.append('%-20s %-9s %8s %10s %10s %10s' % ('endpoint', 'phase', 'count', 'total', 'mean', 'max'))
+        
+        for endpoint in sorted(summary['endpoints']):
+            for phase, timing in sorted(summary['endpoints'][endpoint].items()):
+                lines.append('%-20s %-9s %8d %9.3fs %9.4fs %9.4fs' % (endpoint, phase, timing['count'], timing['total'], timing['mean'], timing['max']))
+        
+        for name in ('connections', 'scheduler', 'response_cache', 'session_cache', 'feed'):
+            if summary.get(name):
+                lines.append('%s: %s' % (name, json.dumps(summary[name], sort_keys=True)))
+        
+        return '\n'.join(lines) + '\n'
+    
+    def prometheus(self, summary):
+        """
+        Metrics.prometheus(summary=<dict>)
+        
+        Returns summary in the Prometheus text format, e.g. for the node
+        exporter textfile collector.
+        """
+        
+        lines = ['sigsci_run_seconds %f' % summary['wall'], 'sigsci_records_per_second %f' % summary['records_per_sec']]
+        
+        for name in ('requests', 'bytes', 'pages', 'records'):
+            lines.append('sigsci_%s_total %d' % (name, summary[name]))
+        
+        for endpoint in sorted(summary['endpoints']):
+            for phase, timing in sorted(summary['endpoints'][endpoint].items()):
+                labels = '{endpoint="%s",phase="%s"}' % (endpoint, phase)
+                lines.append('sigsci_phase_seconds_total%s %f' % (labels, timing['total']))
+                lines.append('sigsci_phase_count%s %d' % (labels, timing['count']))
+        
+        for name, value in sorted((summary.get('scheduler') or {}).items()):
+            lines.append('sigsci_scheduler_%s_total %d' % (name, value))
+        
+        for name, value in sorted((summary.get('session_cache') or {}).items()):
+            lines.append('sigsci_session_cache_%s_total %d' % (name, value))
+        
+        return '\n'.join(lines) + '\n'
+
+class StatsDHook:
+    """
+    StatsDHook(address=<string>, prefix=<string>)
+    
+    Metrics hook sending timings and counts to a StatsD server at
+    host:port over UDP. Send errors are ignored.
+    """
+    
+    def __init__(self, address, prefix='sigsci'):
+        host, port  = address.rsplit(':', 1)
+        self.target = (host, int(port))
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    
+    def __call__(self, kind, name, value):
+        name = '%s.%s' % (self.prefix, name.replace('/', '_'))
+        line = '%s:%d|ms' % (name, value * 1000) if 'timing' == kind else '%s:%d|c' % (name, value)
+        
+        try:
+            self.socket.sendto(line.encode('utf8'), self.target)
+        except socket.error:
+            pass
+
+class JSONFileStore:
+    """
+    JSONFileStore(path=<string>)
+    
+    A json file readable by its owner only. Every read-modify-write holds
+    an exclusive lock on <path>.lock and the file is replaced atomically,
+    so concurrent runs never see a partial write.
+    """
+    
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+    
+    def empty(self):
+        return {}
+    
+    def lock(self):
+        fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        
+        if None != fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        
+        return fd
+    
+    def unlock(self, fd):
+        if None != fcntl:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        
+        os.close(fd)
+    
+    def load(self):
+        try:
+            with open(self.path) as store_file:
+                return json.load(store_file)
+        except (IOError, OSError, ValueError):
+            return self.empty()
+    
+    def save(self, data):
+        # write a private temp file and rename it over the store atomically.
+        tmp = '%s.%d.tmp' % (self.path, os.getpid())
+        fd  = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        
+        with os.fdopen(fd, 'w') as store_file:
+            json.dump(data, store_file)
+            # on disk before the rename, or a power loss can leave an empty checkpoint.
+            store_file.flush()
+            os.fsync(store_file.fileno())
+        
+        os.rename(tmp, self.path)
+    
+    def transaction(self, change):
+        """
+        JSONFileStore.transaction(change=<callable>)
+        
+        Loads the file, calls change(data) to edit it in place, saves it
+        and returns what change returned.
+        """
+        
+        fd = self.lock()
+        
+        try:
+            data   = self.load()
+            result = change(data)
+            self.save(data)
+            return result
+        finally:
+            self.unlock(fd)
+
+class SessionCache(JSONFileStore):
+    """
+    SessionCache(path=<string>, ttl=<int>)
+    
+    On-disk cache of login session cookies keyed by email and base url,
+    so repeated runs can skip the login request. See JSONFileStore for
+    locking and permissions. Cookies without an expiry are kept for `ttl`
+    seconds.
+    
+    Hit, miss, store and invalidation counts are kept in SessionCache.stats
+    for this process, and accumulated across runs in the cache file.
+    
+    Example:
+        cache   = SessionCache('~/.sigsci_session')
+        cookies = cache.lookup('foo@bar.com', 'https://dashboard.signalsciences.net')
+    """
+    
+    def __init__(self, path, ttl=3600):
+        JSONFileStore.__init__(self, path)
+        self.ttl   = ttl
+        self.stats = { 'hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0 }
+    
+    def empty(self):
+        return { 'sessions': {}, 'stats': {} }
+    
+    def key(self, email, base):
+        return '%s %s' % (email, base)
+    
+    def update(self, change):
+        # change(sessions) edits the sessions in place and returns the stat to count.
+        def count(data):
+            stat                = change(data['sessions'])
+            self.stats[stat]   += 1
+            data['stats'][stat] = data['stats'].get(stat, 0) + 1
+        
+        self.transaction(count)
+    
+    def lookup(self, email, base):
+        """
+        SessionCache.lookup(email=<string>, base=<string>)
+        
+        Returns the cached cookies (a list of dicts) or None when there are
+        none or they have expired.
+        """
+        
+        found = []
+        key   = self.key(email, base)
+        
+        def check(sessions):
+            entry = sessions.get(key)
+            
+            if None != entry and entry['expires'] > time.time():
+                found.append(entry['cookies'])
+                return 'hits'
+            
+            sessions.pop(key, None)
+            return 'misses'
+        
+        self.update(check)
+        
+        return found[0] if found else None
+    
+    def store(self, email, base, jar):
+        """
+        SessionCache.store(email=<string>, base=<string>, jar=<cookie jar>)
+        
+        Caches the cookies of jar until the earliest cookie expiry, or for
+        SessionCache.ttl seconds.
+        """
+        
+        cookies = [{ 'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path } for c in jar]
+        expires = min([c.expires for c in jar if c.expires] + [int(time.time()) + self.ttl])
+        
+        def put(sessions):
+            sessions[self.key(email, base)] = { 'cookies': cookies, 'expires': expires }
+            return 'stores'
+        
+        self.update(put)
+    
+    def invalidate(self, email, base):
+        """
+        SessionCache.invalidate(email=<string>, base=<string>)
+        
+        Removes the cached cookies, e.g. after the API rejected them.
+        """
+        
+        def remove(sessions):
+            sessions.pop(self.key(email, base), None)
+            return 'invalidations'
+        
+        self.update(remove)
+
+class FeedCheckpoint(JSONFileStore):
+    """
+    FeedCheckpoint(path=<string>)
+    
+    Durable feed export progress per corp/site. After every exported page
+    the store records the window being exported and the url of the next
+    page. Once a window is complete only its end (the last fully exported
+    minute) is kept. See JSONFileStore for locking and atomic writes.
+    
+    Entries:
+        { 'corp/site': { 'from': <int>, 'until': <int>, 'next': <url or None>, 'updated': <int> } }
+    
+    Windows stored as strings (e.g. -1h or a quoted unix timestamp) by
+    earlier versions are read as unix timestamps relative to 'updated'.
+    """
+    
+    def get(self, key):
+        state = self.load().get(key)
+        
+        if None != state:
+            for name in ('from', 'until'):
+                if isinstance(state[name], numbers.Integral) and not isinstance(state[name], bool):
+                    continue
+                
+                try:
+                    state[name] = parse_time(state[name], int(state.get('updated') or time.time()))
+                except (TypeError, ValueError):
+                    raise ValueError('Checkpoint %s of %s has an invalid %s time %r, remove it to start over.' % (self.path, key, name, state[name]))
+        
+        return state
+    
+    def put(self, key, from_time, until_time, next):
+        def change(data):
+            data[key] = { 'from': from_time, 'until': until_time, 'next': next, 'updated': int(time.time()) }
+        
+        self.transaction(change)
+
+class MemoryCheckpoint:
+    """
+    MemoryCheckpoint()
+    
+    FeedCheckpoint kept in memory, for SigSciAPI.follow_feed() without a
+    checkpoint file. Progress is lost when the process exits.
+    """
+    
+    def __init__(self):
+        self.data = {}
+    
+    def get(self, key):
+        return self.data.get(key)
+    
+    def put(self, key, from_time, until_time, next):
+        self.data[key] = { 'from': from_time, 'until': until_time, 'next': next, 'updated': int(time.time()) }
+
+def parse_ttls(value):
+    """
+    parse_ttls(value=<dict|list|string>)
+    
+    Returns a { kind: seconds } dict from a dict, a list of kind=duration
+    strings (e.g. agents=15 configuration=5m) or one string of them.
+    """
+    
+    if isinstance(value, dict):
+        return dict((kind, parse_duration(ttl)) for kind, ttl in value.items())
+    
+    items = value.split() if isinstance(value, (str, text_type)) else value
+    ttls  = {}
+    
+    for item in items:
+        kind, ttl  = item.split('=', 1)
+        ttls[kind] = parse_duration(ttl)
+    
+    return ttls
+
+def parse_thresholds(value):
+    """
+    parse_thresholds(value=<dict|list|string>)
+    
+    Returns a { tag: hits } dict from a dict, a list of tag=hits strings
+    (e.g. SQLI=10 CMDEXE=5) or one string of them.
+    """
+    
+    if isinstance(value, dict):
+        return dict((tag.upper(), int(hits)) for tag, hits in value.items())
+    
+    items      = value.split() if isinstance(value, (str, text_type)) else value
+    thresholds = {}
+    
+    for item in items:
+        tag, hits               = item.split('=', 1)
+        thresholds[tag.upper()] = int(hits)
+    
+    return thresholds
+
+def normalize_url(url):
+    """
+    normalize_url(url=<string>)
+    
+    Returns url with a lower case host, sorted parameters and the terms of
+    a search query (q) sorted, so equivalent requests share a cache key.
+    """
+    
+    parts  = urlsplit(url)
+    params = []
+    
+    for name, value in parse_qsl(parts.query, keep_blank_values=True):
+        params.append((name, ' '.join(sorted(value.split())) if 'q' == name else value))
+    
+    return '%s://%s%s?%s' % (parts.scheme, parts.netloc.lower(), parts.path.rstrip('/'), '&'.join('%s=%s' % param for param in sorted(params)))
+
+class ResponseCache:
+    """
+    ResponseCache(size=<int>, path=<string>, files=<int>)
+    
+    LRU cache of GET response bodies keeping at most size entries in
+    memory. With path set every entry is also kept as a file in that
+    directory (readable by its owner only) so later runs can reuse it.
+    Entries keep the ETag and Last-Modified headers of their response so
+    expired entries can be revalidated instead of downloaded again.
+    
+    The directory holds at most files entries, the least recently written
+    are removed first. Expired files without an ETag or Last-Modified date
+    can not be revalidated and are removed when looked up.
+    
+    Hit, miss, revalidation and eviction counts are kept in stats.
+    """
+    
+    def __init__(self, size=256, path=None, files=1024):
+        self.size    = size
+        self.path    = os.path.expanduser(path) if path else None
+        self.files   = files
+        self.entries = OrderedDict()
+        self.lock    = threading.Lock()
+        self.stats   = { 'hits': 0, 'misses': 0, 'revalidated': 0, 'evictions': 0, 'removed': 0 }
+        
+        if self.path and not os.path.isdir(self.path):
+            os.makedirs(self.path, 0o700)
+        
+        # files in path, counted again whenever it goes over files.
+        self.stored = len(self.stored_files()) if self.path else 0
+        self.prune()
+    
+    def key(self, user, url):
+        return '%s %s' % (user, normalize_url(url))
+    
+    def entry_file(self, key):
+        return JSONFileStore(os.path.join(self.path, hashlib.sha1(key.encode('utf8')).hexdigest() + '.json'))
+    
+    def count(self, stat, amount=1):
+        with self.lock:
+            self.stats[stat] += amount
+    
+    def stored_files(self):
+        try:
+            return [os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith('.json')]
+        except OSError:
+            return []
+    
+    def remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+    
+    def prune(self):
+        """
+        ResponseCache.prune()
+        
+        Removes the oldest files (by mtime) until at most ResponseCache.files
+        are left in ResponseCache.path. Other runs may share the directory,
+        files they removed meanwhile are skipped.
+        """
+        
+        if not self.path or self.stored <= self.files:
+            return
+        
+        stored = []
+        
+        for path in self.stored_files():
+            try:
+                stored.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        
+        stored.sort()
+        removed = [path for mtime, path in stored[:max(len(stored) - self.files, 0)] if self.remove(path)]
+        
+        self.stored = len(stored) - len(removed)
+        self.count('removed', len(removed))
+    
+    def remember(self, key, entry):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = entry
+            
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+    
+    def get(self, key):
+        """
+        ResponseCache.get(key=<string>)
+        
+        Returns the entry for key, fresh or expired, or None. Entries are
+        dicts with body, expires, etag and modified.
+        """
+        
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            
+            if None != entry:
+                self.entries[key] = entry
+                return entry
+        
+        if not self.path:
+            return None
+        
+        store = self.entry_file(key)
+        entry = store.load()
+        
+        if key != entry.get('key'):
+            return None
+        
+        if entry.get('expires', 0) <= time.time() and None == entry.get('etag') and None == entry.get('modified'):
+            if self.remove(store.path):
+                with self.lock:
+                    self.stored           -= 1
+                    self.stats['removed'] += 1
+            
+            return None
+        
+        self.remember(key, entry)
+        return entry
+    
+    def put(self, key, body, ttl, etag=None, modified=None):
+        entry = { 'key': key, 'body': body, 'expires': time.time() + ttl, 'etag': etag, 'modified': modified }
+        self.remember(key, entry)
+        
+        if self.path:
+            store = self.entry_file(key)
+            
+            if not os.path.exists(store.path):
+                with self.lock:
+                    self.stored += 1
+            
+            store.save(entry)
+            self.prune()
+        
+        return entry
+    
+    def invalidate(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+        
+        if self.path and self.remove(self.entry_file(key).path):
+            with self.lock:
+                self.stored -= 1
+
+class RequestStore:
+    """
+    RequestStore(path=<string>)
+    
+    Local SQLite store of request records, e.g. feed exports, indexed on
+    timestamp, remoteIP, path, responseCode and tag type. search() runs
+    the same from:/until:/tag:/server:/sort: queries as the /requests
+    endpoint against the stored records, without using the API.
+    
+    Records are keyed on id, so ingesting overlapping exports twice keeps
+    one copy of each request.
+    
+    Example:
+        store = RequestStore('/tmp/requests.db')
+        store.write_all(sigsci.iter_feed_requests())
+        for record in store.search('from:-1d tag:SQLI sort:time-asc', 100):
+            print(record['remoteIP'])
+        store.close()
+    """
+    
+    SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS requests (id TEXT PRIMARY KEY, timestamp INTEGER, remoteIP TEXT, remoteCountryCode TEXT, serverName TEXT, path TEXT, responseCode INTEGER, record TEXT)',
+        'CREATE TABLE IF NOT EXISTS tags (type TEXT, request_id TEXT, UNIQUE (type, request_id))',
+        'CREATE INDEX IF NOT EXISTS requests_timestamp ON requests (timestamp)',
+        'CREATE INDEX IF NOT EXISTS requests_remoteip ON requests (remoteIP, timestamp)',
+        'CREATE INDEX IF NOT EXISTS requests_path ON requests (path, timestamp)',
+        'CREATE INDEX IF NOT EXISTS requests_responsecode ON requests (responseCode, timestamp)',
+    ]
+    
+    # search fields and the column they match, tag is matched through the tags table.
+    COLUMNS = {
+        'server':   'serverName',
+        'ip':       'remoteIP',
+        'path':     'path',
+        'httpcode': 'responseCode',
+        'country':  'remoteCountryCode',
+    }
+    
+    batch_size = 5000
+    codec      = json_codec()
+    
+    def __init__(self, path):
+        # the feed pipeline may write from its own thread, one at a time.
+        self.db    = sqlite3.connect(path, check_same_thread=False)
+        self.count = 0
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        
+        for statement in self.SCHEMA:
+            self.db.execute(statement)
+        
+        self.db.commit()
+    
+    def write_all(self, records):
+        """
+        RequestStore.write_all(records=<iterable>)
+        
+        Adds records in transactions of batch_size, skipping ids that are
+        already stored. Returns the number of records added.
+        """
+        
+        added = 0
+        batch = []
+        
+        for record in records:
+            batch.append(record)
+            
+            if len(batch) >= self.batch_size:
+                added += self.insert(batch)
+                batch  = []
+        
+        if batch:
+            added += self.insert(batch)
+        
+        self.count += added
+        return added
+    
+    def insert(self, records):
+        rows = []
+        tags = []
+        
+        for record in records:
+            rows.append((record['id'], epoch_time(record.get('timestamp')), record.get('remoteIP'), record.get('remoteCountryCode'), record.get('serverName'), record.get('path'), record.get('responseCode'), self.codec.dumps(plain_record(record))))
+            tags.extend((tag['type'], record['id']) for tag in record.get('tags') or [])
+        
+        with self.db:
+            before = self.db.total_changes
+            self.db.executemany('INSERT OR IGNORE INTO requests VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            added  = self.db.total_changes - before
+            self.db.executemany('INSERT OR IGNORE INTO tags VALUES (?, ?)', tags)
+        
+        return added
+    
+    def where(self, query, now=None):
+        """
+        RequestStore.where(query=<string>, now=<int>)
+        
+        Returns the sql condition, its parameters and the sort order of a
+        search query. Repeated fields match any of their values, different
+        fields must all match and -field: excludes a value.
+        """
+        
+        now     = int(time.time()) if None == now else now
+        clauses = []
+        params  = []
+        values  = {}
+        order   = 'DESC'
+        
+        for field, value, negated in parse_search(query):
+            if 'from' == field:
+                clauses.append('timestamp >= ?')
+                params.append(parse_time(value, now))
+            
+            elif 'until' == field:
+                clauses.append('timestamp < ?')
+                params.append(parse_time(value, now))
+            
+            elif 'sort' == field:
+                order = 'ASC' if 'time-asc' == value else 'DESC'
+            
+            elif 'tag' == field or field in self.COLUMNS:
+                if 'httpcode' == field:
+                    value = int(value)
+                
+                values.setdefault((field, negated), []).append(value)
+            
+            else:
+                raise ValueError('Unsupported search field: %s' % field)
+        
+        for (field, negated), matches in sorted(values.items()):
+            marks = ', '.join('?' * len(matches))
+            
+            if 'tag' == field:
+                clause = 'id %sIN (SELECT request_id FROM tags WHERE type IN (%s))' % ('NOT ' if negated else '', marks)
+            else:
+                clause = '%s %sIN (%s)' % (self.COLUMNS[field], 'NOT ' if negated else '', marks)
+            
+            clauses.append(clause)
+            params.extend(matches)
+        
+        return ' AND '.join(clauses) or '1', params, order
+    
+    def search(self, query, limit=None):
+        """
+        RequestStore.search(query=<string>, limit=<int>)
+        
+        Yields the stored records matching query, newest first unless the
+        query has sort:time-asc.
+        """
+        
+        where, params, order = self.where(query)
+        sql = 'SELECT record FROM requests WHERE %s ORDER BY timestamp %s' % (where, order)
+        
+        if None != limit:
+            sql += ' LIMIT %d' % int(limit)
+        
+        for row in self.db.execute(sql, params):
+            yield self.codec.loads(row[0])
+    
+    def total(self, query):
+        where, params, order = self.where(query)
+        return self.db.execute('SELECT COUNT(*) FROM requests WHERE %s' % where, params).fetchone()[0]
+    
+    def flush(self):
+        # every batch is committed by insert(), kept for RecordWriter compatibility.
+        self.db.commit()
+    
+    def close(self):
+        self.db.close()
+
+class SigSciAPI:
+    """
+    SigSciAPI()
+    Methods:
+        authenticate()
+        build_query(from_time=<string>, until_time=<string>, tags=<list>)
+        query_api()
+    
+    Example:
+        sigsci       = SigSciAPI()
+        sigsci.email = 'foo@bar.com'
+        sigsci.pword = 'c0mpl3x'
+        sigsci.corp  = 'foo_bar'
+        sigsci.site  = 'www.bar.com'
+        sigsci.limit = 1000
+        sigsci.file  = '/tmp/foo.json'
+        
+        # optional, connection pool settings for the shared session
+        sigsci.pool_size   = 10
+        sigsci.max_retries = 3
+        
+        if sigsci.authenticate():
+            sigsci.build_query(from_time='-6h', until_time='-5h', tags=['SQLI', 'XSS', 'CMDEXE'])
+            sigsci.query_api()
+    """
+    base       = 'https://dashboard.signalsciences.net'
+    url        = base + '/api/'
+    version    = 'v0'
+    base_url   = None
+    authn      = None
+    email      = None
+    pword      = None
+    corp       = None
+    site       = None
+    query      = 'from:-6h '
+    from_time  = '-1h'
+    until_time = None
+    tags       = None
+    ctags      = None
+    server     = None
+    limit      = 100
+    field      = 'data'
+    file       = None
+    format     = 'json'
+    sort       = 'desc'
+    feed_url   = None
+    feed_next  = None
+    feed_stats = None
+    chunk_size = 65536
+    parse_size = 1048576
+    flush_size = 65536
+    prefetch   = 4
+    parallel   = 1
+    slice      = '10m'
+    codec      = 'auto'
+    raw_pages  = False
+    fields     = None
+    compact    = False
+    
+    # aggregate settings
+    aggregate          = None
+    top                = 20
+    aggregate_capacity = 10000
+    
+    # blacklist candidate settings
+    blacklist_candidates = False
+    thresholds           = { 'SQLI': 10, 'XSS': 10, 'CMDEXE': 5 }
+    candidate_window     = '10m'
+    candidate_expires    = '24h'
+    
+    # parquet output settings
+    row_group_size = 65536
+    compression    = 'snappy'
+    
+    # multi-site settings
+    sites       = None
+    all_sites   = False
+    concurrency = 8
+    
+    # agent collector settings
+    agent_interval = 15
+    agent_windows  = ['1m', '5m', '1h']
+    agent_metrics  = ['agent.rpm', 'agent.current_requests', 'agent.decision_time_50th', 'agent.decision_time_95th',
+                      'agent.latency_time_95th', 'agent.connections_dropped', 'agent.upload_metadata_failures', 'host.agent_cpu']
+    
+    # feed checkpoint settings
+    checkpoint = None
+    catchup    = '1h'
+    
+    # follow mode settings
+    follow      = False
+    status_file = None
+    stopping    = None
+    
+    # local request store settings
+    store = None
+    
+    # response cache settings
+    response_cache = False
+    cache_dir      = None
+    cache_size     = 256
+    cache_files    = 1024
+    cache_ttl      = { 'agents': 15, 'configuration': 300, 'requests': 60 }
+    responses      = None
+    
+    # instrumentation settings
+    stats      = False
+    stats_file = None
+    prometheus = None
+    statsd     = None
+    metrics    = None
+    
+    # request scheduling settings
+    rate      = 0
+    retries   = 3
+    backoff   = 0.5
+    scheduler = None
+    
+    # bulk post/delete settings
+    bulk_workers = 4
+    bulk_rate    = 10
+    bulk_retries = 3
+    bulk_report  = None
+    report       = None
+    
+    # session cookie cache settings
+    session_cache = None
+    session_ttl   = 3600
+    cache         = None
+    cached_login  = False
+    relogins      = 0
+    ua         = 'Signal Sciences Client API (Python)'
+    
+    # http session settings
+    session         = None
+    pool_size       = 10
+    max_retries     = 3
+    connect_timeout = 10
+    read_timeout    = 60
+    
+    # api end points
+    LOGIN_EP      = '/auth/login'
+    LOGOUT_EP     = '/auth/logout'
+    CORPS_EP      = '/corps/'
+    SITES_EP      = '/sites/'
+    REQEUSTS_EP   = '/requests'
+    AGENTS_EP     = '/agents'
+    FEED_EP       = '/feed/requests'
+    WLPARAMS_EP   = '/paramwhitelist'
+    WLPATHS_EP    = '/pathwhitelist'
+    WHITELIST_EP  = '/whitelist'
+    BLACKLIST_EP  = '/blacklist'
+    REDACTIONS_EP = '/redactions'
+    
+    # natural keys of configuration list items, used by sync_configuration()
+    NATURAL_KEYS = {
+        WLPARAMS_EP:   ('name',),
+        WLPATHS_EP:    ('path',),
+        WHITELIST_EP:  ('source',),
+        BLACKLIST_EP:  ('source',),
+        REDACTIONS_EP: ('field', 'redactionType'),
+    }
+    
+    # server assigned fields of configuration list items
+    CONFIG_METADATA = ('id', 'created', 'createdBy')
+    
+    # answers to adding an item whose natural key is already listed
+    CONFLICT_STATUS = (400, 409)
+
+    def get_session(self):
+        """
+        SigSciAPI.get_session()
+        
+        Returns the requests.Session shared by every API call, creating it
+        on first use from:
+            SigSciAPI.pool_size
+            SigSciAPI.max_retries
+        """
+        
+        if None == self.session:
+            # connection attempts only, throttled and failed responses are retried by the RequestScheduler.
+            retry        = http_retry.Retry(total=int(self.max_retries), read=False, redirect=False, respect_retry_after_header=False)
+            adapter      = http_adapters.HTTPAdapter(pool_connections=int(self.pool_size), pool_maxsize=int(self.pool_size), max_retries=retry)
+            self.session = requests.Session()
+            self.session.headers.update({ 'Content-type': 'application/json', 'User-Agent': self.ua })
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+        
+        return self.session
+
+    def get_scheduler(self):
+        """
+        SigSciAPI.get_scheduler()
+        
+        Returns the RequestScheduler shared by every API call, creating it
+        on first use from:
+            SigSciAPI.rate
+            SigSciAPI.retries
+            SigSciAPI.backoff
+            SigSciAPI.pool_size (most requests at once)
+        """
+        
+        if None == self.scheduler:
+            self.scheduler = RequestScheduler(float(self.rate), int(self.pool_size), int(self.retries), float(self.backoff))
+        
+        return self.scheduler
+
+    def request(self, method, url, retries=None, **kwargs):
+        """
+        SigSciAPI.request(method=<string>, url=<string>, retries=<int>)
+        
+        Sends a request through the shared session so keep-alive connections
+        (and the session cookie set by authenticate()) are reused. Requests
+        are rate limited and retried by the RequestScheduler, retries
+        overrides SigSciAPI.retries.
+        
+        Default timeouts (seconds):
+            SigSciAPI.connect_timeout = 10
+            SigSciAPI.read_timeout    = 60
+        """
+        
+        kwargs.setdefault('timeout', (float(self.connect_timeout), float(self.read_timeout)))
+        
+        metrics = self.get_metrics()
+        start   = time.time()
+        sent    = [start, start]
+        
+        def send():
+            sent[0] = time.time()
+            r       = self.get_session().request(method, url, **kwargs)
+            sent[1] = time.time()
+            return r
+        
+        r = self.get_scheduler().send(method, send, retries)
+        
+        # a cached session cookie may have been revoked, or a long running session
+        # (see follow_feed()) expired, log in again and retry once.
+        if 401 == r.status_code and (self.cached_login or None != self.stopping):
+            self.cached_login = False
+            self.relogins    += 1
+            
+            if None != self.get_session_cache():
+                self.get_session_cache().invalidate(self.email, self.base)
+            
+            if self.login():
+                r.close()
+                r = self.get_scheduler().send(method, send, retries)
+        
+        if None != metrics:
+            endpoint = endpoint_name(url)
+            wait     = r.elapsed.total_seconds()
+            metrics.count('requests')
+            metrics.observe(endpoint, 'queue', sent[0] - start)
+            metrics.observe(endpoint, 'wait', wait)
+            
+            # a streamed body is read later, see iter_feed_page().
+            if not kwargs.get('stream'):
+                metrics.observe(endpoint, 'download', max(0.0, sent[1] - sent[0] - wait))
+                metrics.count('bytes', len(r.content))
+        
+        return r
+
+    def get_metrics(self):
+        """
+        SigSciAPI.get_metrics()
+        
+        Returns the Metrics of this run, or None unless SigSciAPI.stats,
+        SigSciAPI.stats_file, SigSciAPI.prometheus or SigSciAPI.statsd
+        is set.
+        """
+        
+        if None == self.metrics and (self.stats or self.stats_file or self.prometheus or self.statsd):
+            self.metrics = Metrics()
+            
+            if self.statsd:
+                self.metrics.hooks.append(StatsDHook(self.statsd))
+        
+        return self.metrics
+
+    def stats_out(self):
+        """
+        SigSciAPI.stats_out()
+        
+        Prints the run summary to stderr (SigSciAPI.stats), writes it as
+        json to SigSciAPI.stats_file and in the Prometheus text format to
+        SigSciAPI.prometheus, each when set.
+        """
+        
+        metrics = self.get_metrics()
+        
+        if None == metrics:
+            return
+        
+        extra = { 'connections': self.connections_opened() }
+        
+        if None != self.scheduler:
+            extra['scheduler'] = dict(self.scheduler.stats, concurrency=self.scheduler.concurrency)
+        
+        if None != self.responses:
+            extra['response_cache'] = self.responses.stats
+        
+        if None != self.get_session_cache():
+            extra['session_cache'] = dict(self.get_session_cache().stats, relogins=self.relogins)
+        
+        if None != self.feed_stats:
+            extra['feed'] = self.feed_stats
+        
+        summary = metrics.summary(extra)
+        
+        # the session cache is only consulted at login and on a 401, send its totals once.
+        for name, value in sorted((summary.get('session_cache') or {}).items()):
+            for hook in metrics.hooks:
+                hook('count', 'session_cache.%s' % name, value)
+        
+        if self.stats:
+            sys.stderr.write(metrics.report(summary))
+        
+        if self.stats_file:
+            with open(self.stats_file, 'w') as outfile:
+                outfile.write('%s' % json.dumps(summary))
+        
+        if self.prometheus:
+            # the textfile collector must never read a partial file.
+            tmp = '%s.%d.tmp' % (self.prometheus, os.getpid())
+            
+            with open(tmp, 'w') as outfile:
+                outfile.write(metrics.prometheus(summary))
+            
+            os.rename(tmp, self.prometheus)
+
+    def connections_opened(self):
+        if None == self.session:
+            return 0
+        
+        pools = [adapter.poolmanager.pools for adapter in set(self.session.adapters.values())]
+        return sum(pool[key].num_connections for pool in pools for key in pool.keys())
+
+    def get_session_cache(self):
+        """
+        SigSciAPI.get_session_cache()
+        
+        Returns the SessionCache for SigSciAPI.session_cache (a file path),
+        or None when session caching is disabled.
+        """
+        
+        if not self.session_cache:
+            return None
+        
+        if None == self.cache or self.cache.path != os.path.expanduser(self.session_cache):
+            self.cache = SessionCache(self.session_cache, int(self.session_ttl))
+        
+        return self.cache
+
+    def get_response_cache(self):
+        """
+        SigSciAPI.get_response_cache()
+        
+        Returns the ResponseCache shared by every GET of agents,
+        configuration lists and queries, or None when SigSciAPI.response_cache
+        and SigSciAPI.cache_dir are both unset.
+        """
+        
+        if not self.response_cache and not self.cache_dir:
+            return None
+        
+        if None == self.responses:
+            self.responses = ResponseCache(int(self.cache_size), self.cache_dir, int(self.cache_files))
+        
+        return self.responses
+
+    def get_projection(self, extra=None):
+        """
+        SigSciAPI.get_projection(extra=<list>)
+        
+        Returns the (name, function) columns of SigSciAPI.fields followed
+        by extra, or None when every field is exported. The /requests and
+        feed end points always return whole records, so the projection is
+        applied as each record is written.
+        """
+        
+        projection = parse_fields(self.fields)
+        
+        return projection + (extra or []) if None != projection else None
+
+    def get_codec(self):
+        """
+        SigSciAPI.get_codec()
+        
+        Returns the JSONCodec for SigSciAPI.codec (auto, orjson, ujson or
+        json) used to parse responses and write json output.
+        """
+        
+        return json_codec(self.codec)
+
+    def get_body(self, url, kind=None, revalidate=False):
+        """
+        SigSciAPI.get_body(url=<string>, kind=<string>, revalidate=<bool>)
+        
+        GETs url and returns the raw response body, raising ValueError
+        with the API's message for error responses. With the response cache
+        enabled the body is reused for the SigSciAPI.cache_ttl seconds of
+        its kind (agents, configuration or requests). Once expired it is
+        revalidated with If-None-Match/If-Modified-Since when the server
+        sent an ETag or Last-Modified header. With revalidate set a cached
+        body is never reused unchecked, e.g. for a list about to be changed.
+        """
+        
+        cache = self.get_response_cache()
+        ttl   = parse_ttls(self.cache_ttl).get(kind, 0) if None != cache else 0
+        
+        if 0 >= ttl:
+            return self.check_response(url, self.request('GET', url))
+        
+        key     = cache.key(self.email, url)
+        entry   = cache.get(key)
+        headers = {}
+        
+        if None != entry:
+            if time.time() < entry['expires'] and not revalidate:
+                cache.count('hits')
+                return entry['body'].encode('utf8')
+            
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            
+            if entry['modified']:
+                headers['If-Modified-Since'] = entry['modified']
+        
+        r = self.request('GET', url, headers=headers)
+        
+        if 304 == r.status_code and None != entry:
+            cache.count('revalidated')
+            cache.put(key, entry['body'], ttl, entry['etag'], entry['modified'])
+            return entry['body'].encode('utf8')
+        
+        cache.count('misses')
+        body = self.check_response(url, r)
+        
+        # only successful responses get here, errors (e.g. an expired session) are never cached.
+        cache.put(key, body.decode('utf8'), ttl, r.headers.get('ETag'), r.headers.get('Last-Modified'))
+        
+        return body
+
+    def get_json(self, url, kind=None, revalidate=False):
+        """
+        SigSciAPI.get_json(url=<string>, kind=<string>, revalidate=<bool>)
+        
+        Returns the parsed response of get_body().
+        """
+        
+        body = self.get_body(url, kind, revalidate)
+        
+        if None == self.metrics:
+            return self.get_codec().loads(body)
+        
+        start = time.time()
+        j     = self.get_codec().loads(body)
+        self.metrics.observe(endpoint_name(url), 'parse', time.time() - start)
+        return j
+
+    def check_response(self, url, r):
+        """
+        SigSciAPI.check_response(url=<string>, r=<requests.Response>)
+        
+        Returns the body of r, or raises ValueError with the API's message
+        when r is an error. Only small bodies are parsed to look for a
+        message, a large body is always data.
+        """
+        
+        body = r.content
+        
+        if 400 > r.status_code and len(body) > 4096:
+            return body
+        
+        j = self.parse_response(url, r)
+        
+        if isinstance(j, dict) and 'message' in j:
+            raise ValueError(j['message'])
+        
+        if 400 <= r.status_code:
+            raise ValueError('HTTP %d %s' % (r.status_code, r.reason))
+        
+        return body
+
+    def parse_response(self, url, r):
+        if None == self.metrics:
+            return response_json(r, self.get_codec())
+        
+        start = time.time()
+        j     = response_json(r, self.get_codec())
+        self.metrics.observe(endpoint_name(url), 'parse', time.time() - start)
+        return j
+
+    def authenticate(self):
+        """
+        SigSciAPI.authenticate()
+        
+        Before calling, set:
+            SigSciAPI.email
+            SigSciAPI.pword
+        
+        When SigSciAPI.session_cache is set, a cached session cookie for
+        the same email and base url is reused instead of logging in. A new
+        login happens when the cookie has expired or the API answers 401.
+        
+        Stores session cookie in:
+            SigSciAPI.session.cookies
+        """
+        
+        cache = self.get_session_cache()
+        
+        if None != cache:
+            cookies = cache.lookup(self.email, self.base)
+            
+            if None != cookies:
+                for cookie in cookies:
+                    self.get_session().cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'])
+                
+                self.cached_login = True
+                return True
+        
+        return self.login()
+
+    def login(self):
+        """
+        SigSciAPI.login()
+        
+        Posts SigSciAPI.email and SigSciAPI.pword to the login endpoint and,
+        when session caching is enabled, stores the session cookie.
+        
+        Stores session cookie in:
+            SigSciAPI.session.cookies
+            SigSciAPI.authn.cookies
+        """
+        
+        # the login form is not json, override the session content type.
+        self.authn = self.request('POST', self.base_url + self.LOGIN_EP,
+            data = { 'email': self.email, 'password': self.pword }, 
+            headers = { 'Content-type': 'application/x-www-form-urlencoded' },
+            allow_redirects = False)
+        
+        if self.authn.headers['Location'] == '/':
+            if None != self.get_session_cache():
+                self.get_session_cache().store(self.email, self.base, self.get_session().cookies)
+            
+            return True
+        elif self.authn.headers['Location'] == '/login?p=invalid':
+            print('Login failed!')
+            return False
+        else:
+            print('Unexpected error %s' % self.authn.headers['Location'])
+            return False
+
+    def build_query(self):
+        """
+        SigSciAPI.build_query()
+        
+        For from_time and until_time syntax see:
+        https://dashboard.signalsciences.net/documentation/knowledge-base/search-syntax#time
+        
+        Default values (query):
+            SigSciAPI.from_time  = -1h
+            SigSciAPI.until_time = None
+            SigSciAPI.tags       = <all tags>
+        """
+        
+        self.query = self.make_query(self.from_time, self.until_time)
+
+    def make_query(self, from_time, until_time):
+        """
+        SigSciAPI.make_query(from_time=<string>, until_time=<string>)
+        
+        Returns the search query for the given time range using the
+        server, sort, tags and ctags settings. Used by build_query().
+        """
+        
+        query = 'from:%s ' % str(from_time if None != from_time else '-6h')
+        
+        if None != until_time:
+            query += 'until:%s ' % str(until_time)
+        
+        if None != self.server:
+            query += 'server:%s ' % str(self.server)
+        
+        if None != self.sort:
+            query += 'sort:time-%s ' % str(self.sort)
+        
+        if None != self.tags:
+            query += 'tag:'
+            query += ' tag:'.join(self.tags)
+            query += ' ' # extra space required for appending ctags
+        
+        if None != self.ctags:
+            query += 'tag:'
+            query += ' tag:'.join(self.ctags)
+        
+        return query
+
+    def time_slices(self):
+        """
+        SigSciAPI.time_slices()
+        
+        Splits the from_time/until_time window into consecutive
+        (from, until) unix timestamp ranges of SigSciAPI.slice length.
+        Relative times (e.g. -6h, -30m, -1d) and unix timestamps are
+        supported.
+        """
+        
+        now    = int(time.time())
+        start  = parse_time(self.from_time if None != self.from_time else '-6h', now)
+        end    = parse_time(self.until_time, now) if None != self.until_time else now
+        length = parse_duration(self.slice)
+        slices = []
+        
+        while start < end:
+            slices.append((start, min(start + length, end)))
+            start += length
+        
+        return slices
+
+    def fetch_query(self, query):
+        """
+        SigSciAPI.fetch_query(query=<string>)
+        
+        Runs a single /requests search and returns the parsed response.
+        """
+        
+        url = self.base_url + self.CORPS_EP + self.corp + self.SITES_EP + self.site + self.REQEUSTS_EP + '?q=' + str(query).strip() + '&limit=' + str(self.limit)
+        
+        return self.fetch_requests(url)
+
+    def fetch_requests(self, url):
+        j = self.get_json(url, 'requests')
+        
+        if 'message' in j:
+            raise ValueError(j['message'])
+        
+        if self.compact:
+            j['data'] = [CompactRequest(record, self.get_codec()) for record in j['data']]
+        
+        return j
+
+    def fetch_slice(self, query):
+        """
+        SigSciAPI.fetch_slice(query=<string>)
+        
+        Runs a /requests search like fetch_query(), following next.uri
+        while the search has fewer than SigSciAPI.limit records, in case
+        the server returns smaller pages.
+        """
+        
+        j = self.fetch_query(query)
+        
+        while len(j['data']) < int(self.limit) and '' != ((j.get('next') or {}).get('uri') or '').strip():
+            page      = self.fetch_requests(self.base + j['next']['uri'])
+            j['data'] = j['data'] + page['data']
+            j['next'] = page.get('next')
+        
+        return j
+
+    def slice_queries(self):
+        """
+        SigSciAPI.slice_queries()
+        
+        Returns the search of each time slice (see time_slices()). The
+        slices are half open, each one ends the second before the next
+        one starts, so a record on a boundary is found once. The last one
+        ends at SigSciAPI.until_time like the whole search would.
+        """
+        
+        slices = self.time_slices()
+        
+        return [self.make_query(start, end - 1 if i + 1 < len(slices) else self.until_time) for i, (start, end) in enumerate(slices)]
+
+    def merge_slices(self, pages):
+        """
+        SigSciAPI.merge_slices(pages=<list>)
+        
+        Merges the responses of slice_queries() in sort order and keeps
+        the first SigSciAPI.limit records, as one search would return.
+        Each slice returned its first SigSciAPI.limit records, so every
+        record kept was found. A slice the server cut short of that is
+        reported on stderr, since its missing records may belong in the
+        result.
+        """
+        
+        limit   = int(self.limit)
+        reverse = 'asc' != self.sort
+        cut     = [page for page in pages if len(page['data']) < min(limit, page.get('totalCount', 0))]
+        data    = list(itertools.islice(merge_sorted([page['data'] for page in pages], lambda row: row['timestamp'], reverse), limit))
+        
+        if cut:
+            sys.stderr.write('Warning: %d of %d time slices returned fewer records than they matched, the result may have gaps.\n' % (len(cut), len(pages)))
+        
+        return { 'totalCount': sum(page.get('totalCount', 0) for page in pages), 'next': { 'uri': '' }, 'data': data }
+
+    def query_slices(self):
+        """
+        SigSciAPI.query_slices()
+        
+        Searches each time slice concurrently on SigSciAPI.parallel threads
+        and merges the pages in sort order, see slice_queries() and
+        merge_slices(). SigSciAPI.limit applies to the whole search.
+        
+        Returns a response shaped like a single /requests search.
+        """
+        
+        pool = mp_pool.ThreadPool(int(self.parallel))
+        
+        self.get_scheduler().reserve(int(self.parallel))
+        
+        try:
+            pages = pool.map(self.fetch_slice, self.slice_queries())
+        finally:
+            pool.close()
+        
+        return self.merge_slices(pages)
+
+    def query_api(self):
+        """
+        SigSciAPI.query_api()
+        
+        Before calling, set:
+            (Required):
+                SigSciAPI.corp
+                SigSciAPI.site
+            
+            (Optional):
+                SigSciAPI.query
+                SigSciAPI.limit
+                SigSciAPI.file
+                SigSciAPI.parallel
+                SigSciAPI.slice
+                SigSciAPI.fields
+        
+        """
+        
+        try:
+            url     = self.base_url + self.CORPS_EP + self.corp + self.SITES_EP + self.site + self.REQEUSTS_EP + '?q=' + str(self.query).strip() + '&limit=' + str(self.limit)
+            f       = None if 'all' == self.field else self.field
+            columns = self.get_projection()
+            
+            # the whole response of a single search is written as received, without parsing it.
+            if 'json' == self.format and None == f and None == columns and 1 >= int(self.parallel) and not self.aggregate:
+                self.raw_out(self.get_body(url, 'requests'))
+                return
+            
+            j       = self.query_slices() if 1 < int(self.parallel) else self.fetch_query(self.query)
+            
+            # json output of the whole response or a single field is one document.
+            if 'json' == self.format and 'data' != f and not self.aggregate:
+                if None != columns:
+                    j['data'] = [project(row, columns) for row in j['data']]
+                elif self.compact:
+                    j['data'] = [row.to_dict() for row in j['data']]
+                
+                self.document_out(j if None == f else j[f])
+            else:
+                self.write_records(j['data'], REQUEST_COLUMNS, REQUEST_FIELDS, columns)
+            
+        except Exception as e:
+            print('Error: %s ' % str(e))
+            print('Query: %s ' % url)
+
+    def get_store(self):
+        store       = RequestStore(os.path.expanduser(self.store))
+        store.codec = self.get_codec()
+        return store
+
+    def query_store(self):
+        """
+        SigSciAPI.query_store()
+        
+        Before calling, set:
+            (Required):
+                SigSciAPI.store
+            
+            (Optional):
+                SigSciAPI.query
+                SigSciAPI.limit
+                SigSciAPI.field
+                SigSciAPI.file
+                SigSciAPI.format
+                SigSciAPI.fields
+        
+        Runs SigSciAPI.query against the local store instead of /requests,
+        output is the same as SigSciAPI.query_api().
+        """
+        
+        try:
+            store   = self.get_store()
+            f       = None if 'all' == self.field else self.field
+            columns = self.get_projection()
+            
+            try:
+                if 'json' == self.format and 'data' != f and not self.aggregate:
+                    rows = store.search(self.query, self.limit)
+                    j    = { 'totalCount': store.total(self.query), 'next': { 'uri': '' }, 'data': [project(row, columns) for row in rows] if columns else list(rows) }
+                    self.document_out(j if None == f else j[f])
+                else:
+                    self.write_records(store.search(self.query, self.limit), REQUEST_COLUMNS, REQUEST_FIELDS, columns)
+            finally:
+                store.close()
+        
+        except Exception as e:
+            print('Error: %s ' % str(e))
+            print('Query: %s ' % self.query)
+
+    def ingest_file(self):
+        """
+        SigSciAPI.ingest_file()
+        
+        Before calling, set:
+            SigSciAPI.file
+            SigSciAPI.store
+        
+        Adds the requests in SigSciAPI.file, json or ndjson feed or query
+        output, to the local store.
+        """
+        
+        try:
+            store = self.get_store()
+            
+            try:
+                with open(self.file, 'rb') as data_file:
+                    added = store.write_all(JSONStreamReader(data_file).iter_records())
+            finally:
+                store.close()
+            
+            print('Added %d requests to %s' % (added, self.store))
+        
+        except Exception as e:
+            print('Error: %s ' % str(e))
+
+    def get_feed_requests(self):
+        """
+        SigSciAPI.get_feed_requests()
+        
+        Before calling, set:
+            (Required):
+                SigSciAPI.corp
+                SigSciAPI.site
+            
+            (Optional):
+                SigSciAPI.from_time
+                SigSciAPI.until_time
+                SigSciAPI.tags
+                SigSciAPI.file
+                SigSciAPI.format
+                SigSciAPI.checkpoint
+                SigSciAPI.catchup
+                SigSciAPI.store
+                SigSciAPI.field
+                SigSciAPI.fields
+                SigSciAPI.blacklist_candidates
+                SigSciAPI.thresholds
+                SigSciAPI.candidate_window
+                SigSciAPI.candidate_expires
+        
+        With SigSciAPI.store set the whole records are added to the local
+        store instead of being written out, and with
+        SigSciAPI.blacklist_candidates set a blacklist payload of the IPs
+        over SigSciAPI.thresholds is written (see
+        BlacklistCandidateWriter). json output with SigSciAPI.raw_pages
+        set (and no SigSciAPI.fields) writes each page as received, one
+        response per line, without parsing the records.
+        """
+        # https://dashboard.signalsciences.net/documentation/api#_corps__corpName__sites__siteName__feed_requests_get
+        # /corps/{corpName}/sites/{siteName}/feed/requests
+        try:
+            if None != self.feed_output_error():
+                raise ValueError(self.feed_output_error())
+            
+            writer, write_page = self.feed_writer()
+            
+            try:
+                if self.checkpoint:
+                    self.export_feed_checkpointed(write_page)
+                else:
+                    self.export_feed(write_page)
+            finally:
+                writer.close()
+
+        except Exception as e:
+            print('Error: %s ' % str(e))
+            print('Query: %s ' % self.feed_url)
+
+    def feed_output_error(self):
+        """
+        SigSciAPI.feed_output_error()
+        
+        Returns why the feed output for SigSciAPI.format can not be
+        written as SigSciAPI.follow or SigSciAPI.checkpoint ask, or None
+        when it can. A json array is only valid once closed, so a running
+        daemon, a crash or a restart appending to SigSciAPI.file would
+        leave invalid output, and a parquet file is rewritten by every run
+        while the checkpoint skips the pages it held.
+        """
+        
+        # pages as received are one response per line, valid while the file grows.
+        pages = self.raw_pages and not (self.fields or self.aggregate)
+        
+        if self.follow and 'json' == self.format and not (self.store or self.blacklist_candidates or pages):
+            return 'Follow mode writes ndjson, csv, tsv or --raw-pages, a json array is only valid once the daemon stops.'
+        
+        # a resumed run would truncate the pages the checkpoint already committed.
+        if (self.follow or self.checkpoint) and 'parquet' == self.format and not (self.store or self.blacklist_candidates):
+            return 'Parquet output can not be resumed, use ndjson, csv or tsv with --checkpoint or --follow.'
+        
+        return None
+
+    def feed_writer(self):
+        """
+        SigSciAPI.feed_writer()
+        
+        Returns the output of a feed export, the local store, a
+        BlacklistCandidateWriter, a RawPageWriter or a RecordWriter for
+        SigSciAPI.format, and the function writing a page to it.
+        """
+        
+        # pages as received only when asked for, they are not the json array of records the other options write.
+        self.raw_pages = bool(self.raw_pages) and 'json' == self.format and not (self.store or self.fields or self.aggregate or self.blacklist_candidates)
+        
+        if self.store:
+            writer = self.get_store()
+        elif self.blacklist_candidates:
+            writer = BlacklistCandidateWriter(self.file, parse_thresholds(self.thresholds), self.candidate_window, self.candidate_expires, self.blacklisted)
+            writer.metrics = self.get_metrics()
+        elif self.raw_pages:
+            writer = RawPageWriter(self.binary_out())
+            writer.metrics = self.get_metrics()
+        else:
+            writer = self.record_writer(REQUEST_COLUMNS, REQUEST_FIELDS, self.get_projection())
+        
+        # records are written as they are parsed, e.g. one json array for the whole window.
+        return writer, writer.write if self.raw_pages else writer.write_all
+
+    def follow_feed(self):
+        """
+        SigSciAPI.follow_feed()
+        
+        Before calling, set the same values as get_feed_requests(), and
+        optionally:
+            SigSciAPI.checkpoint
+            SigSciAPI.status_file
+        
+        Exports the feed until SIGTERM or SIGINT (or SigSciAPI.stopping is
+        set), staying logged in. Just after every minute boundary the feed
+        is exported from where the last poll stopped up to 5 minutes ago,
+        the newest minute the feed serves, and the output is flushed. On
+        shutdown the current page is finished and the output closed.
+        
+        Progress is kept in the SigSciAPI.checkpoint file when set, so a
+        restart resumes where the daemon stopped, or in memory. A failed
+        poll is retried on the next one. SigSciAPI.status_file is rewritten
+        after every poll:
+            { 'pid', 'state', 'started', 'polls', 'errors', 'last_poll',
+              'last_success', 'last_error', 'until', 'lag', 'records' }
+        """
+        
+        if None != self.feed_output_error():
+            raise ValueError(self.feed_output_error())
+        
+        self.handle_signals()
+        
+        store  = FeedCheckpoint(self.checkpoint) if self.checkpoint else MemoryCheckpoint()
+        key    = '%s/%s' % (self.corp, self.site)
+        status = { 'pid': os.getpid(), 'state': 'running', 'started': int(time.time()), 'polls': 0, 'errors': 0,
+                   'last_poll': None, 'last_success': None, 'last_error': None, 'until': None, 'lag': None, 'records': 0 }
+        
+        writer, write_page = self.feed_writer()
+        
+        try:
+            while not self.stopping.is_set():
+                status['last_poll'] = int(time.time())
+                
+                try:
+                    self.export_feed_checkpointed(write_page, store)
+                    writer.flush()
+                    status['last_success'] = int(time.time())
+                except Exception as e:
+                    status['errors']    += 1
+                    status['last_error'] = str(e)
+                    print('Error: %s ' % str(e))
+                    print('Query: %s ' % self.feed_url)
+                
+                state = store.get(key)
+                
+                status['polls']  += 1
+                status['records'] = writer.count
+                status['until']   = state['until'] if None != state else None
+                status['lag']     = int(time.time()) - state['until'] if None != state else None
+                self.status_out(status)
+                
+                # another minute of feed is available just after the next minute boundary.
+                self.stopping.wait(61 - time.time() % 60)
+        finally:
+            writer.close()
+            status['state']   = 'stopped'
+            status['records'] = writer.count
+            self.status_out(status)
+
+    def handle_signals(self):
+        """
+        SigSciAPI.handle_signals()
+        
+        Creates SigSciAPI.stopping, set on SIGTERM or SIGINT, for the long
+        running follow_feed() and collect_agents().
+        """
+        
+        if None == self.stopping:
+            self.stopping = threading.Event()
+        
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                signal.signal(signum, lambda signum, frame: self.stopping.set())
+            except ValueError:
+                # signals can only be handled in the main thread, stop through SigSciAPI.stopping.
+                pass
+
+    def status_out(self, status):
+        if not self.status_file:
+            return
+        
+        # monitoring must never read a partial file.
+        tmp = '%s.%d.tmp' % (self.status_file, os.getpid())
+        
+        with open(tmp, 'w') as outfile:
+            outfile.write('%s' % json.dumps(status))
+        
+        os.rename(tmp, self.status_file)
+
+    def stopped(self):
+        return None != self.stopping and self.stopping.is_set()
+
+    def export_feed(self, write_page, url=None, commit=None):
+        """
+        SigSciAPI.export_feed(write_page=<callable>, url=<string>, commit=<callable>)
+        
+        Calls write_page(records) for every page of the feed window, or from
+        url onwards, prefetching pages when SigSciAPI.prefetch is set. After
+        each page is written commit(next_url) is called, next_url is None
+        once the window is complete. Stops after the current page once
+        SigSciAPI.stopping is set.
+        """
+        
+        if 0 < int(self.prefetch):
+            FeedPipeline(self, int(self.prefetch)).run(write_page, url, commit)
+            return
+        
+        self.feed_next = url or self.feed_start()
+        
+        while None != self.feed_next and not self.stopped():
+            write_page(self.fetch_feed_page(self.feed_next) if self.raw_pages else self.iter_feed_page(self.feed_next))
+            
+            if None != commit:
+                commit(self.feed_next)
+
+    def export_feed_checkpointed(self, write_page, store=None):
+        """
+        SigSciAPI.export_feed_checkpointed(write_page=<callable>, store=<FeedCheckpoint>)
+        
+        Exports the feed from where the last run for this corp/site stopped,
+        as recorded in store (default: the SigSciAPI.checkpoint file). An
+        interrupted window resumes at its next page url. The backlog up to
+        5 minutes ago is then exported in windows of at most
+        SigSciAPI.catchup, and the checkpoint is written after every page.
+        Without a checkpoint the default feed window is exported.
+        """
+        
+        store = store or FeedCheckpoint(self.checkpoint)
+        key   = '%s/%s' % (self.corp, self.site)
+        state = store.get(key)
+        now   = int(time.time())
+        end   = now // 60 * 60 - 300
+        chunk = parse_duration(self.catchup)
+        
+        def commit(next):
+            store.put(key, self.from_time, self.until_time, next)
+        
+        if None != state and None != state['next']:
+            self.from_time  = state['from']
+            self.until_time = state['until']
+            self.export_feed(write_page, state['next'], commit)
+            state = store.get(key)
+        
+        if None == state and not self.stopped():
+            # the window is stored and compared as unix timestamps, whatever --from/--until looked like.
+            self.build_feed_query()
+            self.from_time  = parse_time(self.from_time, now)
+            self.until_time = parse_time(self.until_time, now)
+            self.export_feed(write_page, None, commit)
+            state = store.get(key)
+        
+        # a window left unfinished by a stop is resumed next time.
+        while None != state and None == state['next'] and state['until'] < end and not self.stopped():
+            self.from_time  = state['until']
+            self.until_time = min(state['until'] + chunk, end)
+            self.export_feed(write_page, None, commit)
+            state = store.get(key)
+
+    def feed_start(self):
+        """
+        SigSciAPI.feed_start()
+        
+        Builds the feed query and returns the url of the first page.
+        """
+        
+        self.build_feed_query()
+        
+        return self.base_url + self.CORPS_EP + self.corp + self.SITES_EP + self.site + self.FEED_EP + '?' + str(self.query).strip()
+
+    def build_feed_query(self):
+        """
+        SigSciAPI.build_feed_query()
+        
+        Builds SigSciAPI.query for the feed endpoint. Feed times are unix
+        timestamps rounded to the minute.
+        
+        Default values (feed query):
+            SigSciAPI.from_time  = <now - 1h5m>
+            SigSciAPI.until_time = <now - 5m>
+            SigSciAPI.tags       = <all tags>
+        """
+        
+        now = datetime.datetime.now()
+
+        if None == self.from_time:
+            tm             = now - datetime.timedelta(hours=1, minutes=5)
+            stm            = tm.strftime("%Y-%m-%d %H:%M:00")
+            self.from_time = int(tm.strptime(stm, "%Y-%m-%d %H:%M:00").strftime("%s"))
+
+        if None == self.until_time:
+            tm              = now - datetime.timedelta(minutes=5)
+            stm             = tm.strftime("%Y-%m-%d %H:%M:00")
+            self.until_time = int(tm.strptime(stm, "%Y-%m-%d %H:%M:00").strftime("%s"))
+        
+        self.query = 'from=%s&until=%s' % (str(self.from_time), str(self.until_time))
+        
+        if None != self.tags or None != self.ctags:
+            self.query += '&tags='
+            self.query += ','.join((self.tags or []) + (self.ctags or []))
+
+    def iter_feed_requests(self):
+        """
+        SigSciAPI.iter_feed_requests()
+        
+        Generator yielding one feed request record at a time, following
+        next.uri until the window is exhausted. Each page is parsed as it
+        is read from the response, so memory use does not grow with the
+        number of pages.
+        
+        Before calling, set the same values as get_feed_requests().
+        
+        Example:
+            for record in sigsci.iter_feed_requests():
+                print(record['remoteIP'])
+        """
+        
+        self.feed_next = self.feed_start()
+        
+        while None != self.feed_next:
+            for record in self.iter_feed_page(self.feed_next):
+                yield record
+
+    def iter_feed_pages(self, url=None):
+        """
+        SigSciAPI.iter_feed_pages(url=<string>)
+        
+        Generator yielding each feed page as a list of request records,
+        from url (default: the first page of the window) onwards, or as
+        the unparsed response body when SigSciAPI.raw_pages is set. Memory
+        use is bounded by the page size.
+        
+        Before calling, set the same values as get_feed_requests().
+        """
+        
+        self.feed_next = url or self.feed_start()
+        
+        while None != self.feed_next:
+            yield self.fetch_feed_page(self.feed_next) if self.raw_pages else list(self.iter_feed_page(self.feed_next))
+
+    def iter_feed_page(self, url):
+        """
+        SigSciAPI.iter_feed_page(url=<string>)
+        
+        Generator yielding the records of a single feed page as they are
+        parsed. Once the page is exhausted SigSciAPI.feed_next holds the
+        url of the next page, or None.
+        
+        Only the json module can parse a page as it is downloaded. orjson
+        and ujson read the whole page first, which is faster, so they are
+        used for pages of at most SigSciAPI.parse_size bytes (as sent,
+        e.g. compressed). Larger pages and pages of unknown length are
+        streamed with the json module to keep memory use bounded.
+        """
+        
+        self.feed_url  = url
+        self.feed_next = None
+        next           = None
+        r              = self.request('GET', url, stream=True)
+        start          = time.time()
+        
+        try:
+            # e.g. still throttled once retries ran out
+            if 400 <= r.status_code:
+                j = response_json(r)
+                raise ValueError(j.get('message') if isinstance(j, dict) and 'message' in j else 'HTTP %d %s' % (r.status_code, r.reason))
+            
+            codec  = self.get_codec()
+            length = r.headers.get('Content-Length')
+            
+            if 'json' != codec.name and None != length and int(length) <= self.parse_size:
+                j    = codec.loads(r.content)
+                next = j.get('next')
+                
+                if 'message' in j:
+                    raise ValueError(j['message'])
+                
+                for record in j.get('data') or []:
+                    yield CompactRequest(record, codec) if self.compact else record
+            else:
+                for key, value in JSONStreamReader(r.raw, self.chunk_size).iter_object('data'):
+                    if 'data' == key:
+                        yield CompactRequest(value, codec) if self.compact else value
+                    elif 'message' == key:
+                        raise ValueError(value)
+                    elif 'next' == key:
+                        next = value
+        finally:
+            # without prefetch the stream time includes writing the page.
+            if None != self.metrics:
+                self.metrics.observe(endpoint_name(url), 'stream', time.time() - start)
+                self.metrics.count('bytes', r.raw.tell())
+                self.metrics.count('pages')
+            
+            r.close()
+        
+        self.feed_next = self.base + next['uri'] if None != next and '' != next['uri'].strip() else None
+
+    def fetch_feed_page(self, url):
+        """
+        SigSciAPI.fetch_feed_page(url=<string>)
+        
+        Returns the body of a single feed page without parsing its records,
+        only the next member is read. SigSciAPI.feed_next then holds the
+        url of the next page, or None.
+        """
+        
+        self.feed_url  = url
+        self.feed_next = None
+        next           = None
+        body           = self.check_response(url, self.request('GET', url))
+        
+        # the records are skipped when next comes first, as the api sends it.
+        for key, value in JSONStreamReader(io.BytesIO(body), len(body) + 1).iter_object():
+            if 'next' == key:
+                next = value
+                break
+        
+        if None != self.metrics:
+            self.metrics.count('pages')
+        
+        self.feed_next = self.base + next['uri'] if None != next and '' != next['uri'].strip() else None
+        
+        return body
+
+    def get_agent_metrics(self):
+        # https://dashboard.signalsciences.net/documentation/api#_corps__corpName__sites__siteName__agents_get
+        # /corps/{corpName}/sites/{siteName}/agents
+        try:
+            url     = self.base_url + self.CORPS_EP + self.corp + self.SITES_EP + self.site + self.AGENTS_EP
+            
+            if 'json' == self.format:
+                self.raw_out(self.get_body(url, 'agents'))
+            else:
+                self.json_out(self.fetch_agent_metrics())
+
+        except Exception as e:
+            print('Error: %s ' % str(e))
+            print('Query: %s ' % url)
+            quit()
+    
+    def fetch_agent_metrics(self):
+        """
+        SigSciAPI.fetch_agent_metrics()
+        
+        Returns the parsed /agents response for SigSciAPI.corp and
+        SigSciAPI.site.
+        """
+        
+        url = self.base_url + self.CORPS_EP + self.corp + self.SITES_EP + self.site + self.AGENTS_EP
+        
+        return self.get_json(url, 'agents')
+    
+    def blacklisted(self):
+        """
+        SigSciAPI.blacklisted()
+        
+        Returns the set of sources on the IP blacklist of SigSciAPI.corp and
+        SigSciAPI.site, reused while the response cache holds it.
+        """
+        
+        j = self.fetch_configuration(self.BLACKLIST_EP)
+        
+        if 'message' in j:
+            raise ValueError(j['message'])
+        
+        return set(config.get('source') for config in j['data'])
+    
+    def list_corps(self):
+        """
+        SigSciAPI.list_corps()
+        
+        Returns the names of the corps the authenticated user can access.
+        """
+        
+        r = self.request('GET', self.base_url + self.CORPS_EP.rstrip('/'))
+        j = response_json(r)
+        
+        if 'message' in j:
+            raise ValueError(j['message'])
+        
+        return [corp['name'] for corp in j['data']]
+    
+    def list_sites(self, corp=None):
+        """
+        SigSciAPI.list_sites(corp=<string>)
+        
+        Returns the names of the sites in corp (default: SigSciAPI.corp).
+        """
+        
+        r = self.request('GET', self.base_url + self.CORPS_EP + (corp or self.corp) + self.SITES_EP.rstrip('/'))
+        j = response_json(r)
+        
+        if 'message' in j:
+            raise ValueError(j['message'])
+        
+        return [site['name'] for site in j['data']]
+    
+    def get_fanout(self, operation):
+        """
+        SigSciAPI.get_fanout(operation=<string>)
+        
+        Runs a query, feed or agents pull for every site in SigSciAPI.sites
+        (or every discovered site when SigSciAPI.sites is empty) on
+        SigSciAPI.concurrency threads. Every record is tagged with its corp
+        and site and written in SigSciAPI.format.
+        
+        Before calling, set:
+            (Required):
+                SigSciAPI.corp (unless sites are given as corp/site)
+            
+            (Optional):
+                SigSciAPI.sites
+                SigSciAPI.concurrency
+                SigSciAPI.file
+        """
+        
+        try:
+            if 'agents' == operation:
+                writer = self.record_writer()
+            else:
+                writer = self.record_writer(REQUEST_COLUMNS + SITE_COLUMNS, REQUEST_FIELDS + SITE_FIELDS, self.get_projection(SITE_COLUMNS))
+            
+            try:
+                results = SigSciFanout(self, self.sites, int(self.concurrency)).run(operation, writer.write)
+            finally:
+                writer.close()
+            
+            for site, result in sorted(results.items()):
+                if isinstance(result, Exception):
+                    print('Error: %s %s ' % (site, str(result)))
+
+        except Exception as e:
+            print('Error: %s ' % str(e))
+    
+    def collect_agents(self):
+        """
+        SigSciAPI.collect_agents()
+        
+        Before calling, set:
+            (Required):
+                SigSciAPI.corp (unless sites are given as corp/site)
+                SigSciAPI.site (unless SigSciAPI.sites or SigSciAPI.all_sites is set)
+            
+            (Optional):
+                SigSciAPI.sites
+                SigSciAPI.all_sites
+                SigSciAPI.concurrency
+                SigSciAPI.agent_interval
+                SigSciAPI.agent_windows
+                SigSciAPI.agent_metrics
+                SigSciAPI.file
+                SigSciAPI.format
+                SigSciAPI.status_file
+        
+        Polls agent metrics of every site every SigSciAPI.agent_interval
+        seconds until SIGTERM or SIGINT (see AgentCollector). After every
+        poll the rollups are appended in SigSciAPI.format, or for the
+        prometheus format SigSciAPI.file is replaced with them.
+        SigSciAPI.status_file is rewritten after every poll.
+        """
+        
+        self.handle_signals()
+        
+        if 'prometheus' == self.format and not self.file:
+            raise ValueError('Prometheus output requires --file.')
+        
+        if 'parquet' == self.format:
+            raise ValueError('Agent rollups are written as json, ndjson, csv, tsv or prometheus.')
+        
+        sites     = self.sites or (None if self.all_sites else ['%s/%s' % (self.corp, self.site)])
+        collector = AgentCollector(self, sites, self.agent_metrics, self.agent_windows, float(self.agent_interval), int(self.concurrency))
+        writer    = None if 'prometheus' == self.format else self.record_writer(AGENT_ROLLUP_COLUMNS)
+        status    = { 'pid': os.getpid(), 'state': 'running', 'started': int(time.time()), 'polls': 0, 'errors': 0,
+                      'last_poll': None, 'last_error': None, 'sites': 0, 'agents': 0 }
+        
+        try:
+            while not self.stopping.is_set():
+                now = time.time()
+                
+                try:
+                    results = collector.poll(now)
+                    rollups = list(collector.rollups(now))
+                    
+                    for site, result in sorted(results.items()):
+                        if isinstance(result, Exception):
+                            status['errors']    += 1
+                            status['last_error'] = '%s %s' % (site, str(result))
+                            print('Error: %s %s ' % (site, str(result)))
+                    
+                    if None == writer:
+                        # scrapers must never read a partial file.
+                        tmp = '%s.%d.tmp' % (self.file, os.getpid())
+                        
+                        with open(tmp, 'w') as outfile:
+                            outfile.write(collector.prometheus(rollups))
+                        
+                        os.rename(tmp, self.file)
+                    else:
+                        writer.write_all(rollups)
+                        writer.flush()
+                
+                except Exception as e:
+                    status['errors']    += 1
+                    status['last_error'] = str(e)
+                    print('Error: %s ' % str(e))
+                
+                status['polls']    += 1
+                status['last_poll'] = int(now)
+                status['sites']     = len(collector.fanout.sites or [])
+                status['agents']    = len(collector.agents)
+                self.status_out(status)
+                
+                self.stopping.wait(max(0.0, float(self.agent_interval) - (time.time() - now)))
+        finally:
+            if None != writer:
+                writer.close()
+            
+            status['state'] = 'stopped'
+            self.status_out(status)
+    
+    def get_configuration(self, EP):
+        try:
+            url     = self.base_url + self.CORPS_EP + self.corp + self.SITES_EP + self.site + EP
+            
+            if 'json' == self.format:
+                self.raw_out(self.get_body(url, 'configuration'))
+            else:
+                self.json_out(self.fetch_configuration(EP))
+        
+        except Exception as e:
+            print('Error: %s ' % str(e))
+            print('Query: %s ' % url)
+            quit()
+
+    def post_configuration(self, EP):
+        """
+        SigSciAPI.post_configuration(EP=<string>)
+        
+        Creates every item of the 'data' list in SigSciAPI.file (e.g. the
+        output of a get_* call). Items are sent concurrently, see
+        bulk_configuration().
+        """
+        
+        try:
+            url     = self.base_url + self.CORPS_EP + self.corp + self.SITES_EP + self.site + EP
+
+            with open(self.file) as data_file:    
+                data = json.load(data_file)
+
+            for config in data['data']:
+                config.pop('created', None)
+                config.pop('createdBy', None)
+                config.pop('id', None)
+
+            self.bulk_configuration('POST', EP, data['data'])
+            self.bulk_out('Post')
+
+        except Exception as e:
+            print('Error: %s ' % str(e))
+            print('Query: %s ' % url)
+            quit()
+
+    def update_configuration(self, EP):
+        url     = self.base_url + self.CORPS_EP + self.corp + self.SITES_EP + self.site + EP
+    
+    def delete_configuration(self, EP):
+        """
+        SigSciAPI.delete_configuration(EP=<string>)
+        
+        Deletes every item id of the 'data' list in SigSciAPI.file. Items
+        are sent concurrently, see bulk_configuration().
+        """
+        
+        try:
+            url     = self.base_url + self.CORPS_EP + self.corp + self.SITES_EP + self.site + EP
+
+            with open(self.file) as data_file:    
+                    data = json.load(data_file)
+
+            self.bulk_configuration('DELETE', EP, data['data'])
+            self.bulk_out('Delete')
+
+        except Exception as e:
+            print('Error: %s ' % str(e))
+            print('Query: %s ' % url)
+            quit()
+
+    def fetch_configuration(self, EP, revalidate=False):
+        """
+        SigSciAPI.fetch_configuration(EP=<string>, revalidate=<bool>)
+        
+        Returns the parsed list response of a configuration end point,
+        see get_body() for revalidate.
+        """
+        
+        url = self.base_url + self.CORPS_EP + self.corp + self.SITES_EP + self.site + EP
+        
+        return self.get_json(url, 'configuration', revalidate)
+
+    def config_key(self, EP, config):
+        return tuple(config.get(field) for field in self.NATURAL_KEYS[EP])
+
+    def config_body(self, config):
+        return dict((k, v) for k, v in config.items() if k not in self.CONFIG_METADATA)
+
+    def diff_configuration(self, EP, desired, remote):
+        """
+        SigSciAPI.diff_configuration(EP=<string>, desired=<list>, remote=<list>)
+        
+        Indexes both lists on the end point's natural key (see NATURAL_KEYS)
+        and returns (add, delete): the desired items missing remotely and
+        the remote items not desired. An item whose key exists on both
+        sides with different settings is in both lists, to be added again
+        and then deleted, see sync_configuration(). Remote items listed
+        again under a key already seen are deleted.
+        """
+        
+        index  = {}
+        extra  = []
+        add    = []
+        wanted = set()
+        
+        for config in remote:
+            if self.config_key(EP, config) in index:
+                extra.append(config)
+            else:
+                index[self.config_key(EP, config)] = config
+        
+        for config in desired:
+            key = self.config_key(EP, config)
+            wanted.add(key)
+            
+            if key not in index:
+                add.append(self.config_body(config))
+            elif self.config_body(config) != self.config_body(index[key]):
+                add.append(self.config_body(config))
+                wanted.discard(key)
+        
+        delete = [config for key, config in index.items() if key not in wanted] + extra
+        
+        return add, delete
+
+    def sync_configuration(self, EP):
+        """
+        SigSciAPI.sync_configuration(EP=<string>)
+        
+        Makes the end point's list match the 'data' list in SigSciAPI.file.
+        The remote list is fetched once, and only the differences are sent,
+        see diff_configuration() and bulk_configuration(). A changed item
+        is added before its old version is deleted, and the old version
+        is kept when the add fails, so a rejected item never leaves a gap
+        in the live list. When the add is refused as a duplicate (see
+        CONFLICT_STATUS) the item is replaced old version first instead,
+        see replace_configuration().
+        """
+        
+        try:
+            url     = self.base_url + self.CORPS_EP + self.corp + self.SITES_EP + self.site + EP
+
+            with open(self.file) as data_file:
+                data = json.load(data_file)
+
+            # other users may have changed the list since it was cached, so the diff needs the live copy.
+            remote = self.fetch_configuration(EP, True)
+
+            if 'message' in remote:
+                raise ValueError(remote['message'])
+
+            add, delete = self.diff_configuration(EP, data['data'], remote['data'])
+            unchanged   = len(remote['data']) - len(delete)
+            changed     = set(self.config_key(EP, config) for config in add)
+            removed     = [config for config in delete if self.config_key(EP, config) not in changed]
+            deleted     = self.bulk_configuration('DELETE', EP, removed)
+            added       = self.bulk_configuration('POST', EP, add)
+
+            # old versions of changed items go once the new version exists, unless the api updated it in place.
+            created     = dict((self.config_key(EP, config), config.get('id')) for config in added['succeeded'])
+            replaced    = [config for config in delete if created.get(self.config_key(EP, config), config.get('id')) != config.get('id')]
+            replaced    = self.bulk_configuration('DELETE', EP, replaced)
+
+            # a list refusing a second item with the same key gets the old version deleted first.
+            listed      = set(self.config_key(EP, config) for config in delete)
+            conflicts   = [failure['item'] for failure in added['failed'] if failure['status'] in self.CONFLICT_STATUS and self.config_key(EP, failure['item']) in listed]
+            keys        = set(self.config_key(EP, config) for config in conflicts)
+            fallback    = self.replace_configuration(EP, conflicts, [config for config in delete if self.config_key(EP, config) in keys])
+            failed      = [failure for failure in added['failed'] if failure['item'] not in conflicts]
+
+            self.bulk_report = {
+                'added': added['succeeded'] + fallback['added'],
+                'deleted': deleted['succeeded'] + replaced['succeeded'] + fallback['deleted'],
+                'restored': fallback['restored'],
+                'failed': deleted['failed'] + failed + replaced['failed'] + fallback['failed'] }
+
+            for failure in self.bulk_report['failed']:
+                print('Failed: %s %s ' % (json.dumps(failure['item']), failure['error']))
+
+            if self.report:
+                with open(self.report, 'w') as outfile:
+                    outfile.write('%s' % json.dumps(self.bulk_report))
+
+            print('Sync complete! %d added, %d deleted, %d unchanged, %d failed.' % (len(self.bulk_report['added']), len(self.bulk_report['deleted']), unchanged, len(self.bulk_report['failed'])))
+
+        except Exception as e:
+            print('Error: %s ' % str(e))
+            print('Query: %s ' % url)
+            quit()
+
+    def replace_configuration(self, EP, items, old):
+        """
+        SigSciAPI.replace_configuration(EP=<string>, items=<list>, old=<list>)
+        
+        Deletes the old remote items, then adds the items having the same
+        natural keys. An item is not added while an old item of its key
+        could not be deleted, and when its add fails the first old item of
+        its key is added back, so the list keeps the old version.
+        
+        Returns:
+            { 'added': [...], 'deleted': [...], 'restored': [...], 'failed': [...] }
+        """
+        
+        deleted  = self.bulk_configuration('DELETE', EP, old)
+        kept     = set(self.config_key(EP, failure['item']) for failure in deleted['failed'])
+        added    = self.bulk_configuration('POST', EP, [item for item in items if self.config_key(EP, item) not in kept])
+        lost     = set(self.config_key(EP, failure['item']) for failure in added['failed'])
+        restore  = OrderedDict()
+        
+        for config in deleted['succeeded']:
+            if self.config_key(EP, config) in lost:
+                restore.setdefault(self.config_key(EP, config), self.config_body(config))
+        
+        restored = self.bulk_configuration('POST', EP, list(restore.values()))
+        blocked  = [{ 'item': item, 'error': 'Old version could not be deleted', 'status': None } for item in items if self.config_key(EP, item) in kept]
+        
+        return {
+            'added': added['succeeded'],
+            'deleted': deleted['succeeded'],
+            'restored': restored['succeeded'],
+            'failed': deleted['failed'] + blocked + added['failed'] + restored['failed'] }
+
+    def bulk_configuration(self, method, EP, items):
+        """
+        SigSciAPI.bulk_configuration(method=<string>, EP=<string>, items=<list>)
+        
+        POSTs each item to EP, or DELETEs EP/<item id>, on
+        SigSciAPI.bulk_workers threads. Items are started at up to
+        SigSciAPI.bulk_rate per second (0 for no limit). Throttled (429),
+        unavailable (5xx) and connection errors are retried up to
+        SigSciAPI.bulk_retries times by the RequestScheduler. Other
+        errors fail the item without stopping the rest.
+        
+        Returns and stores in SigSciAPI.bulk_report:
+            { 'succeeded': [<item>, ...], 'failed': [{ 'item': <item>, 'error': <string>, 'status': <int or None> }, ...] }
+        """
+        
+        url     = self.base_url + self.CORPS_EP + self.corp + self.SITES_EP + self.site + EP
+        limiter = RateLimiter(float(self.bulk_rate)) if 0 < float(self.bulk_rate) else None
+        
+        def send(item):
+            if 'DELETE' == method and not item.get('id'):
+                return False, item, 'Missing id', None
+            
+            if None != limiter:
+                limiter.acquire()
+            
+            try:
+                if 'POST' == method:
+                    r = self.request('POST', url, int(self.bulk_retries), json=item)
+                else:
+                    r = self.request('DELETE', url + '/' + item['id'], int(self.bulk_retries))
+                
+                j = response_json(r, self.get_codec()) if r.content.strip() else {}
+            except (requests.exceptions.RequestException, ValueError) as e:
+                return False, item, str(e), None
+            
+            error = j.get('message') if isinstance(j, dict) else None
+            
+            if 400 > r.status_code and None == error:
+                # a created item is reported with its new id.
+                return True, dict(item, id=j['id']) if 'POST' == method and isinstance(j, dict) and j.get('id') else item, None, r.status_code
+            
+            return False, item, error or 'HTTP %d' % r.status_code, r.status_code
+        
+        pool = mp_pool.ThreadPool(max(1, min(int(self.bulk_workers), len(items))))
+        
+        try:
+            results = pool.map(send, items)
+        finally:
+            pool.close()
+        
+        # the list has changed, a cached copy of it is stale.
+        if None != self.get_response_cache():
+            self.responses.invalidate(self.responses.key(self.email, url))
+        
+        self.bulk_report = {
+            'succeeded': [item for ok, item, error, status in results if ok],
+            'failed': [{ 'item': item, 'error': error, 'status': status } for ok, item, error, status in results if not ok] }
+        
+        return self.bulk_report
+
+    def bulk_out(self, action):
+        report = self.bulk_report
+        
+        for failure in report['failed']:
+            print('Failed: %s %s ' % (json.dumps(failure['item']), failure['error']))
+        
+        if self.report:
+            with open(self.report, 'w') as outfile:
+                outfile.write('%s' % json.dumps(report))
+        
+        print('%s complete! %d succeeded, %d failed.' % (action, len(report['succeeded']), len(report['failed'])))
+
+    def get_whitelist_parameters(self):
+        # https://dashboard.signalsciences.net/documentation/api#_corps__corpName__sites__siteName__paramwhitelist_get
+        # /corps/{corpName}/sites/{siteName}/paramwhitelist
+        self.get_configuration(self.WLPARAMS_EP)
+    
+    def post_whitelist_parameters(self):
+        # https://dashboard.signalsciences.net/documentation/api#_corps__corpName__sites__siteName__paramwhitelist_post
+        # /corps/{corpName}/sites/{siteName}/paramwhitelist
+        self.post_configuration(self.WLPARAMS_EP)
+    
+    def delete_whitelist_parameters(self):
+        # https://dashboard.signalsciences.net/documentation/api#_corps__corpName__sites__siteName__paramwhitelist__paramID__delete
+        # /corps/{corpName}/sites/{siteName}/paramwhitelist/{paramID}
+        self.delete_configuration(self.WLPARAMS_EP)
+    
+    def sync_whitelist_parameters(self):
+        # /corps/{corpName}/sites/{siteName}/paramwhitelist
+        self.sync_configuration(self.WLPARAMS_EP)
+    
+    def get_whitelist_paths(self):
+        # https://dashboard.signalsciences.net/documentation/api#_corps__corpName__sites__siteName__pathwhitelist_get
+        # /corps/{corpName}/sites/{siteName}/pathwhitelist
+        self.get_configuration(self.WLPATHS_EP)
+    
+    def post_whitelist_paths(self):
+        # https://dashboard.signalsciences.net/documentation/api#_corps__corpName__sites__siteName__pathwhitelist_post
+        # /corps/{corpName}/sites/{siteName}/pathwhitelist
+        self.post_configuration(self.WLPATHS_EP)
+    
+    def delete_whitelist_paths(self):
+        # https://dashboard.signalsciences.net/documentation/api#_corps__corpName__sites__siteName__pathwhitelist__pathID__delete
+        # /corps/{corpName}/sites/{siteName}/pathwhitelist/{pathID}
+        self.delete_configuration(self.WLPATHS_EP)
+    
+    def sync_whitelist_paths(self):
+        # /corps/{corpName}/sites/{siteName}/pathwhitelist
+        self.sync_configuration(self.WLPATHS_EP)
+    
+    def get_whitelist(self):
+        # https://dashboard.signalsciences-stage.net/documentation/api#_corps__corpName__sites__siteName__whitelist_get
+        # /corps/{corpName}/sites/{siteName}/whitelist
+        self.get_configuration(self.WHITELIST_EP)
+    
+    def post_whitelist(self):
+        # https://dashboard.signalsciences.net/documentation/api#_corps__corpName__sites__siteName__pathwhitelist_post
+        # /corps/{corpName}/sites/{siteName}/whitelist
+        self.post_configuration(self.WHITELIST_EP)
+    
+    def delete_whitelist(self):
+        # https://dashboard.signalsciences.net/documentation/api#_corps__corpName__sites__siteName__pathwhitelist__pathID__delete
+        # /corps/{corpName}/sites/{siteName}/whitelist/{source}
+        self.delete_configuration(self.WHITELIST_EP)
+    
+    def sync_whitelist(self):
+        # /corps/{corpName}/sites/{siteName}/whitelist
+        self.sync_configuration(self.WHITELIST_EP)
+    
+    def get_blacklist(self):
+        # https://dashboard.signalsciences-stage.net/documentation/api#_corps__corpName__sites__siteName__blacklist_get
+        # /corps/{corpName}/sites/{siteName}/blacklist
+        self.get_configuration(self.BLACKLIST_EP)
+    
+    def post_blacklist(self):
+        # https://dashboard.signalsciences.net/documentation/api#_corps__corpName__sites__siteName__pathblacklist_post
+        # /corps/{corpName}/sites/{siteName}/blacklist
+        self.post_configuration(self.BLACKLIST_EP)
+    
+    def delete_blacklist(self):
+        # https://dashboard.signalsciences.net/documentation/api#_corps__corpName__sites__siteName__pathblacklist__pathID__delete
+        # /corps/{corpName}/sites/{siteName}/blacklist/{source}
+        self.delete_configuration(self.BLACKLIST_EP)
+    
+    def sync_blacklist(self):
+        # /corps/{corpName}/sites/{siteName}/blacklist
+        self.sync_configuration(self.BLACKLIST_EP)
+    
+    def get_redactions(self):
+        # https://dashboard.signalsciences-stage.net/documentation/api#_corps__corpName__sites__siteName__redactions_get
+        # /corps/{corpName}/sites/{siteName}/redactions
+        self.get_configuration(self.REDACTIONS_EP)
+    
+    def post_redactions(self):
+        # https://dashboard.signalsciences-stage.net/documentation/api#_corps__corpName__sites__siteName__redactions_post
+        # /corps/{corpName}/sites/{siteName}/redactions
+        self.post_configuration(self.REDACTIONS_EP)
+    
+    def delete_redactions(self):
+        # https://dashboard.signalsciences-stage.net/documentation/api#_corps__corpName__sites__siteName__redactions__field__delete
+        # /corps/{corpName}/sites/{siteName}/redactions/{field}
+        self.delete_configuration(self.REDACTIONS_EP)
+    
+    def sync_redactions(self):
+        # /corps/{corpName}/sites/{siteName}/redactions
+        self.sync_configuration(self.REDACTIONS_EP)
+    
+    def json_out(self, j):
+        if 'message' in j:
+            raise ValueError(j['message'])
+
+        if 'json' == self.format:
+            self.document_out(j)
+        
+        else:
+            self.write_records(j['data'])
+
+    def document_out(self, value):
+        if not self.file:
+            print('%s' % self.get_codec().dumps(value))
+
+        else:
+            with open(self.file, 'a') as outfile:
+                outfile.write('%s' % self.get_codec().dumps(value))
+
+    def raw_out(self, body):
+        """
+        SigSciAPI.raw_out(body=<bytes>)
+        
+        Writes a response body as received, like document_out() but
+        without parsing and serializing it again.
+        """
+        
+        outfile = self.binary_out()
+        
+        try:
+            outfile.write(body if self.file else body + b'\n')
+        finally:
+            outfile.flush()
+            
+            if self.file:
+                outfile.close()
+
+    def binary_out(self):
+        # bytes are written to stdout through its buffer on python 3.
+        if not self.file:
+            sys.stdout.flush()
+            return getattr(sys.stdout, 'buffer', sys.stdout)
+        
+        return open(self.file, 'ab')
+
+    def record_writer(self, columns=None, fields=None, projection=None):
+        """
+        SigSciAPI.record_writer(columns=<list>, fields=<list>, projection=<list>)
+        
+        Returns a RecordWriter for SigSciAPI.format (json, ndjson, csv or
+        tsv) appending to SigSciAPI.file, or writing to stdout. columns
+        selects the csv/tsv columns, see CSVWriter.
+        
+        parquet output replaces SigSciAPI.file, with the typed fields
+        (see ParquetWriter) in row groups of SigSciAPI.row_group_size
+        records compressed with SigSciAPI.compression.
+        
+        projection (see get_projection()) replaces the csv/tsv columns,
+        selects parquet fields by name and trims json records.
+        
+        With SigSciAPI.aggregate set the records are counted instead, see
+        AggregateWriter.
+        """
+        
+        if self.aggregate:
+            if self.format not in WRITERS:
+                raise ValueError('Aggregates are written as json, ndjson, csv or tsv.')
+            
+            outfile = open(self.file, 'a') if self.file else sys.stdout
+            writer  = AggregateWriter(outfile, self.aggregate, int(self.top), int(self.aggregate_capacity), self.format, int(self.flush_size))
+        
+        elif 'parquet' == self.format:
+            if not self.file:
+                raise ValueError('Parquet output requires --file.')
+            
+            if None != projection:
+                typed   = dict((field[0], field) for field in fields or [])
+                missing = [name for name, get in projection if name not in typed]
+                
+                if missing:
+                    raise ValueError('Parquet output has no %s column.' % ', '.join(missing))
+                
+                fields = [typed[name] for name, get in projection]
+            
+            writer = ParquetWriter(open(self.file, 'wb'), fields, int(self.row_group_size), self.compression)
+        
+        elif self.format in WRITERS:
+            outfile = open(self.file, 'a') if self.file else sys.stdout
+            
+            # csv/tsv columns chosen with --fields are labeled, and list values joined like the tags column.
+            if None != projection and issubclass(WRITERS[self.format], CSVWriter):
+                writer        = WRITERS[self.format](outfile, [(name, lambda row, get=get: joined(get(row))) for name, get in projection], int(self.flush_size))
+                writer.header = True
+            else:
+                writer            = WRITERS[self.format](outfile, projection or columns, int(self.flush_size))
+                writer.projection = projection
+        
+        else:
+            raise ValueError('Invalid output format!')
+        
+        writer.metrics = self.get_metrics()
+        writer.codec   = self.get_codec()
+        return writer
+
+    def write_records(self, records, columns=None, fields=None, projection=None):
+        writer = self.record_writer(columns, fields, projection)
+        
+        try:
+            writer.write_all(records)
+        finally:
+            writer.close()
+
+    def __init__(self, pool_size=None, max_retries=None, connect_timeout=None, read_timeout=None):
+        self.base_url = self.url + self.version
+        
+        if None != pool_size:
+            self.pool_size = pool_size
+        
+        if None != max_retries:
+            self.max_retries = max_retries
+        
+        if None != connect_timeout:
+            self.connect_timeout = connect_timeout
+        
+        if None != read_timeout:
+            self.read_timeout = read_timeout
+
+
+class SigSciFanout:
+    """
+    SigSciFanout(sigsci=<SigSciAPI>, sites=<list>, concurrency=<int>)
+    
+    Runs the same pull for many sites concurrently, sharing the session
+    (and login) of an authenticated SigSciAPI. Sites are site names in
+    SigSciAPI.corp or corp/site pairs. When no sites are given they are
+    discovered from the corps and sites listings.
+    
+    Operations:
+        query   SigSciAPI.query (built with build_query) per site
+        feed    SigSciAPI.iter_feed_requests() per site, same time window
+        agents  SigSciAPI.fetch_agent_metrics() per site
+    
+    Example:
+        if sigsci.authenticate():
+            sigsci.build_query()
+            fanout  = SigSciFanout(sigsci, ['www.foo.com', 'api.foo.com'], concurrency=8)
+            results = fanout.run('query', records.append)
+    """
+    
+    OPERATIONS = ('query', 'feed', 'agents')
+    
+    def __init__(self, sigsci, sites=None, concurrency=8):
+        self.sigsci      = sigsci
+        self.sites       = sites
+        self.concurrency = concurrency
+        self.lock        = threading.Lock()
+        
+        # every site thread may hold a connection, size the shared pool to match.
+        if None == sigsci.session:
+            sigsci.pool_size = max(int(sigsci.pool_size), concurrency)
+        
+        # site clients are copies, create the shared response cache, scheduler and metrics first.
+        sigsci.get_response_cache()
+        sigsci.get_scheduler().reserve(concurrency)
+        sigsci.get_metrics()
+    
+    def discover_sites(self):
+        """
+        SigSciFanout.discover_sites()
+        
+        Returns (corp, site) pairs for SigSciFanout.sites, or for every site
+        of SigSciAPI.corp (every corp when it is not set).
+        """
+        
+        if self.sites:
+            return [tuple(site.split('/', 1)) if '/' in site else (self.sigsci.corp, site) for site in self.sites]
+        
+        corps = [self.sigsci.corp] if self.sigsci.corp else self.sigsci.list_corps()
+        
+        return [(corp, site) for corp in corps for site in self.sigsci.list_sites(corp)]
+    
+    def site_client(self, corp, site):
+        client            = copy.copy(self.sigsci)
+        client.corp       = corp
+        client.site       = site
+        client.parallel   = 1
+        client.feed_url   = None
+        client.feed_next  = None
+        return client
+    
+    def records(self, client, operation):
+        if 'query' == operation:
+            return client.fetch_query(client.query)['data']
+        
+        elif 'feed' == operation:
+            return client.iter_feed_requests()
+        
+        elif 'agents' == operation:
+            j = client.fetch_agent_metrics()
+            
+            if 'message' in j:
+                raise ValueError(j['message'])
+            
+            return j['data']
+        
+        raise ValueError('Unknown fan-out operation: %s' % operation)
+    
+    def pull(self, args):
+        operation, sink, corp, site = args
+        count = 0
+        
+        try:
+            for record in self.records(self.site_client(corp, site), operation):
+                record['corp'] = corp
+                record['site'] = site
+                
+                with self.lock:
+                    sink(record)
+                count += 1
+            
+            return '%s/%s' % (corp, site), count
+        
+        except Exception as e:
+            return '%s/%s' % (corp, site), e
+    
+    def run(self, operation, sink):
+        """
+        SigSciFanout.run(operation=<string>, sink=<callable>)
+        
+        Calls sink(record) for every record of every site, one call at a
+        time. A failing site does not stop the others.
+        
+        Returns a dict of corp/site to record count, or to the exception
+        that stopped that site.
+        """
+        
+        if operation not in self.OPERATIONS:
+            raise ValueError('Unknown fan-out operation: %s' % operation)
+        
+        # feed windows are computed once so every site exports the same minutes.
+        if 'feed' == operation:
+            self.sigsci.build_feed_query()
+        
+        self.sigsci.get_session()
+        sites = self.discover_sites()
+        pool  = mp_pool.ThreadPool(max(1, min(self.concurrency, len(sites))))
+        
+        try:
+            return dict(pool.map(self.pull, [(operation, sink, corp, site) for corp, site in sites]))
+        finally:
+            pool.close()
+
+
+class RingBuffer:
+    """
+    RingBuffer(size=<int>)
+    
+    Fixed size series of (timestamp, value) samples held in two array('d')
+    buffers, so each sample takes 16 bytes. Once full the oldest sample is
+    overwritten.
+    """
+    
+    def __init__(self, size):
+        self.size   = size
+        self.times  = array('d', [0.0]) * size
+        self.values = array('d', [0.0]) * size
+        self.pos    = 0
+        self.count  = 0
+    
+    def append(self, timestamp, value):
+        self.times[self.pos]  = timestamp
+        self.values[self.pos] = value
+        self.pos              = (self.pos + 1) % self.size
+        self.count            = min(self.count + 1, self.size)
+    
+    def since(self, start):
+        """
+        RingBuffer.since(start=<float>)
+        
+        Returns the values sampled at or after start, newest first.
+        """
+        
+        values = []
+        i      = self.pos
+        
+        for n in range(self.count):
+            i = (i - 1) % self.size
+            
+            if self.times[i] < start:
+                break
+            
+            values.append(self.values[i])
+        
+        return values
+
+# csv/tsv columns of AgentCollector.rollups()
+AGENT_ROLLUP_COLUMNS = [(name, lambda row, name=name: row.get(name)) for name in
+    ('timestamp', 'corp', 'site', 'agent', 'metric', 'window', 'samples', 'min', 'max', 'avg', 'p95')]
+
+class AgentCollector:
+    """
+    AgentCollector(sigsci=<SigSciAPI>, sites=<list>, metrics=<list>, windows=<list>, interval=<float>, concurrency=<int>)
+    
+    Polls /agents of many sites concurrently over one login (see
+    SigSciFanout) and keeps every numeric metric of every agent in a
+    RingBuffer holding the longest window at the poll interval. Agents not
+    seen for the longest window are dropped, so memory is bounded by the
+    fleet size however long the collector runs. Sites are discovered
+    again every hour when none are given.
+    
+    Example:
+        collector = AgentCollector(sigsci, ['www.foo.com', 'api.foo.com'], ['agent.rpm'], ['1m', '5m', '1h'], 15)
+        while True:
+            now = time.time()
+            collector.poll(now)
+            for row in collector.rollups(now):
+                print(row['agent'], row['window'], row['p95'])
+            time.sleep(15)
+    """
+    
+    STATS   = ('min', 'max', 'avg', 'p95')
+    METRICS = ['agent.rpm', 'agent.current_requests', 'agent.decision_time_50th', 'agent.decision_time_95th',
+               'agent.latency_time_95th', 'agent.connections_dropped', 'agent.upload_metadata_failures', 'host.agent_cpu']
+    WINDOWS = ['1m', '5m', '1h']
+    
+    def __init__(self, sigsci, sites=None, metrics=None, windows=None, interval=15, concurrency=8):
+        self.fanout     = SigSciFanout(sigsci, sites, concurrency)
+        self.discover   = not sites
+        self.discovered = 0
+        self.metrics    = metrics or self.METRICS
+        self.windows    = [(window, parse_duration(window)) for window in windows or self.WINDOWS]
+        self.longest    = max(seconds for window, seconds in self.windows)
+        self.size       = int(math.ceil(self.longest / float(interval))) + 1
+        self.agents     = {}
+    
+    def add(self, record, now):
+        key   = (record['corp'], record['site'], record.get('agent.name'))
+        agent = self.agents.get(key)
+        
+        if None == agent:
+            agent = self.agents[key] = { 'seen': now, 'series': {} }
+        
+        agent['seen'] = now
+        
+        for metric in self.metrics:
+            value = record.get(metric)
+            
+            if isinstance(value, bool) or not isinstance(value, numbers.Number):
+                continue
+            
+            if metric not in agent['series']:
+                agent['series'][metric] = RingBuffer(self.size)
+            
+            agent['series'][metric].append(now, value)
+    
+    def poll(self, now=None):
+        """
+        AgentCollector.poll(now=<float>)
+        
+        Samples every agent of every site at now (default: the current
+        time). Returns a dict of corp/site to agent count, or to the
+        exception that stopped that site.
+        """
+        
+        now = now or time.time()
+        
+        # the site list is kept between polls, refreshed hourly.
+        if self.discover and now - self.discovered >= 3600:
+            self.fanout.sites = None
+            self.fanout.sites = ['%s/%s' % site for site in self.fanout.discover_sites()]
+            self.discovered   = now
+        
+        results = self.fanout.run('agents', lambda record: self.add(record, now))
+        
+        for key in [key for key, agent in self.agents.items() if agent['seen'] < now - self.longest]:
+            del self.agents[key]
+        
+        return results
+    
+    def rollups(self, now):
+        """
+        AgentCollector.rollups(now=<float>)
+        
+        Yields the min, max, avg and p95 (nearest rank) of every metric of
+        every agent over each window ending at now, as
+            { 'timestamp', 'corp', 'site', 'agent', 'metric', 'window',
+              'samples', 'min', 'max', 'avg', 'p95' }
+        """
+        
+        for (corp, site, name), agent in sorted(self.agents.items()):
+            for metric in self.metrics:
+                series = agent['series'].get(metric)
+                
+                if None == series:
+                    continue
+                
+                for window, seconds in self.windows:
+                    values = sorted(series.since(now - seconds))
+                    
+                    if values:
+                        yield { 'timestamp': int(now), 'corp': corp, 'site': site, 'agent': name, 'metric': metric, 'window': window,
+                                'samples': len(values), 'min': values[0], 'max': values[-1], 'avg': sum(values) / len(values),
+                                'p95': values[int(math.ceil(0.95 * len(values))) - 1] }
+    
+    def prometheus(self, rollups):
+        """
+        AgentCollector.prometheus(rollups=<iterable>)
+        
+        Returns rollups in the Prometheus text format, one
+        sigsci_agent_rollup gauge per metric, window and statistic.
+        """
+        
+        lines = ['# TYPE sigsci_agent_rollup gauge']
+        
+        for row in rollups:
+            labels = ','.join('%s="%s"' % (label, str(row[label]).replace('\\', '\\\\').replace('"', '\\"'))
+                              for label in ('corp', 'site', 'agent', 'metric', 'window'))
+            
+            for stat in self.STATS:
+                lines.append('sigsci_agent_rollup{%s,stat="%s"} %r' % (labels, stat, float(row[stat])))
+        
+        return '\n'.join(lines) + '\n'
+
+TAGLIST = ('SQLI', 'XSS', 'CMDEXE', 'TRAVERSAL', 'USERAGENT', 'BACKDOOR', 'SCANNER', 'RESPONSESPLIT', 'CODEINJECTION',
+    'HTTP4XX', 'HTTP404', 'HTTP500', 'SANS', 'DATACENTER', 'TORNODE', 'NOUA', 'NOTUTF8', 'BLOCKED', 'PRIVATEFILES', 'FORCEFULBROWSING', 'WEAKTLS')
+
+def comma_list(value):
+    return value.split(',')
+
+# command line settings: the SigSciAPI attribute (and --argument dest) it sets, its name in the
+# configuration section of SigSci.py and as SIGSCI_<name> in the environment, and how the
+# environment value is parsed. The environment overrides the configuration section, arguments
+# override both. There is no command line argument for EMAIL, PASSWORD, CORP or SITE.
+SETTINGS = (
+    ('email',                        'EMAIL',                        None),
+    ('pword',                        'PASSWORD',                     None),
+    ('corp',                         'CORP',                         None),
+    ('site',                         'SITE',                         None),
+    ('from_time',                    'FROM',                         None),
+    ('until_time',                   'UNTIL',                        None),
+    ('tags',                         'TAGS',                         None),
+    ('ctags',                        'CTAGS',                        None),
+    ('server',                       'SERVER',                       None),
+    ('limit',                        'LIMIT',                        None),
+    ('field',                        'FIELD',                        None),
+    ('fields',                       'FIELDS',                       None),
+    ('file',                         'FILE',                         None),
+    ('format',                       'FORMAT',                       None),
+    ('sort',                         'SORT',                         None),
+    ('agents',                       'AGENTS',                       None),
+    ('feed',                         'FEED',                         None),
+    ('follow',                       'FOLLOW',                       None),
+    ('ingest',                       'INGEST',                       None),
+    ('local',                        'LOCAL',                        None),
+    ('whitelist_parameters',         'WHITELIST_PARAMETERS',         None),
+    ('whitelist_parameters_add',     'WHITELIST_PARAMETERS_ADD',     None),
+    ('whitelist_parameters_delete',  'WHITELIST_PARAMETERS_DELETE',  None),
+    ('whitelist_parameters_sync',    'WHITELIST_PARAMETERS_SYNC',    None),
+    ('whitelist_paths',              'WHITELIST_PATHS',              None),
+    ('whitelist_paths_add',          'WHITELIST_PATHS_ADD',          None),
+    ('whitelist_paths_delete',       'WHITELIST_PATHS_DELETE',       None),
+    ('whitelist_paths_sync',         'WHITELIST_PATHS_SYNC',         None),
+    ('whitelist',                    'WHITELIST',                    None),
+    ('whitelist_add',                'WHITELIST_ADD',                None),
+    ('whitelist_delete',             'WHITELIST_DELETE',             None),
+    ('whitelist_sync',               'WHITELIST_SYNC',               None),
+    ('blacklist',                    'BLACKLIST',                    None),
+    ('blacklist_add',                'BLACKLIST_ADD',                None),
+    ('blacklist_delete',             'BLACKLIST_DELETE',             None),
+    ('blacklist_sync',               'BLACKLIST_SYNC',               None),
+    ('blacklist_candidates',         'BLACKLIST_CANDIDATES',         None),
+    ('redactions',                   'REDACTIONS',                   None),
+    ('redactions_add',               'REDACTIONS_ADD',               None),
+    ('redactions_delete',            'REDACTIONS_DELETE',            None),
+    ('redactions_sync',              'REDACTIONS_SYNC',              None),
+    ('pool_size',                    'POOL_SIZE',                    None),
+    ('max_retries',                  'MAX_RETRIES',                  None),
+    ('connect_timeout',              'CONNECT_TIMEOUT',              None),
+    ('read_timeout',                 'READ_TIMEOUT',                 None),
+    ('stats',                        'STATS',                        None),
+    ('stats_file',                   'STATS_FILE',                   None),
+    ('prometheus',                   'PROMETHEUS',                   None),
+    ('statsd',                       'STATSD',                       None),
+    ('rate',                         'RATE',                         None),
+    ('retries',                      'RETRIES',                      None),
+    ('backoff',                      'BACKOFF',                      None),
+    ('prefetch',                     'PREFETCH',                     None),
+    ('flush_size',                   'FLUSH_SIZE',                   None),
+    ('row_group_size',               'ROW_GROUP_SIZE',               None),
+    ('compression',                  'COMPRESSION',                  None),
+    ('codec',                        'CODEC',                        None),
+    ('raw_pages',                    'RAW_PAGES',                    None),
+    ('parallel',                     'PARALLEL',                     None),
+    ('slice',                        'SLICE',                        None),
+    ('sites',                        'SITES',                        comma_list),
+    ('all_sites',                    'ALL_SITES',                    None),
+    ('concurrency',                  'CONCURRENCY',                  None),
+    ('session_cache',                'SESSION_CACHE',                None),
+    ('session_ttl',                  'SESSION_TTL',                  None),
+    ('bulk_workers',                 'BULK_WORKERS',                 None),
+    ('bulk_rate',                    'BULK_RATE',                    None),
+    ('bulk_retries',                 'BULK_RETRIES',                 None),
+    ('report',                       'REPORT',                       None),
+    ('checkpoint',                   'CHECKPOINT',                   None),
+    ('catchup',                      'CATCHUP',                      None),
+    ('status_file',                  'STATUS_FILE',                  None),
+    ('agent_interval',               'AGENT_INTERVAL',               None),
+    ('agent_windows',                'AGENT_WINDOWS',                comma_list),
+    ('agent_metrics',                'AGENT_METRICS',                comma_list),
+    ('aggregate',                    'AGGREGATE',                    str.split),
+    ('top',                          'TOP',                          None),
+    ('aggregate_capacity',           'AGGREGATE_CAPACITY',           None),
+    ('thresholds',                   'THRESHOLDS',                   None),
+    ('candidate_window',             'CANDIDATE_WINDOW',             None),
+    ('candidate_expires',            'CANDIDATE_EXPIRES',            None),
+    ('store',                        'STORE',                        None),
+    ('response_cache',               'RESPONSE_CACHE',               None),
+    ('cache_dir',                    'CACHE_DIR',                    None),
+    ('cache_size',                   'CACHE_SIZE',                   None),
+    ('cache_files',                  'CACHE_FILES',                  None),
+    ('cache_ttl',                    'CACHE_TTL',                    None),
+)
+
+def argument_parser():
+    parser = argparse.ArgumentParser(description='Signal Sciences API Client.', prefix_chars='--')
+    
+    parser.add_argument('--from',   help='Filter results from a specified time.', dest='from_time', metavar=' =<value>', type=str, default=None)
+    parser.add_argument('--until',  help='Filter results until a specified time.', dest='until_time', metavar='=<value>')
+    parser.add_argument('--tags',   help='Filter results on one or more tags.', nargs='*')
+    parser.add_argument('--ctags',  help='Filter results on one or more custom tags.', nargs='*')
+    parser.add_argument('--server', help='Filter results by server name.', default=None)
+    parser.add_argument('--limit',  help='Limit the number of results returned from the server (default: 100).', type=int, default=100)
+    parser.add_argument('--field',  help='Specify fields to return (default: data).', type=str, default=None, choices=['all', 'totalCount', 'next', 'data'])
+    parser.add_argument('--fields', help='Export only these request fields, comma separated dotted paths (e.g. timestamp,remoteIP,tags.type).', type=str, default=None)
+    parser.add_argument('--file',   help='Output results to the specified file.', type=str, default=None)
+    parser.add_argument('--list',   help='List all supported tags', default=False, action='store_true')
+    parser.add_argument('--format', help='Specify output format (default: json, ndjson with --feed --follow).', type=str, default=None, choices=['json', 'ndjson', 'csv', 'tsv', 'parquet', 'prometheus'])
+    parser.add_argument('--sort',   help='Specify sort order (default: desc).', type=str, default=None, choices=['desc', 'asc'])
+    parser.add_argument('--agents', help='Retrieve agent metrics.', default=False, action='store_true')
+    parser.add_argument('--feed',   help='Retrieve data feed.', default=False, action='store_true')
+    parser.add_argument('--follow', help='With --feed, keep exporting new requests every minute until stopped. With --agents, collect agent metric rollups.', default=False, action='store_true')
+    parser.add_argument('--ingest', help='Add the requests in --file (json or ndjson output) to the local store.', default=False, action='store_true')
+    parser.add_argument('--local',  help='Run the query against the local store instead of the API.', default=False, action='store_true')
+    parser.add_argument('--whitelist-parameters',  help='Retrieve whitelist parameters.', default=False, action='store_true')
+    parser.add_argument('--whitelist-parameters-add',  help='Add whitelist parameters.', default=False, action='store_true')
+    parser.add_argument('--whitelist-parameters-delete',  help='Delete whitelist parameters.', default=False, action='store_true')
+    parser.add_argument('--whitelist-parameters-sync',  help='Sync whitelist parameters with the file, sending only the changes.', default=False, action='store_true')
+    parser.add_argument('--whitelist-paths',  help='Retrieve whitelist paths.', default=False, action='store_true')
+    parser.add_argument('--whitelist-paths-add',  help='Add whitelist paths.', default=False, action='store_true')
+    parser.add_argument('--whitelist-paths-delete',  help='Delete whitelist paths.', default=False, action='store_true')
+    parser.add_argument('--whitelist-paths-sync',  help='Sync whitelist paths with the file, sending only the changes.', default=False, action='store_true')
+    parser.add_argument('--whitelist',  help='Retrieve IP whitelist.', default=False, action='store_true')
+    parser.add_argument('--whitelist-add',  help='Add to IP whitelist.', default=False, action='store_true')
+    parser.add_argument('--whitelist-delete',  help='Delete IP whitelist.', default=False, action='store_true')
+    parser.add_argument('--whitelist-sync',  help='Sync IP whitelist with the file, sending only the changes.', default=False, action='store_true')
+    parser.add_argument('--blacklist',  help='Retrieve IP blacklist.', default=False, action='store_true')
+    parser.add_argument('--blacklist-add',  help='Add to IP blacklist.', default=False, action='store_true')
+    parser.add_argument('--blacklist-delete',  help='Delete IP blacklist.', default=False, action='store_true')
+    parser.add_argument('--blacklist-sync',  help='Sync IP blacklist with the file, sending only the changes.', default=False, action='store_true')
+    parser.add_argument('--blacklist-candidates',  help='With --feed, write a blacklist of the IPs over --thresholds instead of the requests.', default=False, action='store_true')
+    parser.add_argument('--redactions',  help='Retrieve redactions.', default=False, action='store_true')
+    parser.add_argument('--redactions-add',  help='Add to redactions.', default=False, action='store_true')
+    parser.add_argument('--redactions-delete',  help='Delete redactions.', default=False, action='store_true')
+    parser.add_argument('--redactions-sync',  help='Sync redactions with the file, sending only the changes.', default=False, action='store_true')
+    parser.add_argument('--pool-size',        help='Number of keep-alive connections to pool (default: 10).', type=int, default=None)
+    parser.add_argument('--max-retries',      help='Retries for failed connection attempts (default: 3).', type=int, default=None)
+    parser.add_argument('--connect-timeout',  help='Connection timeout in seconds (default: 10).', type=float, default=None)
+    parser.add_argument('--read-timeout',     help='Read timeout in seconds (default: 60).', type=float, default=None)
+    parser.add_argument('--stats',            help='Print a timing breakdown to stderr at the end of the run.', default=None, action='store_true')
+    parser.add_argument('--stats-file',       help='Write the run statistics as json to the specified file.', type=str, default=None)
+    parser.add_argument('--prometheus',       help='Write the run statistics in the Prometheus text format to the specified file.', type=str, default=None)
+    parser.add_argument('--statsd',           help='Send timings and counts to a StatsD server (host:port).', type=str, default=None)
+    parser.add_argument('--rate',             help='Most API requests per second, 0 for no limit (default: 0).', type=float, default=None)
+    parser.add_argument('--retries',          help='Retries for throttled, unavailable and connection errors (default: 3).', type=int, default=None)
+    parser.add_argument('--backoff',          help='Seconds before the first retry, doubled for each retry (default: 0.5).', type=float, default=None)
+    parser.add_argument('--prefetch',         help='Feed pages to fetch ahead of writing, 0 disables (default: 4).', type=int, default=None)
+    parser.add_argument('--flush-size',       help='Output characters buffered before each write (default: 65536).', type=int, default=None)
+    parser.add_argument('--row-group-size',   help='Records per parquet row group (default: 65536).', type=int, default=None)
+    parser.add_argument('--compression',      help='Parquet compression codec (default: snappy).', type=str, default=None, choices=['none', 'snappy', 'gzip', 'brotli', 'lz4', 'zstd'])
+    parser.add_argument('--codec',            help='JSON library, auto picks orjson or ujson when installed (default: auto).', type=str, default=None, choices=['auto', 'orjson', 'ujson', 'json'])
+    parser.add_argument('--raw-pages',        help='With --feed and json output, write each page as received, one response per line.', default=None, action='store_true')
+    parser.add_argument('--parallel',         help='Query time slices concurrently on N threads (default: 1).', type=int, default=None)
+    parser.add_argument('--slice',            help='Length of each parallel query time slice (default: 10m).', type=str, default=None)
+    parser.add_argument('--sites',            help='Run the query, feed or agents pull for one or more sites (site or corp/site).', nargs='*')
+    parser.add_argument('--all-sites',        help='Run the query, feed or agents pull for every site.', default=None, action='store_true')
+    parser.add_argument('--concurrency',      help='Number of sites pulled at the same time (default: 8).', type=int, default=None)
+    parser.add_argument('--session-cache',    help='Cache the login session cookie in the specified file.', type=str, default=None)
+    parser.add_argument('--session-ttl',      help='Seconds to cache session cookies that have no expiry (default: 3600).', type=int, default=None)
+    parser.add_argument('--bulk-workers',     help='Items added or deleted at the same time (default: 4).', type=int, default=None)
+    parser.add_argument('--bulk-rate',        help='Add/delete requests per second, 0 for no limit (default: 10).', type=float, default=None)
+    parser.add_argument('--bulk-retries',     help='Retries per added or deleted item (default: 3).', type=int, default=None)
+    parser.add_argument('--report',           help='Write the add/delete results report to the specified file.', type=str, default=None)
+    parser.add_argument('--checkpoint',       help='Resume the feed from, and record progress in, the specified file.', type=str, default=None)
+    parser.add_argument('--catchup',          help='Longest feed window exported at once when catching up (default: 1h).', type=str, default=None)
+    parser.add_argument('--status-file',      help='With --follow, rewrite the daemon status as json to the specified file after every poll.', type=str, default=None)
+    parser.add_argument('--agent-interval',   help='With --agents --follow, seconds between agent polls (default: 15).', type=float, default=None)
+    parser.add_argument('--agent-windows',    help='With --agents --follow, rollup windows (default: 1m 5m 1h).', nargs='*')
+    parser.add_argument('--agent-metrics',    help='With --agents --follow, agent metrics rolled up (default: rpm, requests, latency, cpu, ...).', nargs='*')
+    parser.add_argument('--aggregate',        help='Write the top counts of each group instead of the requests, e.g. remoteIP tags.type path,tags.type.', nargs='*')
+    parser.add_argument('--top',              help='Rows written per aggregate (default: 20).', type=int, default=None)
+    parser.add_argument('--aggregate-capacity', help='Keys tracked per aggregate, counts are exact up to this many distinct keys (default: 10000).', type=int, default=None)
+    parser.add_argument('--thresholds',       help='Tag hits per IP within --candidate-window that make a blacklist candidate (default: SQLI=10 XSS=10 CMDEXE=5).', nargs='*')
+    parser.add_argument('--candidate-window', help='Sliding window of request time for --thresholds (default: 10m).', type=str, default=None)
+    parser.add_argument('--candidate-expires', help='Expiry of blacklist candidates, empty for none (default: 24h).', type=str, default=None)
+    parser.add_argument('--store',            help='Local request store (SQLite) for --feed, --ingest and --local.', type=str, default=None)
+    parser.add_argument('--response-cache',   help='Reuse agent, list and query responses while they are fresh.', default=None, action='store_true')
+    parser.add_argument('--cache-dir',        help='Also keep cached responses in the specified directory across runs.', type=str, default=None)
+    parser.add_argument('--cache-size',       help='Responses kept in memory (default: 256).', type=int, default=None)
+    parser.add_argument('--cache-files',      help='Responses kept in --cache-dir, the oldest are removed first (default: 1024).', type=int, default=None)
+    parser.add_argument('--cache-ttl',        help='Cache lifetime per endpoint, e.g. agents=15 configuration=5m requests=0 (default: agents=15 configuration=300 requests=60).', nargs='*')
+    
+    return parser
+
+def valid_tags(tags, message):
+    # prints the first tag that is not a supported tag
+    for tag in tags or []:
+        if tag.upper() not in TAGLIST:
+            print(message % str(tag))
+            return False
+    
+    return True
+
+def run_sites(sigsci):
+    # authenticate once and pull every site over the same session
+    if sigsci.authenticate():
+        if sigsci.agents and sigsci.follow:
+            sigsci.collect_agents()
+        elif sigsci.agents:
+            sigsci.get_fanout('agents')
+        elif sigsci.feed:
+            sigsci.get_fanout('feed')
+        elif valid_tags(sigsci.tags, 'Invalid tag in tag list: %s'):
+            sigsci.build_query()
+            sigsci.get_fanout('query')
+
+def run_ingest(sigsci):
+    # add exported requests to the local store, no api calls
+    if not sigsci.file or not sigsci.store:
+        print('File and store must be provided.')
+    else:
+        sigsci.ingest_file()
+
+def run_local(sigsci):
+    # query the local store, no api calls
+    if not sigsci.store:
+        print('Store must be provided.')
+    else:
+        sigsci.build_query()
+        sigsci.query_store()
+
+def run_agents(sigsci):
+    # authenticate and get agent metrics, once or every interval until stopped
+    if sigsci.authenticate():
+        if sigsci.follow:
+            sigsci.collect_agents()
+        else:
+            sigsci.get_agent_metrics()
+
+def run_feed(sigsci):
+    # verify threshold tags are supported tags
+    if sigsci.blacklist_candidates and not valid_tags(parse_thresholds(sigsci.thresholds), 'Invalid tag in thresholds: %s'):
+        return
+    
+    # verify the output can be followed or resumed
+    if None != sigsci.feed_output_error():
+        print(sigsci.feed_output_error())
+        return
+    
+    # authenticate and get feed, once or every minute until stopped
+    if sigsci.authenticate():
+        if sigsci.follow:
+            sigsci.follow_feed()
+        else:
+            sigsci.get_feed_requests()
+
+def run_configuration(sigsci, method, needs_file):
+    # authenticate and get, post, delete or sync the configuration
+    if sigsci.authenticate():
+        if needs_file and not sigsci.file:
+            print('File must be provided.')
+        else:
+            getattr(sigsci, method)()
+
+def run_query(sigsci):
+    # authenticate, build the query, and run the query.
+    if valid_tags(sigsci.tags, 'Invalid tag in tag list: %s') and sigsci.authenticate():
+        sigsci.build_query()
+        sigsci.query_api()
+
+# commands: the setting that selects it, the function running it and that function's
+# further arguments. The first command set runs, run_query() when none is.
+COMMANDS = (
+    ('sites',                        run_sites,          ()),
+    ('all_sites',                    run_sites,          ()),
+    ('ingest',                       run_ingest,         ()),
+    ('local',                        run_local,          ()),
+    ('agents',                       run_agents,         ()),
+    ('feed',                         run_feed,           ()),
+    ('whitelist_parameters',         run_configuration,  ('get_whitelist_parameters',     False)),
+    ('whitelist_parameters_add',     run_configuration,  ('post_whitelist_parameters',    True)),
+    ('whitelist_parameters_delete',  run_configuration,  ('delete_whitelist_parameters',  True)),
+    ('whitelist_parameters_sync',    run_configuration,  ('sync_whitelist_parameters',    True)),
+    ('whitelist_paths',              run_configuration,  ('get_whitelist_paths',          False)),
+    ('whitelist_paths_add',          run_configuration,  ('post_whitelist_paths',         True)),
+    ('whitelist_paths_delete',       run_configuration,  ('delete_whitelist_paths',       True)),
+    ('whitelist_paths_sync',         run_configuration,  ('sync_whitelist_paths',         True)),
+    ('whitelist',                    run_configuration,  ('get_whitelist',                False)),
+    ('whitelist_add',                run_configuration,  ('post_whitelist',               True)),
+    ('whitelist_delete',             run_configuration,  ('delete_whitelist',             True)),
+    ('whitelist_sync',               run_configuration,  ('sync_whitelist',               True)),
+    ('blacklist',                    run_configuration,  ('get_blacklist',                False)),
+    ('blacklist_add',                run_configuration,  ('post_blacklist',               True)),
+    ('blacklist_delete',             run_configuration,  ('delete_blacklist',             True)),
+    ('blacklist_sync',               run_configuration,  ('sync_blacklist',               True)),
+    ('redactions',                   run_configuration,  ('get_redactions',               False)),
+    ('redactions_add',               run_configuration,  ('post_redactions',              True)),
+    ('redactions_delete',            run_configuration,  ('delete_redactions',            True)),
+    ('redactions_sync',              run_configuration,  ('sync_redactions',              True)),
+)
+
+def main(settings, argv=None):
+    """
+    main(settings=<dict>, argv=<list>)
+    
+    Runs the command line client. settings holds the configuration
+    section of SigSci.py, e.g. its globals(), overridden by SIGSCI_*
+    environment variables and then by the arguments in argv (default:
+    sys.argv[1:]). See SETTINGS and COMMANDS.
+    """
+    
+    arguments = argument_parser().parse_args(argv)
+    
+    # list supported tags and quit
+    if arguments.list:
+        print('Supported tags:')
+        for tag in TAGLIST:
+            print('\t%s' % str(tag))
+        
+        return
+    
+    # setup and run api query
+    sigsci = SigSciAPI()
+    
+    for attribute, setting, parse in SETTINGS:
+        value    = settings.get(setting)
+        variable = os.environ.get('SIGSCI_' + setting)
+        argument = getattr(arguments, attribute, None)
+        
+        if None != variable:
+            value = parse(variable) if None != parse else variable
+        
+        if None != argument:
+            value = argument
+        
+        setattr(sigsci, attribute, value)
+    
+    # a followed feed never closes a json array, write one record per line instead.
+    if None == sigsci.format:
+        sigsci.format = 'ndjson' if sigsci.feed and sigsci.follow and not sigsci.agents else 'json'
+    
+    # report run statistics however the run ends, including quit() on errors.
+    atexit.register(sigsci.stats_out)
+    
+    # verify the agent collector can write the format, for one site or many
+    if sigsci.agents and sigsci.follow:
+        if 'prometheus' == sigsci.format and not sigsci.file:
+            print('File must be provided for prometheus output.')
+            return
+        
+        if 'parquet' == sigsci.format:
+            print('Agent rollups are written as json, ndjson, csv, tsv or prometheus.')
+            return
+    
+    run, run_arguments = next(((run, run_arguments) for setting, run, run_arguments in COMMANDS if getattr(sigsci, setting)), (run_query, ()))
+    run(sigsci, *run_arguments)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# Agent fleet collector against the local mock API. Simulates hours of
+# 15 second polls of every site's agents (the clock is advanced instead
+# of waited for) and reports poll and rollup time and peak RSS, which
+# stays flat once the longest window is full.
+#
+# Usage: python benchmarks/bench_agent_collector.py [sites] [agents] [polls]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.dont_write_bytecode = True
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import mock_api
+from bench_connections import client
+from SigSci import AgentCollector
+
+def peak_rss_kb():
+    if None == resource:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if 'darwin' == sys.platform else rss
+
+if __name__ == '__main__':
+    sites         = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    agents        = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    polls         = int(sys.argv[3]) if len(sys.argv) > 3 else 480
+    server        = mock_api.start()
+    server.sites  = sites
+    server.agents = agents
+    server.etags  = False
+    sigsci        = client(server)
+    sigsci.corp   = 'corp'
+    sigsci.authenticate()
+
+    collector = AgentCollector(sigsci, None, None, ['1m', '5m', '1h'], 15, 8)
+    now       = time.time()
+
+    for i in range(polls):
+        start = time.time()
+        collector.poll(now)
+        polled = time.time() - start
+        rows   = list(collector.rollups(now))
+
+        if 0 == (i + 1) % 60:
+            print('poll=%-5d agents=%-5d rollups=%-6d poll=%.3fs rollup=%.3fs peak_rss=%s KB' % (i + 1, len(collector.agents), len(rows), polled, time.time() - start - polled, peak_rss_kb()))
+
+        now += 15
+
+    server.shutdown()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# AsyncSigSciAPI against the local mock API: the feed, a parallel query
+# and a configuration round trip, then the same feed with 503s injected,
+# which must be retried, and html 502 pages, which must raise naming the
+# status. Checks the results against the threaded SigSciAPI and imports
+# the client as a package, as the README shows.
+#
+# Requires Python 3.6+ and aiohttp.
+#
+# Usage: python benchmarks/bench_async.py [concurrency] [pages]
+
+import os
+import sys
+import time
+import asyncio
+import importlib
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, '..'))
+sys.dont_write_bytecode = True
+
+import mock_api
+from bench_connections import client
+
+# the repository directory is the package, e.g. SigSciApiPy.SigSciAsync
+AsyncSigSciAPI = importlib.import_module(os.path.basename(os.path.abspath(ROOT)) + '.SigSciAsync').AsyncSigSciAPI
+
+def async_client(server, concurrency):
+    sigsci = AsyncSigSciAPI(concurrency=concurrency)
+    
+    for name in ('base', 'base_url', 'email', 'pword', 'corp', 'site', 'limit'):
+        setattr(sigsci, name, getattr(client(server), name))
+    
+    sigsci.backoff = 0.01
+    return sigsci
+
+def sliced(sigsci, window):
+    sigsci.parallel   = 4
+    sigsci.slice      = '10m'
+    sigsci.limit      = 100000
+    sigsci.until_time = str(window[1])
+    sigsci.from_time  = str(window[0])
+    sigsci.build_query()
+
+async def run(server, concurrency, window):
+    async with async_client(server, concurrency) as sigsci:
+        assert await sigsci.authenticate(), 'login failed'
+        
+        start   = time.time()
+        records = await sigsci.get_feed_requests()
+        wall    = time.time() - start
+        print('feed      records=%-6d wall=%.3fs records/sec=%.0f' % (len(records), wall, len(records) / wall))
+        
+        sliced(sigsci, window)
+        start = time.time()
+        j     = await sigsci.query_api()
+        wall  = time.time() - start
+        print('query     records=%-6d wall=%.3fs records/sec=%.0f' % (len(j['data']), wall, len(j['data']) / wall))
+        
+        items   = [{ 'source': '10.0.0.%d' % i, 'note': 'bench' } for i in range(20)]
+        created = await sigsci.post_whitelist({ 'data': items })
+        listed  = await sigsci.get_whitelist()
+        await sigsci.delete_whitelist({ 'data': created })
+        left    = await sigsci.get_whitelist()
+        
+        assert sorted(item['source'] for item in listed['data']) == sorted(item['source'] for item in items), 'posted items not listed'
+        assert [] == left['data'], 'deleted items still listed'
+        print('config    posted=%d deleted=%d' % (len(created), len(created)))
+        
+        return [record['id'] for record in records], [record['timestamp'] for record in j['data']]
+
+async def retried(server, concurrency):
+    async with async_client(server, concurrency) as sigsci:
+        assert await sigsci.authenticate(), 'login failed'
+        
+        server.errors = 0.2
+        sigsci.retries = 10
+        records       = await sigsci.get_feed_requests()
+        server.errors = 0.0
+        stats         = sigsci.get_scheduler().stats
+        print('503s      records=%-6d retried=%d failed=%d' % (len(records), stats['retried'], stats['failed']))
+        assert 0 < stats['retried'] and 0 == stats['failed'], 'injected 503s were not retried'
+        
+        server.bad_gateway = 1.0
+        sigsci.retries     = 1
+        sigsci.scheduler   = None
+        
+        try:
+            await sigsci.get_agent_metrics()
+        except ValueError as e:
+            error = str(e)
+        else:
+            error = None
+        
+        server.bad_gateway = 0.0
+        print('502 page  error=%r retried=%d' % (error, sigsci.get_scheduler().stats['retried']))
+        assert 'HTTP 502 Bad Gateway' == error, 'html 502 page did not raise naming the status'
+        
+        return [record['id'] for record in records]
+
+if __name__ == '__main__':
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    pages       = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    server      = mock_api.start()
+    until       = int(time.time()) // 60 * 60
+    window      = (until - 7200, until)
+    
+    server.pages = pages
+    server.step  = 5
+    
+    ids, times = asyncio.run(run(server, concurrency, window))
+    
+    sigsci = client(server)
+    sigsci.authenticate()
+    sliced(sigsci, window)
+    
+    assert ids == [record['id'] for record in sigsci.iter_feed_requests()], 'feed differs from SigSciAPI'
+    assert times == [record['timestamp'] for record in sigsci.query_slices()['data']], 'query differs from SigSciAPI'
+    assert ids == asyncio.run(retried(server, concurrency)), 'feed with retries differs'
+    
+    server.shutdown()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# Compares connections opened per API call with and without the shared
+# SigSciAPI session, against the local mock API.
+#
+# Usage: python benchmarks/bench_connections.py [calls]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.dont_write_bytecode = True
+
+import requests
+import mock_api
+from SigSci import SigSciAPI
+
+def client(server):
+    sigsci          = SigSciAPI()
+    sigsci.base     = server.base
+    sigsci.base_url = server.base + '/api/v0'
+    sigsci.email    = 'bench@example.com'
+    sigsci.pword    = 'bench'
+    sigsci.corp     = 'corp'
+    sigsci.site     = 'site'
+    sigsci.limit    = 10
+    sigsci.file     = os.devnull
+    return sigsci
+
+def unpooled(sigsci, calls):
+    # what every endpoint method did before the shared session
+    headers = { 'Content-type': 'application/json', 'User-Agent': sigsci.ua }
+    authn   = requests.post(sigsci.base_url + sigsci.LOGIN_EP, data = { 'email': sigsci.email, 'password': sigsci.pword }, allow_redirects = False)
+    url     = sigsci.base_url + sigsci.CORPS_EP + sigsci.corp + sigsci.SITES_EP + sigsci.site + sigsci.REQEUSTS_EP + '?q=from:-1h&limit=10'
+    for i in range(calls):
+        requests.get(url, cookies=authn.cookies, headers=headers).text
+
+def pooled(sigsci, calls):
+    sigsci.authenticate()
+    sigsci.build_query()
+    for i in range(calls):
+        sigsci.query_api()
+
+def measure(name, server, run, calls):
+    server.reset_counters()
+    start = time.time()
+    run(client(server), calls)
+    wall  = time.time() - start
+    print('%-10s requests=%-5d connections=%-5d connections/request=%.3f wall=%.3fs' % (name, server.requests, server.connections, float(server.connections) / server.requests, wall))
+
+if __name__ == '__main__':
+    calls  = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    server = mock_api.start()
+    
+    measure('before', server, unpooled, calls)
+    measure('after', server, pooled, calls)
+    server.shutdown()
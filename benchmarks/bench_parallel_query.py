@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# Time-sliced query export against the local mock API, sequential versus
+# parallel slices. Also checks the merged output is complete and ordered,
+# and that --limit applies to the whole merged search.
+#
+# Usage: python benchmarks/bench_parallel_query.py [parallel] [slice] [window]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.dont_write_bytecode = True
+
+import SigSci
+import mock_api
+from bench_connections import client
+
+def export(server, parallel, length, window, sort, limit=100000):
+    sigsci            = client(server)
+    sigsci.limit      = limit
+    sigsci.parallel   = parallel
+    sigsci.slice      = length
+    sigsci.pool_size  = max(parallel, 10)
+    sigsci.until_time = str(int(time.time()) // 60 * 60)
+    sigsci.from_time  = str(SigSci.parse_time('-' + window, int(sigsci.until_time)))
+    sigsci.sort       = sort
+    sigsci.authenticate()
+    
+    start = time.time()
+    j     = sigsci.query_slices()
+    wall  = time.time() - start
+    times = [row['timestamp'] for row in j['data']]
+    
+    assert times == sorted(times, reverse='asc' != sort), 'merged output out of order'
+    assert len(times) == len(set(times)), 'duplicate records across slices'
+    
+    print('parallel=%-3d slice=%-4s sort=%-4s slices=%-4d records=%-6d wall=%.3fs records/sec=%.0f' % (parallel, length, sort, len(sigsci.time_slices()), len(times), wall, len(times) / wall))
+    return times
+
+if __name__ == '__main__':
+    parallel = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    length   = sys.argv[2] if len(sys.argv) > 2 else '10m'
+    window   = sys.argv[3] if len(sys.argv) > 3 else '1d'
+    server   = mock_api.start()
+    
+    server.step    = 5
+    server.latency = 0.05
+    
+    for sort in ('desc', 'asc'):
+        whole  = export(server, 1, length, window, sort)
+        merged = export(server, parallel, length, window, sort)
+        first  = export(server, parallel, length, window, sort, 100)
+        
+        assert whole == merged, 'parallel slices differ from the sequential ones'
+        assert whole[:100] == first, '--limit 100 is not the first 100 records'
+    
+    server.shutdown()
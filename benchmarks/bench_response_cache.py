@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# Dashboard style polling of every site's configuration lists against the
+# local mock API, without and with the response cache. Lists are fetched
+# again every interval, as a dashboard refreshing every 15 seconds would.
+#
+# Usage: python benchmarks/bench_response_cache.py [sites] [polls] [ttl]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.dont_write_bytecode = True
+
+import mock_api
+from bench_connections import client
+from SigSci import SigSciAPI
+
+LISTS = (SigSciAPI.WHITELIST_EP, SigSciAPI.BLACKLIST_EP, SigSciAPI.REDACTIONS_EP)
+
+def poll(server, sites, polls, ttl, cached):
+    sigsci                = client(server)
+    sigsci.response_cache = cached
+    sigsci.cache_ttl      = { 'configuration': ttl }
+    sigsci.authenticate()
+    server.reset_counters()
+    
+    start = time.time()
+    
+    for i in range(polls):
+        for site in range(sites):
+            sigsci.site = 'site%d' % site
+            
+            for EP in LISTS:
+                sigsci.fetch_configuration(EP)
+        
+        # let every entry expire so the next poll revalidates
+        if cached and sigsci.responses:
+            for entry in sigsci.responses.entries.values():
+                entry['expires'] = 0
+    
+    wall  = time.time() - start
+    stats = sigsci.responses.stats if sigsci.responses else {}
+    print('%-9s sites=%-3d polls=%-3d requests=%-5d body_bytes=%-9d wall=%.3fs %s' % ('cached' if cached else 'uncached', sites, polls, server.requests, server.sent, wall, stats))
+
+if __name__ == '__main__':
+    sites  = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    polls  = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    ttl    = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+    server = mock_api.start()
+    
+    # a few hundred list entries shared by every site
+    for i in range(300):
+        item = { 'source': '10.1.%d.%d' % (i // 256, i % 256), 'note': 'bench', 'expires': '' }
+        server.configs[str(server.next_id())] = dict(item, id=str(server.ids))
+    
+    poll(server, sites, polls, ttl, False)
+    poll(server, sites, polls, ttl, True)
+    server.shutdown()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# Startup time of the commands that make no API calls. Each command is
+# run with -X importtime and must not import a module from HEAVY, which
+# are loaded on the paths that need them only, and its median wall time
+# above a bare interpreter must stay within --budget. Exits 1 when a
+# command imports a heavy module or is over budget. SigSci.py imports
+# SigSciLib.py, whose bytecode Python caches, so runs after the first
+# compile only the short launcher.
+#
+# Requires Python 3.7+ for -X importtime.
+#
+# Usage: python benchmarks/bench_startup.py [--budget 0.15] [--repeat 7]
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+SCRIPT   = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'SigSci.py')
+LIBRARY  = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'SigSciLib.py')
+COMMANDS = (['--list'], ['-h'], ['--local'], ['--ingest'])
+HEAVY    = ('requests', 'urllib3', 'pyarrow', 'sqlite3', 'multiprocessing', 'orjson', 'ujson', 'csv', 'datetime', 'socket', 'hashlib')
+
+def run(arguments, importtime=False):
+    # the commands print an error and quit without settings, which is fine here
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + arguments
+    # bytecode is written, as on a user's machine, so SigSciLib.py is compiled by the first run only.
+    env     = dict((name, value) for name, value in os.environ.items() if 'PYTHONDONTWRITEBYTECODE' != name)
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    output  = process.communicate()
+    return output[1].decode('utf8')
+
+def imports(arguments):
+    # (module, self microseconds) of every import, see python -X importtime
+    modules = []
+
+    for line in run(arguments, True).splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_us, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us)))
+
+    return modules
+
+def wall(arguments, repeat):
+    times = []
+
+    for i in range(repeat):
+        start = time.time()
+        run(arguments)
+        times.append(time.time() - start)
+
+    return sorted(times)[len(times) // 2]
+
+def compile_time(path):
+    with open(path) as infile:
+        source = infile.read()
+
+    start = time.time()
+    compile(source, path, 'exec')
+    return time.time() - start
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check the startup time and imports of the no-network commands.')
+    parser.add_argument('--budget', help='Allowed seconds above a bare interpreter (default: 0.15).', type=float, default=0.15)
+    parser.add_argument('--repeat', help='Runs per command, the median is reported (default: 7).', type=int, default=7)
+    options = parser.parse_args()
+
+    if sys.version_info < (3, 7):
+        print('-X importtime requires Python 3.7+.')
+        sys.exit(2)
+
+    bare     = wall(['-c', 'pass'], options.repeat)
+    baseline = set(name for name, self_us in imports(['-c', 'pass']))
+    failures = []
+
+    # the first run writes the cached bytecode of SigSciLib.py.
+    run([SCRIPT, '--list'])
+    
+    print('interpreter %.3fs, compiling SigSci.py %.3fs, SigSciLib.py %.3fs (cached)' % (bare, compile_time(SCRIPT), compile_time(LIBRARY)))
+    print('%-10s %8s %9s %9s %8s  %s' % ('command', 'wall', 'overhead', 'imports', 'modules', 'heavy'))
+
+    for arguments in COMMANDS:
+        command  = ' '.join(arguments)
+        modules  = [(name, self_us) for name, self_us in imports([SCRIPT] + arguments) if name not in baseline]
+        heavy    = sorted(set(name.split('.')[0] for name, self_us in modules if name.split('.')[0] in HEAVY))
+        elapsed  = wall([SCRIPT] + arguments, options.repeat)
+        overhead = elapsed - bare
+
+        print('%-10s %7.3fs %8.3fs %8.3fs %8d  %s' % (command, elapsed, overhead, sum(self_us for name, self_us in modules) / 1e6, len(modules), ' '.join(heavy) or '-'))
+
+        if heavy:
+            failures.append('%s imports %s' % (command, ', '.join(heavy)))
+
+        if overhead > options.budget:
+            failures.append('%s takes %.3fs above the interpreter, budget %.3fs' % (command, overhead, options.budget))
+
+    for failure in failures:
+        print('FAIL %s' % failure)
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# Benchmark suite for the client against the local mock API. Every
+# scenario runs in its own process so peak RSS is measured per scenario,
+# while the mock API runs in this one.
+#
+# Reports records/sec, wall time and peak RSS, optionally saved as json.
+# With --baseline the results are compared to a saved run and the exit
+# status is 1 when a scenario regressed by more than --tolerance.
+#
+# Usage: python benchmarks/bench_suite.py [--records N] [--scenarios ...]
+#            [--json results.json] [--baseline results.json]
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.dont_write_bytecode = True
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import mock_api
+from bench_connections import client
+from SigSci import SigSciAPI, CSVWriter, REQUEST_COLUMNS
+
+SCENARIOS = ('query_json', 'query_csv', 'feed_json', 'feed_ndjson', 'feed_csv', 'feed_pages', 'hold_dicts', 'hold_compact', 'aggregate', 'candidates', 'csv_writer', 'bulk_post', 'bulk_delete')
+
+class Remote:
+    # stands in for the mock server object in the scenario processes
+    def __init__(self, base):
+        self.base = base
+
+def peak_rss_kb():
+    if None == resource:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if 'darwin' == sys.platform else rss
+
+def blacklist_items(count):
+    return [{ 'source': '10.%d.%d.%d' % (i >> 16 & 255, i >> 8 & 255, i & 255), 'note': 'bench', 'expires': '' } for i in range(count)]
+
+def written(sigsci):
+    # records counted by the output writer, 0 means the run failed
+    return sigsci.metrics.counts['records'] if sigsci.metrics else 0
+
+def query(sigsci, options, format):
+    sigsci.format    = format
+    sigsci.limit     = options.records
+    sigsci.from_time = '-%ds' % options.records
+    sigsci.authenticate()
+    sigsci.build_query()
+    sigsci.query_api()
+    return written(sigsci)
+
+def feed(sigsci, options, format):
+    sigsci.format = format
+    sigsci.authenticate()
+    sigsci.get_feed_requests()
+    return written(sigsci)
+
+def feed_pages(sigsci, options):
+    # pages written as received, the records are never parsed
+    sigsci.format    = 'json'
+    sigsci.raw_pages = True
+    sigsci.authenticate()
+    sigsci.get_feed_requests()
+    return sigsci.metrics.counts['pages'] * options.page_size
+
+def hold(sigsci, compact):
+    # the whole feed held in process, peak RSS is what differs
+    sigsci.compact = compact
+    sigsci.authenticate()
+    records        = list(sigsci.iter_feed_requests())
+    return len(records)
+
+def hold_dicts(sigsci, options):
+    return hold(sigsci, False)
+
+def hold_compact(sigsci, options):
+    return hold(sigsci, True)
+
+def aggregate(sigsci, options):
+    # top IPs, tags and paths by tag counted as the feed streams by
+    sigsci.aggregate = ['remoteIP', 'tags.type', 'path,tags.type', 'responseCode']
+    return feed(sigsci, options, 'json')
+
+def candidates(sigsci, options):
+    # per IP tag counts of the feed, against the (empty) mock blacklist
+    sigsci.blacklist_candidates = True
+    sigsci.thresholds           = { 'SQLI': 10, 'XSS': 10, 'CMDEXE': 5 }
+    return feed(sigsci, options, 'json')
+
+def csv_writer(sigsci, options):
+    records = [mock_api.make_request(i, padding=options.record_size) for i in range(options.records)]
+    start   = time.time()
+    writer  = CSVWriter(open(os.devnull, 'w'), REQUEST_COLUMNS)
+    writer.write_all(records)
+    writer.close()
+    return len(records), time.time() - start
+
+def bulk_post(sigsci, options):
+    sigsci.authenticate()
+    report = sigsci.bulk_configuration('POST', SigSciAPI.BLACKLIST_EP, blacklist_items(options.bulk_items))
+    return len(report['succeeded'])
+
+def bulk_delete(sigsci, options):
+    sigsci.authenticate()
+    sigsci.bulk_configuration('POST', SigSciAPI.BLACKLIST_EP, blacklist_items(options.bulk_items))
+    items  = sigsci.fetch_configuration(SigSciAPI.BLACKLIST_EP)['data']
+    start  = time.time()
+    report = sigsci.bulk_configuration('DELETE', SigSciAPI.BLACKLIST_EP, items)
+    return len(report['succeeded']), time.time() - start
+
+def run_scenario(name, options):
+    sigsci              = client(Remote(options.base))
+    sigsci.stats        = True # collect metrics, nothing is printed
+    sigsci.bulk_rate    = 0
+    sigsci.bulk_workers = options.bulk_workers
+    sigsci.backoff      = 0.05
+    sigsci.codec        = options.codec
+    sigsci.fields       = options.fields
+    kind, format        = (name.split('_', 1) + [None])[:2]
+    start               = time.time()
+
+    if 'query' == kind:
+        result = query(sigsci, options, format)
+    elif 'feed' == kind and 'pages' != format:
+        result = feed(sigsci, options, format)
+    else:
+        result = globals()[name](sigsci, options)
+
+    # scenarios with setup return their own timing
+    records, wall = result if isinstance(result, tuple) else (result, time.time() - start)
+
+    return { 'scenario': name, 'records': records, 'wall': wall, 'records_per_sec': records / wall if wall else 0.0, 'peak_rss_kb': peak_rss_kb() }
+
+def run_process(name, server, options):
+    server.configs.clear()
+    server.reset_counters()
+
+    command = [sys.executable, os.path.abspath(__file__), '--run', name, '--base', server.base,
+               '--records', str(options.records), '--record-size', str(options.record_size), '--page-size', str(options.page_size), '--codec', options.codec,
+               '--fields', options.fields or '',
+               '--bulk-items', str(options.bulk_items), '--bulk-workers', str(options.bulk_workers)]
+    output  = subprocess.check_output(command).decode('utf8')
+    result  = json.loads(output.strip().splitlines()[-1])
+
+    result['api_requests'] = server.requests
+    return result
+
+def compare(results, baseline, tolerance):
+    previous    = dict((result['scenario'], result) for result in baseline)
+    regressions = []
+
+    for result in results:
+        before = previous.get(result['scenario'])
+
+        if None == before:
+            continue
+
+        if result['records_per_sec'] < before['records_per_sec'] * (1 - tolerance):
+            regressions.append('%s: %.0f records/sec, was %.0f' % (result['scenario'], result['records_per_sec'], before['records_per_sec']))
+
+        if result['peak_rss_kb'] and before.get('peak_rss_kb') and result['peak_rss_kb'] > before['peak_rss_kb'] * (1 + tolerance):
+            regressions.append('%s: peak RSS %d KB, was %d KB' % (result['scenario'], result['peak_rss_kb'], before['peak_rss_kb']))
+
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the client against the local mock API.')
+    parser.add_argument('--records',      help='Records per query, feed and writer scenario (default: 20000).', type=int, default=20000)
+    parser.add_argument('--page-size',    help='Feed page size (default: 1000).', type=int, default=1000)
+    parser.add_argument('--record-size',  help='Extra bytes per record (default: 0).', type=int, default=0)
+    parser.add_argument('--latency',      help='Seconds added to every mock response (default: 0).', type=float, default=0.0)
+    parser.add_argument('--errors',       help='Fraction of api calls answered 503 (default: 0).', type=float, default=0.0)
+    parser.add_argument('--codec',        help='JSON library of the client (default: auto).', type=str, default='auto', choices=['auto', 'orjson', 'ujson', 'json'])
+    parser.add_argument('--fields',       help='Request fields exported by the client, comma separated (default: all).', type=str, default=None)
+    parser.add_argument('--bulk-items',   help='Items per bulk scenario (default: 500).', type=int, default=500)
+    parser.add_argument('--bulk-workers', help='Bulk threads (default: 8).', type=int, default=8)
+    parser.add_argument('--scenarios',    help='Scenarios to run (default: all).', nargs='*', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--json',         help='Save the results to the specified file.', type=str, default=None)
+    parser.add_argument('--baseline',     help='Compare to results saved with --json.', type=str, default=None)
+    parser.add_argument('--tolerance',    help='Allowed regression as a fraction (default: 0.2).', type=float, default=0.2)
+    parser.add_argument('--run',          help=argparse.SUPPRESS, type=str, default=None)
+    parser.add_argument('--base',         help=argparse.SUPPRESS, type=str, default=None)
+    options = parser.parse_args()
+
+    if options.run:
+        print(json.dumps(run_scenario(options.run, options)))
+        sys.exit(0)
+
+    server             = mock_api.start()
+    server.page_size   = options.page_size
+    server.pages       = max(1, options.records // options.page_size)
+    server.record_size = options.record_size
+    server.latency     = options.latency
+    server.errors      = options.errors
+    server.step        = 1
+    results            = []
+
+    print('%-12s %8s %9s %12s %12s %9s' % ('scenario', 'records', 'wall', 'records/sec', 'peak RSS', 'requests'))
+
+    for name in options.scenarios:
+        result = run_process(name, server, options)
+        results.append(result)
+        print('%-12s %8d %8.3fs %12.0f %9s KB %9d' % (name, result['records'], result['wall'], result['records_per_sec'], result['peak_rss_kb'], result['api_requests']))
+
+    server.shutdown()
+
+    if options.json:
+        with open(options.json, 'w') as outfile:
+            json.dump(results, outfile, indent=2)
+
+    if options.baseline:
+        with open(options.baseline) as infile:
+            regressions = compare(results, json.load(infile), options.tolerance)
+
+        for regression in regressions:
+            print('REGRESSION %s' % regression)
+
+        sys.exit(1 if regressions else 0)
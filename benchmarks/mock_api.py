@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+# Local mock of the Signal Sciences API used by the benchmarks.
+# Serves synthetic data, no network access or credentials required.
+
+import sys
+import json
+import time
+import random
+import socket
+import hashlib
+import threading
+
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qs
+    from urllib import urlencode
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qs, urlencode
+
+sys.dont_write_bytecode = True
+
+API = '/api/v0'
+
+COUNTRIES = ('US', 'DE', 'CN', 'RU', 'BR', 'FR', 'GB', 'IN')
+PATHS     = ('/', '/login', '/search', '/api/items', '/admin', '/cart')
+TAGS      = ('SQLI', 'XSS', 'CMDEXE', 'TRAVERSAL', 'SCANNER', 'HTTP404')
+
+def make_request(i, timestamp=1500000000, padding=0, ips=0):
+    """
+    make_request(i=<int>, timestamp=<int>, padding=<int>, ips=<int>)
+    
+    Returns a synthetic request record shaped like the /requests and
+    /feed/requests data returned by the API. padding adds a request
+    header of that many bytes, for larger records. ips limits the
+    distinct remote IPs, 0 gives every request its own.
+    """
+    
+    ip = i % ips if ips else i
+    
+    record = {
+        'id': '%024x' % i,
+        'timestamp': timestamp,
+        'serverHostname': 'web%d' % (i % 4),
+        'serverName': 'www.example.com',
+        'remoteIP': '10.%d.%d.%d' % ((ip >> 16) & 255, (ip >> 8) & 255, ip & 255),
+        'remoteHostname': '',
+        'remoteCountryCode': COUNTRIES[i % len(COUNTRIES)],
+        'userAgent': 'Mozilla/5.0 (bench)',
+        'method': 'GET',
+        'scheme': 'https',
+        'path': PATHS[i % len(PATHS)],
+        'uri': PATHS[i % len(PATHS)] + '?q=%d' % i,
+        'protocol': 'HTTP/1.1',
+        'responseCode': (200, 404, 500, 406)[i % 4],
+        'responseSize': 512 + i % 1024,
+        'responseMillis': i % 250,
+        'agentResponseCode': (200, 406)[i % 2],
+        'headersIn': [['Host', 'www.example.com'], ['Accept', '*/*']],
+        'headersOut': [['Content-Type', 'text/html']],
+        'tags': [{ 'type': TAGS[i % len(TAGS)], 'location': 'QUERYSTRING', 'value': 'x' * 16, 'detector': TAGS[i % len(TAGS)] }],
+    }
+    
+    if padding:
+        record['headersIn'].append(['X-Padding', 'x' * padding])
+    
+    return record
+
+def make_agent(i, rng):
+    """
+    make_agent(i=<int>, rng=<random.Random>)
+    
+    Returns a synthetic agent shaped like the /agents data returned by the
+    API, with metrics drawn from rng so every poll differs.
+    """
+    
+    return {
+        'agent.name': 'agent%d' % i,
+        'agent.status': 'online',
+        'agent.version': '4.0.0',
+        'agent.rpm': 600 + i * 10 + rng.randint(0, 200),
+        'agent.current_requests': i,
+        'agent.decision_time_50th': round(rng.uniform(0.1, 0.5), 3),
+        'agent.decision_time_95th': round(rng.uniform(0.5, 2.0), 3),
+        'agent.latency_time_95th': round(rng.uniform(1.0, 5.0), 3),
+        'agent.connections_dropped': rng.randint(0, 2),
+        'agent.upload_metadata_failures': 0,
+        'host.agent_cpu': round(rng.uniform(0.5, 10.0), 2),
+        'host.remote_addr': '10.0.0.%d' % i,
+    }
+
+class MockSigSciServer(ThreadingMixIn, HTTPServer):
+    """
+    MockSigSciServer(address=<tuple>)
+    
+    Threaded HTTP server counting accepted connections and served requests.
+    
+    Settings:
+        MockSigSciServer.page_size   = 100
+        MockSigSciServer.pages       = 10
+        MockSigSciServer.step        = 10   # seconds between /requests records
+        MockSigSciServer.search_page = 0    # most /requests records per response, more follow next.uri, 0 for no limit
+        MockSigSciServer.latency     = 0.0  # seconds added to every response
+        MockSigSciServer.sites       = 4    # sites listed for every corp
+        MockSigSciServer.auth        = True # answer 401 without a session cookie
+        MockSigSciServer.errors      = 0.0  # fraction of api calls answered 503
+        MockSigSciServer.bad_gateway = 0.0  # fraction of api calls answered with a proxy's html 502 page
+        MockSigSciServer.etags       = True # ETag/304 revalidation of agents and lists
+        MockSigSciServer.throttle    = 0    # api calls per second before answering 429, 0 disables
+        MockSigSciServer.retry_after = 1   # Retry-After seconds sent with 429
+        MockSigSciServer.record_size = 0   # extra bytes per request record
+        MockSigSciServer.agents      = 8   # agents listed for every site
+        MockSigSciServer.ips         = 0   # distinct remote IPs of feed requests, 0 for one per request
+        MockSigSciServer.unique      = None # list item field that must be unique, a duplicate is answered 400
+        MockSigSciServer.reject      = None # list items with this note are answered 400
+    
+    Error injection draws from MockSigSciServer.random, seeded so runs
+    are reproducible.
+    
+    Counters:
+        connections, requests, logins, throttled, sent (response body bytes)
+    """
+    daemon_threads      = True
+    allow_reuse_address = True
+    page_size           = 100
+    pages               = 10
+    step                = 10
+    search_page         = 0
+    latency             = 0.0
+    sites               = 4
+    auth                = True
+    errors              = 0.0
+    bad_gateway         = 0.0
+    etags               = True
+    throttle            = 0
+    retry_after         = 1
+    record_size         = 0
+    agents              = 8
+    ips                 = 0
+    unique              = None
+    reject              = None
+    
+    def __init__(self, address):
+        HTTPServer.__init__(self, address, MockSigSciHandler)
+        self.lock        = threading.Lock()
+        self.connections = 0
+        self.requests    = 0
+        self.sent        = 0
+        self.configs     = {}
+        self.ids         = 0
+        self.logins      = 0
+        self.sessions    = set()
+        self.window      = (0, 0)
+        self.random      = random.Random(0)
+        self.throttled   = 0
+    
+    def reset_counters(self):
+        with self.lock:
+            self.connections = 0
+            self.requests    = 0
+            self.sent        = 0
+    
+    def count(self, name, amount=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + amount)
+    
+    def login(self):
+        with self.lock:
+            self.logins += 1
+            session = 'bench%d' % self.logins
+            self.sessions.add(session)
+            return session
+    
+    def admit(self):
+        # fixed one second window of at most `throttle` api calls
+        with self.lock:
+            second, calls = self.window
+            now           = int(time.time())
+            calls         = calls + 1 if second == now else 1
+            self.window   = (now, calls)
+            
+            if calls > self.throttle:
+                self.throttled += 1
+                return False
+            
+            return True
+    
+    def revoke(self):
+        with self.lock:
+            self.sessions.clear()
+    
+    def next_id(self):
+        with self.lock:
+            self.ids += 1
+            return self.ids
+    
+    @property
+    def base(self):
+        return 'http://%s:%d' % self.server_address[:2]
+
+class MockSigSciHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def setup(self):
+        # one handler instance per accepted connection
+        BaseHTTPRequestHandler.setup(self)
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.count('connections')
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def send_body(self, code, body, headers=None):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode('utf8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.count('sent', len(data))
+    
+    def send_cacheable(self, body):
+        data = json.dumps(body, sort_keys=True).encode('utf8')
+        etag = '"%s"' % hashlib.md5(data).hexdigest()
+        
+        if not self.server.etags:
+            self.send_body(200, data)
+        elif etag == self.headers.get('If-None-Match'):
+            self.send_body(304, b'', { 'ETag': etag })
+        else:
+            self.send_body(200, data, { 'ETag': etag })
+    
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+    
+    def route(self):
+        self.server.count('requests')
+        url   = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = url.path[len(API):].strip('/').split('/')
+        return url, query, parts
+    
+    def authorized(self):
+        cookies = dict(c.strip().split('=', 1) for c in (self.headers.get('Cookie') or '').split(';') if '=' in c)
+        
+        if self.server.auth and cookies.get('session') not in self.server.sessions:
+            self.send_body(401, { 'message': 'Unauthorized' })
+            return False
+        
+        if self.server.throttle and not self.server.admit():
+            self.send_body(429, { 'message': 'Rate limit exceeded' }, { 'Retry-After': str(self.server.retry_after) })
+            return False
+        
+        # error injection, applied to every authorized api call
+        if self.server.errors and self.server.random.random() < self.server.errors:
+            self.send_body(503, { 'message': 'Service unavailable' })
+            return False
+        
+        if self.server.bad_gateway and self.server.random.random() < self.server.bad_gateway:
+            self.send_body(502, b'<html><body><h1>502 Bad Gateway</h1></body></html>')
+            return False
+        
+        return True
+    
+    def page(self, start, count):
+        return [make_request(i, padding=self.server.record_size, ips=self.server.ips) for i in range(start, start + count)]
+    
+    def search(self, path, q, limit, offset=0):
+        # supports the from:, until: and sort: terms built by SigSciAPI.make_query()
+        now   = int(time.time())
+        terms = dict(term.split(':', 1) for term in q.split() if ':' in term)
+        units = { 's': 1, 'm': 60, 'h': 3600, 'd': 86400 }
+        
+        def timestamp(value):
+            if value.startswith('-'):
+                return now - int(value[1:-1]) * units[value[-1]]
+            return int(value)
+        
+        step  = self.server.step
+        start = timestamp(terms.get('from', '-6h'))
+        end   = timestamp(terms['until']) if 'until' in terms else now
+        first = (start + step - 1) // step * step
+        times = range(first, end + 1, step) # until is inclusive, like from
+        
+        if 'time-asc' != terms.get('sort', 'time-desc'):
+            times = times[::-1]
+        
+        count = min(limit, self.server.search_page or limit)
+        data  = [make_request(t // step, t, self.server.record_size) for t in times[offset:offset + count]]
+        nxt   = '%s?%s' % (path, urlencode({ 'q': q, 'limit': limit, 'offset': offset + count })) if offset + count < len(times) else ''
+        return { 'totalCount': len(times), 'next': { 'uri': nxt }, 'data': data }
+    
+    def do_POST(self):
+        url, query, parts = self.route()
+        body = self.read_body()
+        
+        if ['auth', 'login'] == parts:
+            self.send_body(302, b'', { 'Location': '/', 'Set-Cookie': 'session=%s; Path=/' % self.server.login() })
+        
+        elif not self.authorized():
+            pass
+        
+        elif 5 == len(parts) and 'corps' == parts[0]:
+            item       = json.loads(body.decode('utf8'))
+            listed     = [config.get(self.server.unique) for config in self.server.configs.values()] if self.server.unique else []
+            
+            if self.server.unique and item.get(self.server.unique) in listed:
+                self.send_body(400, { 'message': 'Duplicate %s' % self.server.unique })
+                return
+            
+            if self.server.reject and self.server.reject == item.get('note'):
+                self.send_body(400, { 'message': 'Invalid item' })
+                return
+            
+            item['id'] = '%d' % self.server.next_id()
+            self.server.configs[item['id']] = item
+            self.send_body(200, item)
+        
+        else:
+            self.send_body(404, { 'message': 'Not found' })
+    
+    def do_DELETE(self):
+        url, query, parts = self.route()
+        self.read_body()
+        
+        if self.authorized():
+            self.server.configs.pop(parts[-1], None)
+            self.send_body(204, b'')
+    
+    def do_GET(self):
+        url, query, parts = self.route()
+        size = self.server.page_size
+        
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        
+        if not self.authorized():
+            pass
+        
+        elif ['corps'] == parts:
+            self.send_body(200, { 'data': [{ 'name': 'corp' }, { 'name': 'othercorp' }] })
+        
+        elif 3 == len(parts) and 'sites' == parts[2]:
+            self.send_body(200, { 'data': [{ 'name': 'site%d' % i } for i in range(self.server.sites)] })
+        
+        elif 5 == len(parts) and 'requests' == parts[4]:
+            limit = int(query.get('limit', [size])[0])
+            self.send_body(200, self.search(url.path, query.get('q', [''])[0], limit, int(query.get('offset', ['0'])[0])))
+        
+        elif 6 == len(parts) and ['feed', 'requests'] == parts[4:]:
+            number = int(query.get('page', ['0'])[0])
+            nxt    = '' if number + 1 >= self.server.pages else '%s/%s?page=%d' % (API, '/'.join(parts), number + 1)
+            self.send_body(200, { 'next': { 'uri': nxt }, 'data': self.page(number * size, size) })
+        
+        elif 5 == len(parts) and 'agents' == parts[4]:
+            self.send_cacheable({ 'data': [make_agent(i, self.server.random) for i in range(self.server.agents)] })
+        
+        elif 5 == len(parts):
+            self.send_cacheable({ 'data': list(self.server.configs.values()) })
+        
+        else:
+            self.send_body(404, { 'message': 'Not found' })
+
+def start(port=0):
+    """
+    start(port=<int>)
+    
+    Starts a MockSigSciServer on 127.0.0.1 in a background thread.
+    """
+    
+    server = MockSigSciServer(('127.0.0.1', port))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+if __name__ == '__main__':
+    port   = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    server = MockSigSciServer(('127.0.0.1', port))
+    print('Mock Signal Sciences API on %s' % server.base)
+    server.serve_forever()
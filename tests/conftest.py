@@ -0,0 +1,21 @@
+# Shared fixtures: the repository and benchmarks on sys.path, and the
+# local mock API of benchmarks/mock_api.py.
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import mock_api
+
+@pytest.fixture
+def server():
+    server = mock_api.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,110 @@
+# AsyncSigSciAPI against the local mock API.
+
+import json
+import time
+import asyncio
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from SigSciAsync import AsyncSigSciAPI
+from bench_connections import client
+
+def async_client(server):
+    sigsci = AsyncSigSciAPI(concurrency=4)
+    
+    for name in ('base', 'base_url', 'email', 'pword', 'corp', 'site'):
+        setattr(sigsci, name, getattr(client(server), name))
+    
+    sigsci.backoff = 0.01
+    return sigsci
+
+def run(server, test, **settings):
+    async def main():
+        async with async_client(server) as sigsci:
+            for name, value in settings.items():
+                setattr(sigsci, name, value)
+            
+            assert await sigsci.authenticate()
+            return await test(sigsci)
+    
+    return asyncio.run(main())
+
+def sliced(sigsci, until, limit, sort):
+    sigsci.parallel   = 4
+    sigsci.slice      = '10m'
+    sigsci.limit      = limit
+    sigsci.sort       = sort
+    sigsci.until_time = str(until)
+    sigsci.from_time  = str(until - 3600)
+    sigsci.build_query()
+
+@pytest.mark.parametrize('sort', ['desc', 'asc'])
+def test_parallel_query_follows_next_uri(server, sort):
+    server.step        = 5
+    server.search_page = 7
+    until              = int(time.time()) // 60 * 60
+    
+    async def query(sigsci):
+        sliced(sigsci, until, 50, sort)
+        return await sigsci.query_api()
+    
+    threaded = client(server)
+    threaded.authenticate()
+    sliced(threaded, until, 50, sort)
+    
+    assert [row['id'] for row in threaded.query_slices()['data']] == [row['id'] for row in run(server, query)['data']]
+
+def test_rate_limits_requests(server):
+    async def agents(sigsci):
+        start = time.time()
+        await asyncio.gather(*[sigsci.get_agent_metrics() for i in range(10)])
+        return time.time() - start
+    
+    # a token per 50ms after the login's
+    assert 0.45 <= run(server, agents, rate=20)
+
+def test_login_is_retried(server):
+    async def login():
+        async with AsyncSigSciAPI() as sigsci:
+            sigsci.base_url = 'http://127.0.0.1:9/api/v0'
+            sigsci.backoff  = 0.01
+            sigsci.retries  = 2
+            
+            try:
+                await sigsci.authenticate()
+            except Exception:
+                pass
+            
+            return sigsci.get_scheduler().stats
+    
+    stats = asyncio.run(login())
+    
+    assert (3, 2, 1) == (stats['requests'], stats['retried'], stats['failed'])
+
+def test_error_page_raises_status(server):
+    async def agents(sigsci):
+        server.bad_gateway = 1.0
+        sigsci.retries     = 1
+        
+        with pytest.raises(ValueError, match='HTTP 502 Bad Gateway'):
+            await sigsci.get_agent_metrics()
+    
+    run(server, agents)
+
+def test_configuration_round_trip_from_file(server, tmp_path):
+    path = tmp_path / 'whitelist.json'
+    path.write_text(json.dumps({ 'data': [{ 'source': '10.0.0.%d' % i, 'note': 'test' } for i in range(5)] }))
+    
+    async def round_trip(sigsci):
+        sigsci.file = str(path)
+        created     = await sigsci.post_whitelist()
+        listed      = await sigsci.get_whitelist()
+        await sigsci.delete_whitelist({ 'data': created })
+        return listed, await sigsci.get_whitelist()
+    
+    listed, left = run(server, round_trip)
+    
+    assert ['10.0.0.%d' % i for i in range(5)] == sorted(item['source'] for item in listed['data'])
+    assert [] == left['data']
@@ -0,0 +1,68 @@
+# Feed exports resumed from a checkpoint file, through the command line.
+
+import json
+import time
+
+import SigSci
+import SigSciLib
+
+def run(server, capsys, *argv):
+    settings = dict(vars(SigSci), EMAIL='bench@example.com', PASSWORD='bench', CORP='corp', SITE='site')
+    
+    SigSciLib.main(settings, list(argv))
+    output = capsys.readouterr().out
+    
+    assert 'Error' not in output, output
+
+def records(path):
+    with open(str(path)) as infile:
+        return len(json.load(infile))
+
+def test_cli_runs_resume_from_checkpoint(server, capsys, monkeypatch, tmp_path):
+    monkeypatch.setattr(SigSciLib.SigSciAPI, 'base', server.base)
+    monkeypatch.setattr(SigSciLib.SigSciAPI, 'url', server.base + '/api/')
+    server.pages     = 2
+    server.page_size = 10
+    checkpoint       = str(tmp_path / 'checkpoint')
+    now              = time.time()
+    
+    # the first run two hours ago, relative times from the command line are stored as unix timestamps
+    monkeypatch.setattr(SigSciLib.time, 'time', lambda: now - 7200)
+    run(server, capsys, '--feed', '--checkpoint', checkpoint, '--from', '=-65m', '--until', '=-5m', '--file', str(tmp_path / 'first.json'))
+    monkeypatch.setattr(SigSciLib.time, 'time', lambda: now)
+    state = SigSciLib.FeedCheckpoint(checkpoint).load()['corp/site']
+    
+    assert 20 == records(tmp_path / 'first.json')
+    assert isinstance(state['from'], int) and isinstance(state['until'], int)
+    assert (3600, None) == (state['until'] - state['from'], state['next'])
+    
+    # the next run catches up from there to 5 minutes ago, an hour at a time
+    run(server, capsys, '--feed', '--checkpoint', checkpoint, '--catchup', '1h', '--file', str(tmp_path / 'second.json'))
+    resumed = SigSciLib.FeedCheckpoint(checkpoint).load()['corp/site']
+    
+    assert 2 * 20 == records(tmp_path / 'second.json')
+    assert int(now) // 60 * 60 - 300 == resumed['until']
+    assert state['until'] + 3600 == resumed['from']
+
+def test_string_window_in_checkpoint_is_migrated(tmp_path):
+    path = str(tmp_path / 'checkpoint')
+    
+    with open(path, 'w') as outfile:
+        json.dump({ 'corp/site': { 'from': '-1h', 'until': '1500003600', 'next': None, 'updated': 1500003600 } }, outfile)
+    
+    state = SigSciLib.FeedCheckpoint(path).get('corp/site')
+    
+    assert (1500000000, 1500003600) == (state['from'], state['until'])
+
+def test_invalid_window_in_checkpoint_is_rejected(tmp_path):
+    path = str(tmp_path / 'checkpoint')
+    
+    with open(path, 'w') as outfile:
+        json.dump({ 'corp/site': { 'from': 'yesterday', 'until': 1500003600, 'next': None, 'updated': 1500003600 } }, outfile)
+    
+    try:
+        SigSciLib.FeedCheckpoint(path).get('corp/site')
+    except ValueError as e:
+        assert 'remove it to start over' in str(e)
+    else:
+        assert False, 'invalid checkpoint accepted'
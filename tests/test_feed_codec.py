@@ -0,0 +1,34 @@
+# Feed pages parsed whole or streamed, against the local mock API.
+
+import pytest
+
+import SigSciLib
+from bench_connections import client
+
+@pytest.mark.parametrize('codec', ['orjson', 'json'])
+def test_large_pages_are_streamed_with_every_codec(server, monkeypatch, codec):
+    streamed = []
+    stream   = SigSciLib.JSONStreamReader
+    
+    class Reader(stream):
+        def __init__(self, fp, chunk_size=65536):
+            streamed.append(fp)
+            stream.__init__(self, fp, chunk_size)
+    
+    monkeypatch.setattr(SigSciLib, 'JSONStreamReader', Reader)
+    
+    sigsci           = client(server)
+    sigsci.codec     = codec
+    sigsci.from_time = None
+    sigsci.authenticate()
+    url              = sigsci.feed_start()
+    
+    whole = list(sigsci.iter_feed_page(url))
+    assert (0 if 'orjson' == codec else 1) == len(streamed)
+    
+    # pages over parse_size are never read into memory at once.
+    sigsci.parse_size = 1024
+    
+    assert whole == list(sigsci.iter_feed_page(url))
+    assert (1 if 'orjson' == codec else 2) == len(streamed)
+    assert whole
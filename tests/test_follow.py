@@ -0,0 +1,24 @@
+# Output format of the feed daemon, through the command line.
+
+import SigSci
+import SigSciLib
+
+def follow(server, capsys, monkeypatch, *argv):
+    settings = dict(vars(SigSci), EMAIL='bench@example.com', PASSWORD='bench', CORP='corp', SITE='site')
+    formats  = []
+    
+    monkeypatch.setattr(SigSciLib.SigSciAPI, 'base', server.base)
+    monkeypatch.setattr(SigSciLib.SigSciAPI, 'url', server.base + '/api/')
+    monkeypatch.setattr(SigSciLib.SigSciAPI, 'follow_feed', lambda sigsci: formats.append(sigsci.format))
+    
+    SigSciLib.main(settings, ['--feed', '--follow'] + list(argv))
+    return formats, capsys.readouterr().out
+
+def test_follow_defaults_to_ndjson(server, capsys, monkeypatch):
+    assert (['ndjson'], '') == follow(server, capsys, monkeypatch)
+
+def test_follow_refuses_explicit_json(server, capsys, monkeypatch):
+    formats, output = follow(server, capsys, monkeypatch, '--format', 'json')
+    
+    assert [] == formats
+    assert 'a json array is only valid once the daemon stops' in output
@@ -0,0 +1,33 @@
+# Parallel time sliced queries against one search, through the command line.
+
+import time
+
+import pytest
+
+import SigSci
+import SigSciLib
+
+def query(capsys, tmp_path, until, sort, limit, parallel):
+    settings = dict(vars(SigSci), EMAIL='bench@example.com', PASSWORD='bench', CORP='corp', SITE='site')
+    path     = tmp_path / ('parallel%d.json' % parallel)
+    
+    # an hour is six 10m slices of 60 records, the last one also holds the record at until.
+    SigSciLib.main(settings, ['--from', str(until - 3600), '--until', str(until), '--sort', sort, '--limit', str(limit),
+        '--parallel', str(parallel), '--slice', '10m', '--format', 'ndjson', '--file', str(path)])
+    output = capsys.readouterr().out
+    
+    assert 'Error' not in output, output
+    return path.read_text()
+
+@pytest.mark.parametrize('sort', ['desc', 'asc'])
+@pytest.mark.parametrize('limit', [60, 61, 95, 1000])
+def test_parallel_query_output_matches_one_search(server, capsys, monkeypatch, tmp_path, sort, limit):
+    monkeypatch.setattr(SigSciLib.SigSciAPI, 'base', server.base)
+    monkeypatch.setattr(SigSciLib.SigSciAPI, 'url', server.base + '/api/')
+    
+    until  = int(time.time()) // 600 * 600
+    whole  = query(capsys, tmp_path, until, sort, limit, 1)
+    merged = query(capsys, tmp_path, until, sort, limit, 4)
+    
+    assert whole == merged
+    assert min(limit, 361) == len(whole.splitlines())
@@ -0,0 +1,43 @@
+# ResponseCache disk tier limits, without a server.
+
+import os
+import time
+
+import SigSciLib
+
+def test_oldest_files_are_removed_over_the_cap(tmp_path):
+    cache = SigSciLib.ResponseCache(size=2, path=str(tmp_path), files=3)
+    
+    for i in range(5):
+        cache.put('u %d' % i, 'body %d' % i, 60)
+        # mtime resolution is coarse on some file systems.
+        os.utime(cache.entry_file('u %d' % i).path, (time.time() - 10 + i, time.time() - 10 + i))
+    
+    assert 3 == len(os.listdir(str(tmp_path)))
+    assert 2 == cache.stats['removed']
+    
+    # a later run reads only the newest entries from disk.
+    cache = SigSciLib.ResponseCache(size=2, path=str(tmp_path), files=3)
+    
+    assert [None, None, 'body 2', 'body 3', 'body 4'] == [(cache.get('u %d' % i) or {}).get('body') for i in range(5)]
+
+def test_existing_directory_is_pruned_to_the_cap(tmp_path):
+    cache = SigSciLib.ResponseCache(path=str(tmp_path))
+    
+    for i in range(4):
+        cache.put('u %d' % i, 'body', 60)
+    
+    cache = SigSciLib.ResponseCache(path=str(tmp_path), files=1)
+    
+    assert 1 == len(os.listdir(str(tmp_path)))
+
+def test_expired_files_are_removed_unless_they_can_be_revalidated(tmp_path):
+    cache = SigSciLib.ResponseCache(path=str(tmp_path))
+    cache.put('plain', 'body', -1)
+    cache.put('tagged', 'body', -1, etag='"1"')
+    
+    cache = SigSciLib.ResponseCache(path=str(tmp_path))
+    
+    assert None == cache.get('plain')
+    assert '"1"' == cache.get('tagged')['etag']
+    assert [cache.entry_file('tagged').path] == cache.stored_files()
@@ -0,0 +1,43 @@
+# RequestScheduler retries and concurrency, without a server.
+
+import pytest
+import requests
+
+import SigSciLib
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers     = headers or {}
+    
+    def close(self):
+        pass
+
+@pytest.mark.parametrize('headers', [
+    { 'Retry-After': 'soon' },
+    { 'Retry-After': 'Wed, 32 Foo 2015 07:28:00 GMT' },
+    { 'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': 'later' },
+])
+def test_malformed_wait_headers_fall_back_to_backoff(headers):
+    scheduler = SigSciLib.RequestScheduler(retries=2, backoff=0.001)
+    responses = [Response(429, headers), Response(200)]
+    
+    assert 0.0 == scheduler.wait_time(responses[0])
+    assert 200 == scheduler.send('GET', lambda: responses.pop(0)).status_code
+    assert 1 == scheduler.stats['retried']
+
+def test_http_date_retry_after_is_parsed():
+    scheduler = SigSciLib.RequestScheduler()
+    
+    assert 0.0 == scheduler.wait_time(Response(429, { 'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT' }))
+
+def test_connection_errors_shrink_the_concurrency():
+    scheduler = SigSciLib.RequestScheduler(concurrency=8, retries=0, backoff=0.001)
+    
+    def refused():
+        raise requests.exceptions.ConnectTimeout('timed out')
+    
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        scheduler.send('GET', refused)
+    
+    assert 4 == scheduler.concurrency
@@ -0,0 +1,45 @@
+# Session cache counts in the run summary, against the local mock API.
+
+import json
+import socket
+
+from bench_connections import client
+
+def run(server, tmp_path, **settings):
+    sigsci               = client(server)
+    sigsci.session_cache = str(tmp_path / 'session')
+    
+    for name, value in settings.items():
+        setattr(sigsci, name, value)
+    
+    assert sigsci.authenticate()
+    sigsci.get_blacklist()
+    sigsci.stats_out()
+    return sigsci
+
+def test_session_cache_counts_are_reported(server, tmp_path):
+    statsd = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    statsd.bind(('127.0.0.1', 0))
+    statsd.settimeout(5)
+    
+    run(server, tmp_path)
+    
+    # the cached cookie is revoked, the second run logs in again after a 401.
+    server.sessions.clear()
+    run(server, tmp_path,
+        stats_file = str(tmp_path / 'stats.json'),
+        prometheus = str(tmp_path / 'sigsci.prom'),
+        statsd     = '127.0.0.1:%d' % statsd.getsockname()[1])
+    
+    expected = { 'hits': 1, 'misses': 0, 'stores': 1, 'invalidations': 1, 'relogins': 1 }
+    
+    assert expected == json.loads((tmp_path / 'stats.json').read_text())['session_cache']
+    assert 'sigsci_session_cache_relogins_total 1' in (tmp_path / 'sigsci.prom').read_text().splitlines()
+    
+    sent = set()
+    
+    while 'sigsci.session_cache.relogins:1|c' not in sent:
+        sent.add(statsd.recv(1024).decode('utf8'))
+    
+    assert 'sigsci.session_cache.hits:1|c' in sent
+    statsd.close()
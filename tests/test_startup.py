@@ -0,0 +1,41 @@
+# Startup of the commands that make no API calls, see
+# benchmarks/bench_startup.py for the timings.
+
+import ast
+import os
+import sys
+import importlib.util
+
+import pytest
+
+import bench_startup
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 7), reason='-X importtime requires Python 3.7+')
+
+@pytest.mark.parametrize('arguments', bench_startup.COMMANDS, ids=' '.join)
+def test_no_heavy_imports(arguments):
+    baseline = set(name for name, self_us in bench_startup.imports(['-c', 'pass']))
+    modules  = [name for name, self_us in bench_startup.imports([bench_startup.SCRIPT] + arguments) if name not in baseline]
+    heavy    = sorted(set(name.split('.')[0] for name in modules if name.split('.')[0] in bench_startup.HEAVY))
+    
+    assert 'SigSciLib' in modules
+    assert [] == heavy
+
+def test_library_bytecode_cached():
+    cached = importlib.util.cache_from_source(os.path.abspath(bench_startup.LIBRARY))
+    
+    if os.path.exists(cached):
+        os.remove(cached)
+    
+    bench_startup.run([bench_startup.SCRIPT, '--list'])
+    
+    assert os.path.exists(cached)
+
+def test_launcher_is_thin():
+    # only the configuration section, the import and the call of main()
+    with open(bench_startup.SCRIPT) as infile:
+        tree = ast.parse(infile.read())
+    
+    kinds = set(type(node).__name__ for node in tree.body)
+    
+    assert kinds <= set(['Assign', 'Try', 'If'])
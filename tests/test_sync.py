@@ -0,0 +1,47 @@
+# Configuration list sync against the local mock API.
+
+import json
+
+from bench_connections import client
+
+def sync(server, tmp_path, remote, desired):
+    server.configs = dict((config['id'], config) for config in remote)
+    server.ids     = 100
+    path           = tmp_path / 'blacklist.json'
+    path.write_text(json.dumps({ 'data': desired }))
+    
+    sigsci      = client(server)
+    sigsci.file = str(path)
+    sigsci.authenticate()
+    sigsci.sync_blacklist()
+    
+    return sigsci.bulk_report, sorted((config['source'], config['note']) for config in server.configs.values())
+
+def test_changed_item_is_added_before_the_old_one_is_deleted(server, tmp_path):
+    report, listed = sync(server, tmp_path, [{ 'id': '1', 'source': '10.0.0.1', 'note': 'old' }], [{ 'source': '10.0.0.1', 'note': 'new' }])
+    
+    assert [('10.0.0.1', 'new')] == listed
+    assert [] == report['failed']
+
+def test_changed_item_replaces_old_one_when_duplicates_are_refused(server, tmp_path):
+    server.unique  = 'source'
+    report, listed = sync(server, tmp_path, [{ 'id': '1', 'source': '10.0.0.1', 'note': 'old' }], [{ 'source': '10.0.0.1', 'note': 'new' }])
+    
+    assert [('10.0.0.1', 'new')] == listed
+    assert ([], 1, 1) == (report['failed'], len(report['added']), len(report['deleted']))
+
+def test_old_item_is_restored_when_its_replacement_fails(server, tmp_path):
+    server.unique  = 'source'
+    server.reject  = 'bad'
+    report, listed = sync(server, tmp_path, [{ 'id': '1', 'source': '10.0.0.1', 'note': 'old' }], [{ 'source': '10.0.0.1', 'note': 'bad' }])
+    
+    assert [('10.0.0.1', 'old')] == listed
+    assert [{ 'source': '10.0.0.1', 'note': 'bad' }] == [failure['item'] for failure in report['failed']]
+    assert 1 == len(report['restored'])
+
+def test_remote_duplicates_are_deleted(server, tmp_path):
+    remote         = [{ 'id': str(i), 'source': '10.0.0.1', 'note': 'same' } for i in range(1, 4)]
+    report, listed = sync(server, tmp_path, remote, [{ 'source': '10.0.0.1', 'note': 'same' }])
+    
+    assert [('10.0.0.1', 'same')] == listed
+    assert ([], 2) == (report['added'], len(report['deleted']))